@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Concurrent in-flight questions one API worker holds against a slow LLM backend:
+the thread-pool path (``run_in_threadpool(agent.respond)``) versus the async
+path (``agent.arespond``).
+
+A fake OpenAI-compatible server (benchmarks/fake_llm_server.py, run in its own
+process) answers every completion after ``--delay`` seconds and records how
+many requests it saw at once.
+
+    python -m benchmarks.bench_concurrency [--requests 200] [--delay 1.0]
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+async def _fire(handler, n: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(f"which drugs treat disease {i}?", f"bench-{i}") for i in range(n)))
+    return time.perf_counter() - start
+
+
+def _start_server(port: int, delay: float) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_llm_server", "--port", str(port), "--delay", str(delay)]
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats")
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("fake LLM server did not start")
+
+
+def main(requests: int, delay: float, port: int) -> None:
+    server = _start_server(port, delay)
+    stats_url = f"http://127.0.0.1:{port}/stats"
+    try:
+        os.environ["LLAMA_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+        os.environ.setdefault("LLAMA_MODEL", "bench-model")
+        os.environ["LLM_CACHE"] = "false"
+        os.environ.setdefault("LLM_MAX_CONCURRENCY", str(requests))
+
+        from fastapi.concurrency import run_in_threadpool
+        from src.text2cypher_agent import Text2CypherAgent
+
+        agent = Text2CypherAgent(provider="llama")
+
+        async def threadpool(question, session_id):
+            return await run_in_threadpool(agent.respond, question, session_id)
+
+        async def run_all():
+            # one event loop for both paths: the async OpenAI client is bound to it
+            for name, handler in [("run_in_threadpool", threadpool), ("arespond", agent.arespond)]:
+                await handler("warm-up", "bench-warm")
+                httpx.post(f"{stats_url}/reset")
+                elapsed = await _fire(handler, requests)
+                peak = httpx.get(stats_url).json()["peak_in_flight"]
+                print(
+                    f"{name:>18}: peak in-flight={peak:4d}  "
+                    f"wall={elapsed:6.2f}s  throughput={requests / elapsed:7.1f} q/s"
+                )
+
+        print(f"{requests} concurrent questions, backend latency {delay:.1f}s")
+        asyncio.run(run_all())
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    main(args.requests, args.delay, args.port)
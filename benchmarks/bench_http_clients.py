@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Per-request connection overhead against a local OpenAI-compatible stand-in:
+a fresh ``ChatOpenAI`` (own HTTP client, new connection every time) versus
+LLMs built on the shared keep-alive pool from ``src.http_clients``.
+
+The fake server (benchmarks/fake_llm_server.py, run in its own process)
+answers immediately by default, so the difference is connection setup.
+
+    python -m benchmarks.bench_http_clients [--requests 200] [--delay 0]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def _start_server(port: int, delay: float) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_llm_server", "--port", str(port), "--delay", str(delay)]
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats")
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("fake LLM server did not start")
+
+
+def _report(name: str, timings: list) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(0.95 * (len(timings) - 1))]
+    print(f"{name:>14}: mean={statistics.mean(timings) * 1000:7.2f}ms  "
+          f"p50={statistics.median(timings) * 1000:7.2f}ms  p95={p95 * 1000:7.2f}ms")
+
+
+def main(requests: int, delay: float, port: int) -> None:
+    server = _start_server(port, delay)
+    base_url = f"http://127.0.0.1:{port}/v1"
+    try:
+        from langchain_openai import ChatOpenAI
+        from src.http_clients import get_http_client
+
+        def fresh():
+            # what make_llm did before: every instance opens its own connections
+            llm = ChatOpenAI(base_url=base_url, api_key="dummy", model="bench-model", max_retries=0)
+            try:
+                return llm.invoke("which drugs treat asthma?")
+            finally:
+                llm.root_client.close()
+
+        def pooled():
+            llm = ChatOpenAI(base_url=base_url, api_key="dummy", model="bench-model", max_retries=0,
+                             http_client=get_http_client())
+            return llm.invoke("which drugs treat asthma?")
+
+        print(f"{requests} sequential completions, one new LLM each, backend latency {delay:.3f}s")
+        for name, call in [("fresh client", fresh), ("shared pool", pooled)]:
+            call()  # warm-up (imports, first connection)
+            timings = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                call()
+                timings.append(time.perf_counter() - start)
+            _report(name, timings)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    main(args.requests, args.delay, args.port)
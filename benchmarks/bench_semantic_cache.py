@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Lookup latency of the semantic question cache at 10k and 100k entries.
+
+    python -m benchmarks.bench_semantic_cache [--sizes 10000 100000] [--lookups 200]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from src.semantic_cache import SemanticCache
+
+_LABELS = ["drugs", "proteins", "genes", "diseases", "pathways", "tissues", "metabolites"]
+_VERBS = ["treating", "associated with", "interacting with", "detected in", "mentioned in"]
+
+
+def _question(rng: random.Random) -> str:
+    entity = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(6))
+    return f"which {rng.choice(_LABELS)} are {rng.choice(_VERBS)} {entity}?"
+
+
+def bench(size: int, lookups: int) -> None:
+    rng = random.Random(size)
+    cache = SemanticCache(max_entries=size)
+    questions = [_question(rng) for _ in range(size)]
+
+    start = time.perf_counter()
+    for q in questions:
+        cache.add(q, "MATCH (n) RETURN n LIMIT 10")
+    fill_s = time.perf_counter() - start
+
+    probes = [rng.choice(questions) if i % 2 else _question(rng) for i in range(lookups)]
+    timings = []
+    for q in probes:
+        t0 = time.perf_counter()
+        cache.lookup(q)
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    print(
+        f"{size:>7} entries  fill={fill_s:6.1f}s  "
+        f"lookup p50={statistics.median(timings):.3f}ms "
+        f"p99={timings[int(len(timings) * 0.99) - 1]:.3f}ms  hit_rate={cache.stats()['hit_rate']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    for n in args.sizes:
+        bench(n, args.lookups)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Minimal OpenAI-compatible chat-completions server for benchmarks.
+
+Every completion sleeps ``delay`` seconds (without blocking the event loop) and
+answers with a fixed Cypher query, so client-side concurrency is the only
+variable.  ``in_flight`` / ``peak_in_flight`` count concurrent requests.
+
+GET /stats and POST /stats/reset expose the counters to other processes, so
+load generators can run the server out-of-process (no shared GIL):
+
+    python -m benchmarks.fake_llm_server --port 8099 --delay 1.0
+
+Usage
+-----
+from benchmarks.fake_llm_server import FakeLLMServer
+with FakeLLMServer(delay=1.0) as server:
+    os.environ["LLAMA_BASE_URL"] = server.base_url
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = "MATCH (d:Drug)-[r:TREATS]->(x:Disease) RETURN d, r, x LIMIT 10"
+
+
+class FakeLLMServer:
+    def __init__(self, delay: float = 1.0, answer: str = ANSWER, port: int = 0):
+        self.delay = delay
+        self.answer = answer
+        self.status = 200           # set to e.g. 503 to simulate a sick replica
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.last_body: dict = {}   # last completion request, e.g. to inspect a grammar
+        self.app = FastAPI()
+        self.app.post("/v1/chat/completions")(self._complete)
+        self.app.get("/v1/models")(self._models)
+        self.app.get("/stats")(self.stats)
+        self.app.post("/stats/reset")(self.reset_stats)
+        self._sock = socket.socket()
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", port))
+        self.base_url = f"http://127.0.0.1:{self._sock.getsockname()[1]}/v1"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, log_level="warning", backlog=4096))
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [self._sock]}, daemon=True)
+
+    async def _models(self):
+        if self.status != 200:
+            return JSONResponse({"error": "unavailable"}, status_code=self.status)
+        return {"object": "list", "data": [{"id": "fake", "object": "model"}]}
+
+    async def _complete(self, request: Request):
+        body = await request.json()
+        self.last_body = body
+        self.requests += 1
+        if self.status != 200:
+            return JSONResponse({"error": {"message": "unavailable"}}, status_code=self.status)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        created = int(time.time())
+        if body.get("stream"):
+            return StreamingResponse(self._chunks(body["model"], created), media_type="text/event-stream")
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": created,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.answer},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    async def _chunks(self, model: str, created: int):
+        for i, word in enumerate(self.answer.split(" ")):
+            delta = {"content": word if i == 0 else " " + word}
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "in_flight": self.in_flight, "peak_in_flight": self.peak_in_flight}
+
+    def reset_stats(self) -> dict:
+        self.peak_in_flight = self.requests = 0
+        return self.stats()
+
+    def __enter__(self) -> "FakeLLMServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--delay", type=float, default=1.0)
+    args = parser.parse_args()
+    server = FakeLLMServer(delay=args.delay, port=args.port)
+    server._server.run(sockets=[server._sock])
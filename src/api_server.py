@@ -4,32 +4,56 @@
 FastAPI service exposing:
 
 - POST /api/ask   – runs Text2CypherAgent with selected provider
+- POST /api/ask/stream – same, streaming tokens as Server-Sent Events
+- POST /api/validate – schema/rule check of a Cypher query, with auto-fixes
+- POST /api/execute – runs a validated read-only query on Neo4j, streaming NDJSON
 - POST /api/assistant/ask  – proxies question to the OpenAI Assistant
 """
 
 import os
+import json
 import time
 import asyncio
 from pathlib import Path
 from functools import partial
-from typing import Optional, Dict
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, Optional, Dict
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 from pydantic.v1.fields import FieldInfo as FieldInfoV1
 
 from src.text2cypher_agent import Text2CypherAgent
 from src.utils import get_env_variable
-from src.schema_loader import get_schema
+from src.llm_cache import fresh_completions
+from src.schema_loader import get_schema, get_schema_version
+from src.response_cache import ResponseCache, make_cache_key, history_digest
+from src.semantic_cache import SemanticCache
+from src.template_cache import TemplateCache
+from src.single_flight import SingleFlight
+from src.cypher_validator import get_validator
+from src.backend_pool import backend_pools
+from src.query_executor import close_query_executor, get_query_executor, query_executor_stats
+from src.cypher_params import prepare
 
 load_dotenv()
 print("envloaded", LLAMA_MODEL:=os.getenv("LLAMA_MODEL"))
 
 # ── FastAPI app ───────────────────────────────────────────────────
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    probes = asyncio.create_task(_probe_backends()) if _BACKEND_HEALTH_INTERVAL > 0 else None
+    yield
+    if probes:
+        probes.cancel()
+    close_query_executor()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # ── CORS middleware ─────────────────────────────────────────────────
 # Get allowed origins from environment variable
@@ -78,10 +102,40 @@ def get_or_create_agent() -> Text2CypherAgent:
         _AGENT = Text2CypherAgent(provider="llama")
     return _AGENT
 
+# ── Response cache ─────────────────────────────────────────────
+_RESPONSE_CACHE = ResponseCache(
+    max_entries=int(get_env_variable("RESPONSE_CACHE_SIZE", "1024")),
+    ttl_seconds=float(get_env_variable("RESPONSE_CACHE_TTL", "3600")),
+)
+# How many trailing history messages make a cached answer context-specific
+_CACHE_CONTEXT_MESSAGES = int(get_env_variable("RESPONSE_CACHE_CONTEXT_MESSAGES", "2"))
+# Near-duplicate questions ("drugs treating X" / "which drugs treat X?")
+_SEMANTIC_CACHE = SemanticCache(
+    threshold=float(get_env_variable("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+    max_entries=int(get_env_variable("SEMANTIC_CACHE_SIZE", "10000")),
+    vocabulary=[*get_schema().get("NodeTypes", {}), *get_schema().get("RelationshipTypes", {})],
+)
+# Same question shape, different entity values -> refill the learnt Cypher
+_TEMPLATE_CACHE = TemplateCache(max_templates=int(get_env_variable("TEMPLATE_CACHE_SIZE", "2048")))
+# Identical questions already being answered share that completion
+_IN_FLIGHT = SingleFlight()
+
+_BACKEND_HEALTH_INTERVAL = float(get_env_variable("LLM_BACKEND_HEALTH_INTERVAL", "5"))
+
+
+async def _probe_backends() -> None:
+    """Bring recovered LLM replicas back into rotation without waiting for traffic."""
+    while True:
+        await asyncio.sleep(_BACKEND_HEALTH_INTERVAL)
+        for pool in backend_pools().values():
+            await pool.acheck()
+
 # ── request models ────────────────────────────────────────────────────
 class QueryRequest(BaseModel):
     query: str
-    #session_id: str  # Used for assistant threads only
+    session_id: str = "default"  # conversation memory is kept per session
+    use_cache: bool = True  # False forces a fresh LLM answer (and refreshes the cache)
+    candidates: Optional[int] = Field(None, ge=1, le=16)  # >1: sample k queries, keep the cheapest plan
     #provider: Optional[str] = "openai"  # "openai" or "google"
 
     @field_validator('query')
@@ -91,10 +145,18 @@ class QueryRequest(BaseModel):
             raise ValueError('Query cannot be empty')
         return v.strip()
 
-'''
 class SessionRequest(BaseModel):
-    session_id: str
-''' 
+    session_id: str = "default"
+
+class ValidateRequest(BaseModel):
+    cypher: str
+    fix: bool = True  # apply the deterministic auto-fixes
+
+class ExecuteRequest(BaseModel):
+    cypher: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+    use_cache: bool = True  # re-serve a recent identical result from memory
+
 
 '''
 # --------------------------------------------------------------------
@@ -279,35 +341,251 @@ async def fetch_schema():
 
 
 # ── Text-to-Cypher Agent ───────────────────────────────────────
-@app.post("/api/ask", tags=["llm-agent"])
-async def ask_llm_agent(req: QueryRequest):
+def _cache_context(agent: Text2CypherAgent, req: QueryRequest,
+                   candidates: Optional[int] = None) -> tuple[str, str]:
+    """Return the exact-cache key and the template/semantic namespace for ``req``.
+
+    An explicit ``candidates`` count selects the answer differently, so it
+    gets its own keys (and its own single-flight group).
+    """
+    history = agent.get_history(req.session_id)
+    schema_version = get_schema_version()
+    cache_key = make_cache_key(req.query, schema_version, history, _CACHE_CONTEXT_MESSAGES)
+    namespace = f"{schema_version}:{history_digest(history, _CACHE_CONTEXT_MESSAGES)}"
+    if candidates:
+        cache_key, namespace = f"{cache_key}:k{candidates}", f"{namespace}:k{candidates}"
+    return cache_key, namespace
+
+
+def _cached_answer(req: QueryRequest, cache_key: str, namespace: str) -> Optional[dict]:
+    """Look ``req`` up in the exact, template and semantic caches, in that order."""
+    cached = _RESPONSE_CACHE.get(cache_key)
+    if cached is not None:
+        return {"answer": cached, "cached": True}
+    filled = _TEMPLATE_CACHE.lookup(req.query, namespace)
+    if filled is not None:
+        _RESPONSE_CACHE.set(cache_key, filled)
+        return {"answer": filled, "cached": True, "template": True}
+    similar = _SEMANTIC_CACHE.lookup(req.query, namespace)
+    if similar is not None:
+        cached, similarity = similar
+        _RESPONSE_CACHE.set(cache_key, cached)
+        return {"answer": cached, "cached": True, "similarity": round(similarity, 4)}
+    return None
+
+
+def _remember_answer(req: QueryRequest, cache_key: str, namespace: str, cypher: str) -> None:
+    if cypher:
+        _RESPONSE_CACHE.set(cache_key, cypher)
+        _SEMANTIC_CACHE.add(req.query, cypher, namespace)
+        _TEMPLATE_CACHE.learn(req.query, cypher, namespace)
+
+
+NDJSON = "application/x-ndjson"
+
+
+def _execute_stream(cypher: str, head: dict, params: Optional[dict] = None,
+                    use_cache: bool = True) -> StreamingResponse:
+    """Stream ``cypher``'s records after a first line carrying ``head``."""
     try:
-        agent = get_or_create_agent()
-        cypher = await run_in_threadpool(
-            agent.respond,
-            req.query
-        )
+        executor = get_query_executor()
+    except EnvironmentError as e:
+        raise HTTPException(status_code=503, detail=f"Query execution is not configured: {e}")
+    return StreamingResponse(executor.stream(cypher, params, head=head, use_cache=use_cache), media_type=NDJSON)
 
-        return {"answer": cypher}
+
+async def _ask(req: QueryRequest) -> dict:
+    try:
+        agent = get_or_create_agent()
+        cache_key, namespace = _cache_context(agent, req, req.candidates)
+        if req.use_cache:
+            hit = _cached_answer(req, cache_key, namespace)
+            if hit is not None:
+                agent.add_to_history(req.query, hit["answer"], req.session_id)
+                return hit
+
+        async def generate():
+            # The shared call outlives a cancelled leader: history is recorded
+            # below, only by callers that actually receive the answer.
+            answer = await agent.aanswer(req.query, req.session_id, req.candidates, remember=False)
+            if answer.ok:  # never serve a query that failed validation from cache
+                _remember_answer(req, cache_key, namespace, answer.cypher)
+            return answer
+
+        if not req.use_cache:
+            with fresh_completions():  # nor from the completion cache under the agent
+                answer = await generate()
+            agent.add_to_history(req.query, answer.cypher, req.session_id)
+            return {"answer": answer.cypher, "cached": False, **answer.report()}
+
+        # Same key == same question, schema version and recent context
+        answer, leader = await _IN_FLIGHT.do(cache_key, generate)
+        agent.add_to_history(req.query, answer.cypher, req.session_id)
+        if not leader:
+            return {"answer": answer.cypher, "cached": False, "coalesced": True, **answer.report()}
+        return {"answer": answer.cypher, "cached": False, **answer.report()}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@app.post("/api/ask", tags=["llm-agent"])
+async def ask_llm_agent(req: QueryRequest, execute: bool = False):
+    """Generate Cypher for ``req.query``; ``?execute=true`` also runs it and streams the records as NDJSON.
+
+    ``answer`` is the query as generated; ``cypher`` and ``params`` are the
+    same query with its literals lifted into parameters, as it is executed.
+    """
+    result = _with_params(await _ask(req))
+    if not execute:
+        return result
+    if not result.get("valid", True):
+        # never run a query that failed validation
+        return StreamingResponse(iter([json.dumps({**result, "error": "query failed validation; not executed"}) + "\n"]),
+                                 media_type=NDJSON)
+    return _execute_stream(result["cypher"], result, result["params"], req.use_cache)
+
+
+def _with_params(result: dict) -> dict:
+    """Add the parameterized form of ``result["answer"]`` (``cypher``, ``params``) - what gets executed."""
+    answer = result.get("answer")
+    return {**result, **prepare(answer).as_dict()} if answer else result
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/ask/stream", tags=["llm-agent"])
+async def ask_llm_agent_stream(req: QueryRequest):
+    """Stream the completion as SSE: ``token`` events, then ``done`` with the cleaned answer."""
+    agent = get_or_create_agent()
+    cache_key, namespace = _cache_context(agent, req)
+
+    async def events():
+        if req.use_cache:
+            hit = _cached_answer(req, cache_key, namespace)
+            if hit is not None:
+                agent.add_to_history(req.query, hit["answer"], req.session_id)
+                yield _sse("done", _with_params(hit))
+                return
+        parts = []
+        # use_cache=false: nor from the completion cache under the agent
+        fresh = nullcontext() if req.use_cache else fresh_completions()
+        try:
+            with fresh:
+                answer = agent.fast_answer(req.query, req.session_id)
+                if answer is not None:  # no completion to stream
+                    _remember_answer(req, cache_key, namespace, answer.cypher)
+                    yield _sse("done", _with_params({"answer": answer.cypher, "cached": False, **answer.report()}))
+                    return
+                prompts = agent.question_prompts(req.query)  # resolved once for both calls
+                async for text in agent.astream(req.query, req.session_id, prompts):
+                    parts.append(text)
+                    yield _sse("token", {"text": text})
+                # validation and any repair turns happen after the raw tokens
+                answer = await agent.afinalize(req.query, "".join(parts), req.session_id, prompts=prompts)
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+        if answer.ok:
+            _remember_answer(req, cache_key, namespace, answer.cypher)
+        yield _sse("done", _with_params({"answer": answer.cypher, "cached": False, **answer.report()}))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/validate", tags=["llm-agent"])
+async def validate_cypher(req: ValidateRequest):
+    """Check Cypher against the loaded schema and the generation rules (no database call)."""
+    result = get_validator().validate(req.cypher, fix=req.fix)
+    return {"cypher": result.cypher, **result.as_dict()}
+
+
+@app.post("/api/execute", tags=["llm-agent"])
+async def execute_cypher(req: ExecuteRequest):
+    """Validate ``req.cypher`` (read-only, schema) and stream its records from Neo4j as NDJSON.
+
+    Literals are lifted into parameters (merged with ``req.params``) before
+    the query is sent; the first line reports the ``cypher`` and ``params`` run.
+    """
+    result = get_validator().validate(req.cypher)
+    if not result.ok:
+        raise HTTPException(status_code=400, detail=result.as_dict())
+    query = prepare(result.cypher, req.params)
+    return _execute_stream(query.cypher, query.as_dict(), query.params, req.use_cache)
+
+
+@app.get("/api/execute/stats", tags=["ops"])
+async def execute_stats():
+    """Executed queries, rows, failures, pool settings and result cache (``null`` until the first query)."""
+    return query_executor_stats()
+
+
+@app.get("/api/agent/stats", tags=["ops"])
+async def agent_stats():
+    """Cascade tier hit rates/latencies, hedging, repair, prompt prefix, candidate, fast-path and entity counters."""
+    agent = get_or_create_agent()
+    return {
+        "cascade": agent.cascade.stats(),
+        "hedge": agent.hedge.stats() if agent.hedge else None,
+        "repairs": agent.repair_stats.stats(),
+        "prompt_prefix": agent.prefix_tracker.stats(),
+        "candidates": agent.candidate_stats(),
+        "fast_path": agent.fast_path_stats(),
+        "entities": agent.entity_stats(),
+    }
+
+
+@app.get("/api/backends/stats", tags=["ops"])
+async def backend_stats():
+    """Per-replica health, load and EWMA latency of pooled LLM backends."""
+    return {name: pool.stats() for name, pool in backend_pools().items()}
+
+
+@app.get("/api/cache/stats", tags=["ops"])
+async def response_cache_stats():
+    return {
+        "exact": _RESPONSE_CACHE.stats(),
+        "template": _TEMPLATE_CACHE.stats(),
+        "semantic": _SEMANTIC_CACHE.stats(),
+        "single_flight": _IN_FLIGHT.stats(),
+    }
+
+
+@app.post("/api/cache/rebuild", tags=["ops"])
+async def rebuild_semantic_cache():
+    """Re-embed the semantic index, dropping entries from older schema versions."""
+    version = get_schema_version()
+    size = await run_in_threadpool(
+        _SEMANTIC_CACHE.rebuild, keep=lambda ns: ns.startswith(version + ":")
+    )
+    return {"status": "rebuilt", "size": size}
+
 # ───────────────────────────────────────────────────────────────
 # Chat history
 # ───────────────────────────────────────────────────────────────
 @app.get("/api/history", tags=["shared"])
-async def get_shared_history():
+async def get_shared_history(session_id: str = "default"):
     agent = get_or_create_agent()
-    return {"history": agent.get_history()}
+    return {"history": agent.get_history(session_id)}
 
 @app.post("/api/clear", tags=["shared"])
-async def clear_shared_history():
+async def clear_shared_history(req: Optional[SessionRequest] = None):
     agent = get_or_create_agent()
-    agent.clear_history()
+    agent.clear_history((req or SessionRequest()).session_id)
     return {"status": "cleared"}
 
 
+@app.get("/api/sessions/stats", tags=["ops"])
+async def session_stats():
+    return get_or_create_agent().session_stats()
+
+
 # ── Serve UI in production ─────────────────────────────────────
 if os.getenv("NODE_ENV") == "production":
     from fastapi.staticfiles import StaticFiles
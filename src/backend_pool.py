@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+backend_pool.py
+Spread LLM calls over several OpenAI-compatible replicas of one provider.
+
+Each request goes to the healthy replica with the lowest expected wait: its
+EWMA latency times (in-flight requests + 1), or just the fewest in flight with
+``strategy="least_loaded"``.  Replicas that fail ``max_failures`` times in a row
+(connection errors, timeouts, 5xx) leave the rotation for ``cooldown``
+seconds; after that one trial request - or a ``GET /models`` health probe -
+brings them back.
+
+The pool plugs in at the HTTP layer: :class:`PoolTransport` rewrites requests
+addressed to :data:`POOL_BASE_URL` to the chosen replica, so one ChatOpenAI
+instance (and one LLM cache key) covers the whole pool.
+
+Usage
+-----
+from backend_pool import get_backend_pool, pooled_clients, POOL_BASE_URL
+pool = get_backend_pool("llama", ["http://gpu1:8080/v1", "http://gpu2:8080/v1"])
+client, async_client = pooled_clients(pool)
+ChatOpenAI(base_url=POOL_BASE_URL, http_client=client, http_async_client=async_client, ...)
+pool.stats()        # per-replica {healthy, in_flight, requests, failures, ewma_ms, ...}
+"""
+
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from src.http_clients import shared_async_transport, shared_transport
+
+logger = logging.getLogger(__name__)
+
+# Virtual base URL handed to the OpenAI client; the transport swaps it for a replica's
+POOL_BASE_URL = "http://backend-pool"
+
+STRATEGIES = ("ewma", "least_loaded")
+
+
+def parse_urls(spec: str) -> List[str]:
+    """Split a comma-separated ``LLAMA_BASE_URL`` into base URLs."""
+    return [url.strip().rstrip("/") for url in spec.split(",") if url.strip()]
+
+
+class Backend:
+    """One replica and what the pool has observed about it."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ewma: Optional[float] = None   # seconds; None until the first success
+        self.healthy = True
+        self.retry_at = 0.0                 # when an unhealthy replica may be tried again
+        self.last_error = ""
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ewma_ms": round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class BackendPool:
+    """Thread-safe replica selection, latency tracking and health state."""
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        strategy: str = "ewma",
+        alpha: float = 0.3,
+        max_failures: int = 2,
+        cooldown: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not urls:
+            raise ValueError("a backend pool needs at least one URL")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        self.backends = [Backend(url) for url in urls]
+        self.strategy = strategy
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    # ── routing ───────────────────────────────────────────────────────
+    def _score(self, backend: Backend) -> Tuple[float, ...]:
+        if self.strategy == "least_loaded":
+            return (backend.in_flight, backend.ewma or 0.0)
+        # Unmeasured replicas score 0 so each gets a first request
+        return ((backend.ewma or 0.0) * (backend.in_flight + 1), backend.in_flight)
+
+    def acquire(self, exclude: Sequence[Backend] = ()) -> Backend:
+        """Pick a replica for one request and count it as in flight.
+
+        When every replica is out of rotation, the one due back soonest is
+        used anyway: a request with a chance beats an immediate error.
+        """
+        with self._lock:
+            now = self._clock()
+            candidates = [b for b in self.backends if b not in exclude] or self.backends
+            usable = [b for b in candidates if b.healthy]
+            # Half-open: an unhealthy replica whose cooldown ran out gets one trial
+            trial = [b for b in candidates if not b.healthy and b.retry_at <= now]
+            if trial:
+                backend = trial[0]
+                backend.retry_at = now + self.cooldown
+            elif usable:
+                backend = min(usable, key=self._score)
+            else:
+                backend = min(candidates, key=lambda b: b.retry_at)
+            backend.in_flight += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend: Backend, seconds: float, ok: bool, error: str = "") -> None:
+        """Record the outcome of a request started with :meth:`acquire`."""
+        with self._lock:
+            backend.in_flight -= 1
+            if ok:
+                self._mark_up(backend)
+                backend.ewma = seconds if backend.ewma is None else (
+                    self.alpha * seconds + (1 - self.alpha) * backend.ewma)
+            else:
+                self._mark_down(backend, error)
+
+    def abandon(self, backend: Backend) -> None:
+        """Drop a request the caller gave up on; says nothing about the replica."""
+        with self._lock:
+            backend.in_flight -= 1
+
+    def _mark_up(self, backend: Backend) -> None:
+        if not backend.healthy:
+            logger.info("backend %s is back in rotation", backend.url)
+        backend.healthy = True
+        backend.consecutive_failures = 0
+
+    def _mark_down(self, backend: Backend, error: str) -> None:
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        backend.last_error = error
+        if backend.consecutive_failures >= self.max_failures or not backend.healthy:
+            if backend.healthy:
+                logger.warning("backend %s out of rotation: %s", backend.url, error)
+            backend.healthy = False
+            backend.retry_at = self._clock() + self.cooldown
+
+    # ── health probes ─────────────────────────────────────────────────
+    def _due(self) -> List[Backend]:
+        with self._lock:
+            now = self._clock()
+            return [b for b in self.backends if not b.healthy and b.retry_at <= now]
+
+    def _probed(self, backend: Backend, error: str) -> None:
+        with self._lock:
+            if error:
+                self._mark_down(backend, error)
+            else:
+                self._mark_up(backend)
+
+    def check(self, client: Optional[httpx.Client] = None, timeout: float = 2.0) -> None:
+        """Probe out-of-rotation replicas whose cooldown ran out."""
+        http = client or httpx.Client(timeout=timeout)
+        try:
+            for backend in self._due():
+                try:
+                    error = _probe_error(http.get(backend.url + "/models"))
+                except httpx.HTTPError as e:
+                    error = repr(e)
+                self._probed(backend, error)
+        finally:
+            if client is None:
+                http.close()
+
+    async def acheck(self, client: Optional[httpx.AsyncClient] = None, timeout: float = 2.0) -> None:
+        """Async :meth:`check`."""
+        http = client or httpx.AsyncClient(timeout=timeout)
+        try:
+            for backend in self._due():
+                try:
+                    error = _probe_error(await http.get(backend.url + "/models"))
+                except httpx.HTTPError as e:
+                    error = repr(e)
+                self._probed(backend, error)
+        finally:
+            if client is None:
+                await http.aclose()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [b.snapshot() for b in self.backends]
+
+
+def _probe_error(response: httpx.Response) -> str:
+    return f"HTTP {response.status_code}" if response.status_code >= 500 else ""
+
+
+# ── HTTP transports ───────────────────────────────────────────────────
+def _route(request: httpx.Request, backend: Backend, path: str) -> httpx.Request:
+    """Re-address a request made against POOL_BASE_URL to ``backend``."""
+    request.url = httpx.URL(backend.url + path)
+    request.headers["host"] = request.url.netloc.decode("ascii")
+    return request
+
+
+class _Tracked:
+    """Releases the replica once the response body is fully read or closed."""
+
+    def __init__(self, pool: BackendPool, backend: Backend, start: float, ok: bool, error: str):
+        self.pool, self.backend, self.start, self.ok, self.error = pool, backend, start, ok, error
+        self._done = False
+
+    def finish(self) -> None:
+        if not self._done:
+            self._done = True
+            self.pool.release(self.backend, time.monotonic() - self.start, self.ok, self.error)
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, tracked: _Tracked):
+        self.stream, self.tracked = stream, tracked
+
+    def __iter__(self):
+        yield from self.stream
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        finally:
+            self.tracked.finish()
+
+
+class _AsyncTrackedStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, tracked: _Tracked):
+        self.stream, self.tracked = stream, tracked
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            self.tracked.finish()
+
+
+def _outcome(response: httpx.Response) -> Tuple[bool, str]:
+    error = _probe_error(response)
+    return not error, error
+
+
+class PoolTransport(httpx.BaseTransport):
+    """Sends each request to the replica :class:`BackendPool` picks.
+
+    A replica that refuses the connection is skipped for the next one;
+    anything later (timeouts, 5xx) is left to the OpenAI client's retries,
+    which pass through here again and may land elsewhere.
+    """
+
+    def __init__(self, pool: BackendPool, transport: Optional[httpx.BaseTransport] = None):
+        self.pool = pool
+        self._owned = transport is None     # a shared pool outlives this transport
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tried: List[Backend] = []
+        path = request.url.raw_path.decode("ascii")
+        while True:
+            backend = self.pool.acquire(exclude=tried)
+            start = time.monotonic()
+            try:
+                response = self.transport.handle_request(_route(request, backend, path))
+            except httpx.ConnectError as e:
+                self.pool.release(backend, time.monotonic() - start, False, repr(e))
+                tried.append(backend)
+                if len(tried) < len(self.pool.backends):
+                    continue
+                raise
+            except Exception as e:
+                self.pool.release(backend, time.monotonic() - start, False, repr(e))
+                raise
+            tracked = _Tracked(self.pool, backend, start, *_outcome(response))
+            return httpx.Response(
+                response.status_code, headers=response.headers,
+                stream=_TrackedStream(response.stream, tracked), extensions=response.extensions,
+            )
+
+    def close(self) -> None:
+        if self._owned:
+            self.transport.close()
+
+
+class AsyncPoolTransport(httpx.AsyncBaseTransport):
+    """Async :class:`PoolTransport`."""
+
+    def __init__(self, pool: BackendPool, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.pool = pool
+        self._owned = transport is None
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tried: List[Backend] = []
+        path = request.url.raw_path.decode("ascii")
+        while True:
+            backend = self.pool.acquire(exclude=tried)
+            start = time.monotonic()
+            try:
+                response = await self.transport.handle_async_request(_route(request, backend, path))
+            except httpx.ConnectError as e:
+                self.pool.release(backend, time.monotonic() - start, False, repr(e))
+                tried.append(backend)
+                if len(tried) < len(self.pool.backends):
+                    continue
+                raise
+            except asyncio.CancelledError:
+                self.pool.abandon(backend)
+                raise
+            except Exception as e:
+                self.pool.release(backend, time.monotonic() - start, False, repr(e))
+                raise
+            tracked = _Tracked(self.pool, backend, start, *_outcome(response))
+            return httpx.Response(
+                response.status_code, headers=response.headers,
+                stream=_AsyncTrackedStream(response.stream, tracked), extensions=response.extensions,
+            )
+
+    async def aclose(self) -> None:
+        if self._owned:
+            await self.transport.aclose()
+
+
+# ── process-wide pools ────────────────────────────────────────────────
+_POOLS: Dict[str, BackendPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_backend_pool(name: str, urls: Sequence[str], **options) -> BackendPool:
+    """Return the pool called ``name``, creating it on first use.
+
+    Agents built later (new provider, schema reload) share the replica
+    statistics gathered so far.
+    """
+    with _POOLS_LOCK:
+        pool = _POOLS.get(name)
+        if pool is None or [b.url for b in pool.backends] != [u.rstrip("/") for u in urls]:
+            pool = _POOLS[name] = BackendPool(urls, **options)
+        return pool
+
+
+def backend_pools() -> Dict[str, BackendPool]:
+    with _POOLS_LOCK:
+        return dict(_POOLS)
+
+
+def pooled_clients(pool: BackendPool, timeout: Optional[float] = None) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Return sync and async httpx clients that route through ``pool``.
+
+    Connections come from the process-wide pools in :mod:`src.http_clients`.
+    """
+    return (
+        httpx.Client(transport=PoolTransport(pool, shared_transport()), timeout=timeout),
+        httpx.AsyncClient(transport=AsyncPoolTransport(pool, shared_async_transport()), timeout=timeout),
+    )
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+candidate_selection.py
+Generate several Cypher candidates for one question at once, drop the ones
+that fail schema validation and keep the one with the cheapest plan.
+
+Spending k LLM calls up front is cheaper than running a bad traversal on
+Neo4j.  Candidates come from a sampling (temperature > 0, uncached) model so
+they differ, and are costed by:
+
+- ``ExplainPlanCost``: Neo4j ``EXPLAIN`` (no execution), summing the
+  planner's estimated rows over all operators, when ``DB_URL`` is set;
+- ``SchemaPlanCost``: a local heuristic over the schema graph otherwise -
+  estimated rows from the anchor node through every hop, with unfiltered
+  label scans, untyped or undirected hops and cartesian products expensive.
+
+    CYPHER_CANDIDATES=3                 # k; 1 (default) turns it off
+    CYPHER_CANDIDATE_TEMPERATURE=0.7
+    CYPHER_CANDIDATE_COST=auto          # auto | explain | schema
+
+Usage
+-----
+from candidate_selection import CandidateSelector, get_plan_cost
+selector = CandidateSelector(prompt | sampling_llm, agent.check, get_plan_cost())
+result, cost = await selector.ainvoke(inputs, k=3)
+"""
+
+from __future__ import annotations
+import asyncio
+import contextlib
+import logging
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import Runnable
+
+from src.cypher_params import prepare
+from src.cypher_validator import CypherValidator, Token, ValidationResult, get_validator, tokenize
+from src.utils import get_env_variable
+
+logger = logging.getLogger(__name__)
+
+# Heuristic row estimates - only their ratios matter
+LABEL_ROWS = 10_000.0       # nodes behind an unfiltered label scan
+FILTERED_ROWS = 100.0       # nodes left after a WHERE filter on the variable
+INLINE_ROWS = 1.0           # nodes matched by an inline {prop: value} map
+FANOUT = 10.0               # relationships per node and type
+_CLAUSE_ENDS = {"MATCH", "OPTIONAL", "RETURN", "WITH", "UNWIND", "ORDER", "LIMIT"}
+
+
+def _filtered_vars(toks: List[Token]) -> Set[str]:
+    """Variables whose properties are tested in a WHERE clause."""
+    filtered, in_where = set(), False
+    for i, tok in enumerate(toks):
+        word = tok.keyword()
+        if word == "WHERE":
+            in_where = True
+        elif word in _CLAUSE_ENDS:
+            in_where = False
+        elif in_where and tok.kind == "name" and i + 1 < len(toks) and toks[i + 1].text == ".":
+            filtered.add(tok.value)
+    return filtered
+
+
+class SchemaPlanCost:
+    """Estimated rows touched by a query, from its patterns and the schema graph."""
+
+    name = "schema"
+
+    def __init__(self, validator: Optional[CypherValidator] = None):
+        self.validator = validator or get_validator()
+
+    def _fanout(self, rel) -> float:
+        if rel.types:
+            per_node = FANOUT * sum(max(1, len(self.validator.rel_pairs.get(t, ()))) for t in rel.types)
+        else:
+            per_node = FANOUT * max(1, len(self.validator.rel_pairs))
+        if rel.direction == "-":
+            per_node *= 2
+        if rel.variable_length:
+            per_node **= 3
+        return per_node
+
+    def __call__(self, cypher: str) -> float:
+        toks = tokenize(cypher)
+        filtered = _filtered_vars(toks)
+        bound: Set[str] = set()
+        rows, cost = 1.0, 0.0
+        for chain in self.validator.path_chains(toks):
+            nodes, rels = chain[0::2], chain[1::2]
+            joined = bool(bound) and any(n.var in bound for n in nodes if n.var)
+            starts = []
+            for node in nodes:
+                if node.var in bound:
+                    starts.append(rows)
+                elif node.keys:
+                    starts.append(INLINE_ROWS)
+                elif node.var in filtered:
+                    starts.append(FILTERED_ROWS)
+                else:
+                    starts.append(LABEL_ROWS * (len(node.labels) or len(self.validator.labels)))
+            # Expand from the cheapest node; filters further along cut the rows
+            anchor = min(range(len(nodes)), key=starts.__getitem__)
+            chain_rows = work = starts[anchor]
+            for rel in rels:
+                chain_rows *= self._fanout(rel)
+                work += chain_rows
+            for i, start in enumerate(starts):
+                if i != anchor and start < LABEL_ROWS:
+                    chain_rows *= start / LABEL_ROWS
+            if bound and not joined:  # cartesian product with everything matched so far
+                work *= rows
+                chain_rows *= rows
+            rows = max(chain_rows, 1.0)
+            cost += work
+            bound.update(n.var for n in nodes if n.var)
+        return cost
+
+
+class ExplainPlanCost:
+    """Neo4j's own estimate: ``EXPLAIN`` the query and sum ``EstimatedRows`` over the plan."""
+
+    name = "explain"
+
+    def __init__(self, driver, database: Optional[str] = None):
+        self.driver = driver
+        self.database = database
+
+    @staticmethod
+    def estimated_rows(plan: Optional[Dict[str, Any]]) -> float:
+        if not plan:
+            return math.inf
+        args = plan.get("args") or plan.get("arguments") or {}
+        return float(args.get("EstimatedRows", 0.0)) + sum(
+            ExplainPlanCost.estimated_rows(child) for child in plan.get("children", [])
+        )
+
+    def __call__(self, cypher: str) -> float:
+        query = prepare(cypher)  # plan what will run: the parameterized query
+        with self.driver.session(database=self.database) as session:
+            plan = session.run("EXPLAIN " + query.cypher, query.params).consume().plan
+        return self.estimated_rows(plan)
+
+
+def get_plan_cost() -> Callable[[str], float]:
+    """``ExplainPlanCost`` when a database is configured (``DB_URL``), else ``SchemaPlanCost``."""
+    mode = get_env_variable("CYPHER_CANDIDATE_COST", "auto").lower()
+    uri = get_env_variable("DB_URL", "")
+    if mode == "schema" or (mode == "auto" and not uri):
+        return SchemaPlanCost()
+    if mode not in ("auto", "explain"):
+        raise ValueError(f"Unknown CYPHER_CANDIDATE_COST: {mode}")
+
+    from src.query_executor import get_query_executor
+
+    # Plan on the process-wide pooled driver: rebuilding the agent opens no new one
+    executor = get_query_executor()
+    return ExplainPlanCost(executor.driver, executor.database)
+
+
+class CandidateStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.questions = 0
+        self.generated = 0      # candidates that came back from the model
+        self.failed = 0         # candidate calls that raised
+        self.valid = 0          # candidates that passed validation
+        self.distinct = 0       # distinct valid queries costed
+        self.no_valid = 0       # questions where every candidate failed validation
+
+    def record(self, generated: int, failed: int, valid: int, distinct: int) -> None:
+        with self._lock:
+            self.questions += 1
+            self.generated += generated
+            self.failed += failed
+            self.valid += valid
+            self.distinct += distinct
+            self.no_valid += valid == 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "questions": self.questions,
+                "generated": self.generated,
+                "failed": self.failed,
+                "valid": self.valid,
+                "distinct": self.distinct,
+                "no_valid": self.no_valid,
+                "valid_rate": round(self.valid / self.generated, 4) if self.generated else 0.0,
+            }
+
+
+class CandidateSelector:
+    """Runs ``runnable`` k times concurrently and keeps the cheapest valid answer.
+
+    When no candidate validates, the first one is returned (invalid) so the
+    caller can still repair it.  A cost function that raises (e.g. ``EXPLAIN``
+    rejects the query) drops that candidate.
+    """
+
+    def __init__(
+        self,
+        runnable: Runnable,
+        check: Callable[[str], ValidationResult],
+        cost: Callable[[str], float],
+        k: int = 3,
+    ):
+        self.runnable = runnable
+        self.check = check
+        self.cost = cost
+        self.k = k
+        self._stats = CandidateStats()
+
+    def _score(self, cypher: str) -> float:
+        try:
+            return self.cost(cypher)
+        except Exception as e:
+            logger.info("candidate dropped, plan cost failed: %s", e)
+            return math.inf
+
+    def _validate(self, outputs: Sequence[Any]) -> List[ValidationResult]:
+        """Validate the texts among ``outputs``; re-raise when every call failed."""
+        texts = [o for o in outputs if isinstance(o, str)]
+        if not texts:
+            raise next(o for o in outputs if isinstance(o, BaseException))
+        return [self.check(t) for t in texts]
+
+    def _pick(self, results: List[ValidationResult], failed: int, costs: Dict[str, float]) -> Tuple[ValidationResult, Optional[float]]:
+        valid = {r.cypher: r for r in results if r.ok}
+        self._stats.record(len(results), failed, sum(r.ok for r in results), len(valid))
+        ranked = sorted((c, cypher) for cypher, c in costs.items() if c < math.inf)
+        if not ranked:  # nothing could be costed: any valid candidate beats an invalid one
+            return next(iter(valid.values()), results[0]), None
+        cost, cypher = ranked[0]
+        logger.info("candidates: %d distinct valid of %d, chose plan cost %.1f",
+                    len(valid), len(results) + failed, cost)
+        return valid[cypher], cost
+
+    def invoke(self, inputs: Dict[str, Any], k: Optional[int] = None) -> Tuple[ValidationResult, Optional[float]]:
+        """Return ``(validation result, plan cost)``; the cost is ``None`` when nothing valid was costed."""
+        outputs = self.runnable.batch([inputs] * (k or self.k), return_exceptions=True)
+        outputs = [o if isinstance(o, BaseException) else o.content for o in outputs]
+        results = self._validate(outputs)
+        valid = dict.fromkeys(r.cypher for r in results if r.ok)
+        return self._pick(results, len(outputs) - len(results), {c: self._score(c) for c in valid})
+
+    async def ainvoke(self, inputs: Dict[str, Any], k: Optional[int] = None, slots=None) -> Tuple[ValidationResult, Optional[float]]:
+        """Async :meth:`invoke`; each call holds ``slots`` (a semaphore) while in flight."""
+
+        async def one():
+            async with slots or contextlib.nullcontext():
+                return (await self.runnable.ainvoke(inputs)).content
+
+        outputs = await asyncio.gather(*(one() for _ in range(k or self.k)), return_exceptions=True)
+        results = self._validate(outputs)
+        valid = list(dict.fromkeys(r.cypher for r in results if r.ok))
+        # EXPLAIN is a blocking database call: cost the candidates in threads, concurrently
+        scores = await asyncio.gather(*(asyncio.to_thread(self._score, c) for c in valid))
+        return self._pick(results, len(outputs) - len(results), dict(zip(valid, scores)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"k": self.k, "cost_model": getattr(self.cost, "name", "custom"), **self._stats.snapshot()}
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+cypher_grammar.py
+A GBNF grammar, generated from the schema, that constrains what the llama
+backend can decode to the Cypher subset the agent accepts.
+
+Labels, relationship types and property names are limited to the schema's
+vocabulary, the clauses to MATCH / OPTIONAL MATCH / WHERE / RETURN / LIMIT,
+every relationship gets a variable, variable-length paths and lists inside
+patterns cannot be written, and prose or markdown fences are impossible.  The
+model therefore stops as soon as the query is complete and every answer
+parses, which saves decode time and repair round trips.
+
+The grammar rides along in the request body of OpenAI-compatible servers
+that accept one:
+
+    CYPHER_GRAMMAR=gbnf                 # off by default
+    CYPHER_GRAMMAR_PARAM=grammar        # llama.cpp server; guided_grammar for vLLM
+
+python -m src.cypher_grammar        # print the grammar for NEO4J_SCHEMA_PATH
+
+Usage
+-----
+from cypher_grammar import grammar_request_body
+ChatOpenAI(..., extra_body=grammar_request_body())
+"""
+
+from __future__ import annotations
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.schema_loader import get_schema, relationship_endpoints
+from src.schema_prompt import _is_excluded, excluded_properties
+from src.utils import get_env_variable
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+
+# Everything except the schema vocabulary (label, reltype, prop rules)
+_CYPHER_RULES = r"""
+root ::= ows query ows
+query ::= match (ws match)* ws return ws limit
+match ::= ("OPTIONAL" ws)? "MATCH" ws pattern (ows "," ows pattern)* (ws where)?
+pattern ::= (var ows "=" ows)? node (ows rel ows node)*
+node ::= "(" ows var? (ows ":" ows label)? (ows props)? ows ")"
+rel ::= ("<-" | "-") "[" ows var ows (":" ows reltype (ows "|" ows ":"? ows reltype)*)? (ows props)? ows "]" ("->" | "-")
+props ::= "{" ows prop ows ":" ows scalar (ows "," ows prop ows ":" ows scalar)* ows "}"
+where ::= "WHERE" ws expr
+expr ::= conj (ws ("OR" | "XOR") ws conj)*
+conj ::= pred (ws "AND" ws pred)*
+pred ::= ("NOT" ws)? operand (ows cmp ows operand | ws "IN" ws operand | ws textop ws operand | ws "IS" ws ("NOT" ws)? "NULL")?
+cmp ::= "=~" | "<>" | "<=" | ">=" | "=" | "<" | ">"
+textop ::= "CONTAINS" | "STARTS" ws "WITH" | "ENDS" ws "WITH"
+operand ::= "(" ows expr ows ")" | call | access | scalar | list | var
+call ::= ident ows "(" ows ("*" | ("DISTINCT" ws)? expr (ows "," ows expr)*)? ows ")"
+access ::= var "." prop
+list ::= "[" ows (expr (ows "," ows expr)*)? ows "]"
+return ::= "RETURN" ws ("DISTINCT" ws)? item (ows "," ows item)*
+item ::= expr (ws "AS" ws var)?
+limit ::= "LIMIT" ws [1-9] [0-9]*
+scalar ::= string | number | "true" | "false" | "null" | "$" ident
+string ::= "'" ([^'\\\n] | "\\" [^\n])* "'" | "\"" ([^"\\\n] | "\\" [^\n])* "\""
+number ::= "-"? [0-9]+ ("." [0-9]+)?
+var ::= ident
+ident ::= [a-zA-Z_] [a-zA-Z0-9_]*
+ws ::= [ \t\n]+
+ows ::= [ \t\n]*
+"""
+
+
+def _literal(name: str) -> str:
+    """GBNF literal for a schema name, backtick-quoted when Cypher needs it."""
+    if not _IDENTIFIER_RE.match(name):
+        name = "`" + name.replace("`", "``") + "`"
+    return '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _alternatives(rule: str, names: Iterable[str]) -> str:
+    names = sorted(set(names))
+    if not names:
+        return f"{rule} ::= ident"
+    return f"{rule} ::= " + " | ".join(_literal(n) for n in names)
+
+
+def build_cypher_grammar(schema: Dict[str, Any], exclude: Optional[Iterable[str]] = None) -> str:
+    """Return the GBNF grammar for ``schema`` (deterministic: names are sorted)."""
+    patterns = list(excluded_properties() if exclude is None else exclude)
+    node_types = schema.get("NodeTypes", {})
+    rel_types = schema.get("RelationshipTypes", {})
+
+    labels = set(node_types)
+    props: List[str] = [p for fields in node_types.values() for p in fields]
+    for rel, meta in rel_types.items():
+        for start, end in relationship_endpoints(meta):
+            labels.update((start, end))
+        props.extend(k for k in meta if not k.startswith("_"))
+    labels.discard("Unknown")
+
+    vocabulary = [
+        _alternatives("label", labels),
+        _alternatives("reltype", rel_types),
+        _alternatives("prop", (p for p in props if not _is_excluded(p, patterns))),
+    ]
+    return _CYPHER_RULES.strip() + "\n" + "\n".join(vocabulary) + "\n"
+
+
+_grammar: Optional[str] = None
+
+
+def get_cypher_grammar() -> str:
+    """Return the grammar for the loaded schema (built once per process)."""
+    global _grammar
+    if _grammar is None:
+        _grammar = build_cypher_grammar(get_schema())
+    return _grammar
+
+
+def grammar_request_body() -> Optional[Dict[str, str]]:
+    """Extra request-body fields carrying the grammar, or ``None`` when it is off."""
+    mode = get_env_variable("CYPHER_GRAMMAR", "off").lower()
+    if mode in ("", "0", "off", "false", "no"):
+        return None
+    if mode != "gbnf":
+        raise ValueError(f"Unknown CYPHER_GRAMMAR mode: {mode}")
+    return {get_env_variable("CYPHER_GRAMMAR_PARAM", "grammar"): get_cypher_grammar()}
+
+
+if __name__ == "__main__":
+    print(get_cypher_grammar(), end="")
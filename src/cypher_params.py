@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+cypher_params.py
+Lift the literals of generated Cypher into ``$parameters`` so Neo4j can reuse
+one cached plan for every query that differs only in entity values.
+
+    MATCH (p:Protein) WHERE p.name IN ["H4C1", "H4C2"] RETURN p LIMIT 10
+    ->  MATCH (p:Protein) WHERE p.name IN $p0 RETURN p LIMIT 10
+        {"p0": ["H4C1", "H4C2"]}
+
+String and number literals become parameters; a list made only of literals
+becomes one list parameter, so lists of any length share a plan.  ``LIMIT``
+and ``SKIP`` counts stay inline (they are part of the query's shape, and the
+validator expects the trailing ``LIMIT``), as do ``true``/``false``/``null``.
+Equal literals share one parameter, and names already used by the query or
+the caller's parameters are never reused.
+
+    CYPHER_PARAMETERIZE=true            # false sends queries as generated
+
+Usage
+-----
+from cypher_params import parameterize, prepare
+query = parameterize(cypher)             # ParameterizedQuery
+query.cypher, query.params
+query = prepare(cypher, params)          # honours CYPHER_PARAMETERIZE
+"""
+
+from __future__ import annotations
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.cypher_validator import Token, tokenize
+from src.utils import get_env_variable
+
+# A "[" after one of these opens a list literal, after anything else it indexes
+_LIST_OPENERS = {
+    "WHERE", "AND", "OR", "XOR", "NOT", "IN", "RETURN", "WITH", "UNWIND", "WHEN", "THEN", "ELSE", "DISTINCT",
+}
+# Numbers after these (and before "..") stay inline
+_INLINE_AFTER = {"LIMIT", "SKIP", "*", ".."}
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "0": "\0"}
+
+
+@dataclass
+class ParameterizedQuery:
+    cypher: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"cypher": self.cypher, "params": self.params}
+
+
+def literal_value(tok: Token) -> Any:
+    """The Python value of a string or number token."""
+    if tok.kind == "number":
+        if tok.text[:2] in ("0x", "0o"):
+            return int(tok.text, 0)
+        return float(tok.text) if any(c in tok.text for c in ".eE") else int(tok.text)
+    body, out, i = tok.text[1:-1], [], 0
+    while i < len(body):
+        ch = body[i]
+        if ch == "\\" and i + 1 < len(body):
+            nxt = body[i + 1]
+            if nxt in ("u", "U") and i + 6 <= len(body):
+                try:
+                    out.append(chr(int(body[i + 2:i + 6], 16)))
+                    i += 6
+                    continue
+                except ValueError:
+                    pass
+            out.append(_ESCAPES.get(nxt, nxt))
+            i += 2
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _is_literal(tok: Token) -> bool:
+    return tok.kind in ("string", "number")
+
+
+def _list_literal(toks: List[Token], i: int) -> Optional[int]:
+    """Index of the ``]`` closing a list of literals opened at ``toks[i]``, else ``None``."""
+    prev = toks[i - 1] if i else None
+    if prev is not None and not (prev.kind == "op" and prev.text not in (")", "]", "}")
+                                 or prev.keyword() in _LIST_OPENERS):
+        return None  # subscript or relationship pattern
+    j = i + 1
+    while j + 1 < len(toks) and _is_literal(toks[j]):
+        if toks[j + 1].text == "]":
+            return j + 1
+        if toks[j + 1].text != ",":
+            return None
+        j += 2
+    return None
+
+
+def parameterize(cypher: str, params: Optional[Dict[str, Any]] = None, prefix: str = "p") -> ParameterizedQuery:
+    """Return ``cypher`` with its literals replaced by parameters, merged into ``params``."""
+    toks = tokenize(cypher)
+    params = dict(params or {})
+    taken = set(params) | {t.text[1:] for t in toks if t.kind == "param"}
+    names: Dict[str, str] = {}
+    edits: List[Tuple[int, int, str]] = []
+
+    def name_for(value: Any) -> str:
+        key = json.dumps([type(value).__name__, value])
+        if key not in names:
+            n = len(names)
+            while f"{prefix}{n}" in taken:
+                n += 1
+            names[key] = f"{prefix}{n}"
+            taken.add(names[key])
+            params[names[key]] = value
+        return names[key]
+
+    i = 0
+    while i < len(toks):
+        tok = toks[i]
+        if tok.text == "[" and tok.kind == "op":
+            end = _list_literal(toks, i)
+            if end is not None:
+                value = [literal_value(t) for t in toks[i + 1:end] if _is_literal(t)]
+                edits.append((tok.start, toks[end].end, "$" + name_for(value)))
+                i = end + 1
+                continue
+        if _is_literal(tok):
+            prev = toks[i - 1] if i else None
+            nxt = toks[i + 1] if i + 1 < len(toks) else None
+            inline = tok.kind == "number" and (
+                prev is not None and (prev.keyword() in _INLINE_AFTER or prev.text in _INLINE_AFTER)
+                or nxt is not None and nxt.text == ".."
+                # glued to a name: a literal form the tokenizer does not know, leave it whole
+                or nxt is not None and nxt.kind == "name" and nxt.start == tok.end)
+            if not inline:
+                edits.append((tok.start, tok.end, "$" + name_for(literal_value(tok))))
+        i += 1
+
+    for start, end, text in reversed(edits):
+        cypher = cypher[:start] + text + cypher[end:]
+    return ParameterizedQuery(cypher, params)
+
+
+def parameterization_enabled() -> bool:
+    return get_env_variable("CYPHER_PARAMETERIZE", "true").lower() in ("1", "true", "yes")
+
+
+def prepare(cypher: str, params: Optional[Dict[str, Any]] = None) -> ParameterizedQuery:
+    """The query as it should be sent to Neo4j: parameterized unless ``CYPHER_PARAMETERIZE`` is off."""
+    if parameterization_enabled():
+        return parameterize(cypher, params)
+    return ParameterizedQuery(cypher, dict(params or {}))
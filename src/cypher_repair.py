@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+cypher_repair.py
+Targeted repair of generated Cypher that failed validation.
+
+Instead of regenerating with the full prompt, the model gets a short follow-up
+holding only the broken query, the validator's errors and the relevant schema
+slice, with a small completion budget.  Repair turns never enter the session
+history - only the final answer does.
+
+Usage
+-----
+from cypher_repair import CypherRepairer
+repairer = CypherRepairer(validator.validate, max_attempts=2, budget=10.0)
+answer = await repairer.arepair(question, validator.validate(raw), schema_prompt, acomplete)
+answer.cypher, answer.repairs, answer.repair_seconds
+"""
+
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from src.cypher_validator import ValidationIssue, ValidationResult
+
+logger = logging.getLogger(__name__)
+
+REPAIR_RULES = (
+    "You correct Neo4j Cypher queries. Fix ONLY the listed errors and keep the rest of the query. "
+    "Use only labels, relationships and properties from the schema below. "
+    "Every relationship needs a variable that is returned; the query must be read-only and end with LIMIT 10. "
+    "Output Cypher ONLY. No explanations. No markdown."
+)
+
+
+def build_repair_messages(
+    question: str, cypher: str, errors: Sequence[ValidationIssue], schema_prompt: str
+) -> List[BaseMessage]:
+    """Return the short repair conversation for one failed query."""
+    problems = "\n".join(f"- {e.message}" for e in errors)
+    return [
+        SystemMessage(content=REPAIR_RULES + "\n" + schema_prompt),
+        HumanMessage(content=f"Question: {question}\nQuery:\n{cypher}\nErrors:\n{problems}"),
+    ]
+
+
+@dataclass
+class Answer:
+    """Final Cypher for one question plus how it got there."""
+
+    cypher: str
+    errors: List[ValidationIssue] = field(default_factory=list)
+    fixes: List[ValidationIssue] = field(default_factory=list)
+    repairs: int = 0
+    repair_seconds: float = 0.0
+    tier: str = ""              # cascade tier whose output this started from
+    plan_cost: Optional[float] = None   # estimated cost of the chosen candidate, if costed
+
+    @classmethod
+    def from_validation(cls, result: ValidationResult, repairs: int = 0, repair_seconds: float = 0.0) -> "Answer":
+        return cls(result.cypher, result.errors, result.fixes, repairs, repair_seconds)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "valid": self.ok,
+            "errors": [e.message for e in self.errors],
+            "fixes": [f.message for f in self.fixes],
+            "repairs": self.repairs,
+            "repair_ms": round(self.repair_seconds * 1000, 1),
+            "tier": self.tier,
+            "plan_cost": self.plan_cost,
+        }
+
+
+class CypherRepairer:
+    """Repair loop bounded by ``max_attempts`` turns and a ``budget`` in wall-clock seconds.
+
+    A turn that does not reduce the number of errors ends the loop: at
+    temperature 0 asking again would only repeat it.
+    """
+
+    def __init__(self, check: Callable[[str], ValidationResult], max_attempts: int = 2, budget: float = 10.0):
+        self.check = check
+        self.max_attempts = max_attempts
+        self.budget = budget
+
+    def repair(
+        self, question: str, result: ValidationResult, schema_prompt: str,
+        complete: Callable[[List[BaseMessage]], str],
+    ) -> Answer:
+        """Synchronous loop; a turn already running may overrun the budget."""
+        start, repairs = time.monotonic(), 0
+        while self._another_turn(result, repairs, start):
+            try:
+                text = complete(build_repair_messages(question, result.cypher, result.errors, schema_prompt))
+            except Exception as e:
+                logger.warning("cypher repair turn failed: %s", e)
+                break
+            repairs += 1
+            candidate = self.check(text)
+            if len(candidate.errors) >= len(result.errors):
+                break
+            result = candidate
+        return Answer.from_validation(result, repairs, time.monotonic() - start)
+
+    async def arepair(
+        self, question: str, result: ValidationResult, schema_prompt: str,
+        acomplete: Callable[[List[BaseMessage]], Awaitable[str]],
+    ) -> Answer:
+        """Async loop; each turn is cancelled when the remaining budget runs out."""
+        start, repairs = time.monotonic(), 0
+        while self._another_turn(result, repairs, start):
+            remaining = self.budget - (time.monotonic() - start)
+            messages = build_repair_messages(question, result.cypher, result.errors, schema_prompt)
+            try:
+                text = await asyncio.wait_for(acomplete(messages), remaining)
+            except asyncio.TimeoutError:
+                logger.warning("cypher repair stopped: %.1fs budget spent", self.budget)
+                repairs += 1
+                break
+            except Exception as e:
+                logger.warning("cypher repair turn failed: %s", e)
+                break
+            repairs += 1
+            candidate = self.check(text)
+            if len(candidate.errors) >= len(result.errors):
+                break
+            result = candidate
+        return Answer.from_validation(result, repairs, time.monotonic() - start)
+
+    def _another_turn(self, result: ValidationResult, repairs: int, start: float) -> bool:
+        return (
+            not result.ok
+            and repairs < self.max_attempts
+            and time.monotonic() - start < self.budget
+        )
+
+
+class RepairStats:
+    """Counters over answered questions: how often and how long repair ran."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.answers = 0
+        self.repaired = 0       # needed at least one repair turn
+        self.unresolved = 0     # still invalid when attempts or budget ran out
+        self.attempts = 0
+        self.repair_seconds = 0.0
+
+    def record(self, answer: Answer) -> None:
+        with self._lock:
+            self.answers += 1
+            self.attempts += answer.repairs
+            self.repair_seconds += answer.repair_seconds
+            self.repaired += answer.repairs > 0
+            self.unresolved += not answer.ok
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "answers": self.answers,
+                "repaired": self.repaired,
+                "unresolved": self.unresolved,
+                "repair_attempts": self.attempts,
+                "avg_repair_ms": round(self.repair_seconds * 1000 / self.repaired, 1) if self.repaired else 0.0,
+                "repair_rate": round(self.repaired / self.answers, 4) if self.answers else 0.0,
+            }
@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""
+cypher_validator.py
+Local, schema-aware checks for generated Cypher - no database round trip.
+
+The query is tokenized once (string literals and comments can never trigger a
+rule), its node/relationship patterns are parsed into path chains, and every
+label, relationship type, property and endpoint pair is checked against
+lookup tables built once from the schema.  The SYSTEM_RULES constraints are
+enforced too: an allow-list of read-only clauses (no procedure calls), no
+variable-length paths, named (and returned) relationship variables, no lists
+in node patterns and a trailing LIMIT.
+
+Cheap deterministic problems are fixed in place instead of re-asking the LLM:
+markdown fences are stripped, ``LIMIT 10`` is appended, anonymous
+relationships are named (and returned), and a relationship drawn against its
+stored direction is flipped.
+
+Usage
+-----
+from cypher_validator import get_validator
+validator = get_validator()              # CypherValidator(get_schema()), cached
+result = validator.validate(cypher)      # ValidationResult
+result.cypher, result.ok, result.errors, result.fixes
+"""
+
+from __future__ import annotations
+import difflib
+import re
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.schema_loader import get_schema, relationship_endpoints
+
+DEFAULT_LIMIT = 10
+
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<ws>\s+)
+    | (?P<comment>//[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+    | (?P<name>`[^`]*`|[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<param>\$[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<number>0x[0-9A-Fa-f]+|0o[0-7]+|(?:\d+(?:\.\d+)?|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<arrow><-|->)
+    | (?P<op>\.\.|<>|<=|>=|=~|.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_FENCE_RE = re.compile(r"```[ \t]*(?:cypher)?[ \t]*\n?(.*?)```", re.IGNORECASE | re.DOTALL)
+
+# The only clauses a query may use (SYSTEM_RULES): plain read-only traversals
+ALLOWED_CLAUSES = {"MATCH", "OPTIONAL", "WHERE", "WITH", "UNWIND", "RETURN", "ORDER", "BY", "SKIP", "LIMIT"}
+_CLAUSE_STARTS = {"MATCH", "OPTIONAL", "WITH", "UNWIND", "RETURN"}
+# Every other clause or command keyword; writes get their own error code
+WRITE_CLAUSES = {"CREATE", "MERGE", "SET", "DELETE", "DETACH", "REMOVE", "DROP", "LOAD", "FOREACH", "INSERT"}
+_OTHER_CLAUSES = {
+    "CALL", "YIELD", "SHOW", "USE", "UNION", "FINISH", "TERMINATE", "GRANT", "DENY", "REVOKE",
+    "ALTER", "RENAME", "START", "STOP", "ENABLE", "FILTER", "LET", "NEXT",
+}
+# Namespaced functions that are part of Cypher itself; any other ``ns.fn(...)``
+# is a plugin function (apoc.*, gds.*) and may reach outside the graph
+BUILTIN_NAMESPACES = {"point", "date", "datetime", "localdatetime", "time", "localtime", "duration", "vector"}
+# A "(" after one of these opens a pattern; after any other name it is a call
+_KEYWORDS = {
+    "MATCH", "OPTIONAL", "WHERE", "AND", "OR", "XOR", "NOT", "RETURN", "WITH",
+    "UNWIND", "AS", "DISTINCT", "IN", "EXISTS", "UNION", "ALL", "CASE", "WHEN",
+    "THEN", "ELSE",
+}
+_PROJECTION_END = {"ORDER", "SKIP", "LIMIT", "UNION"}
+# A word after one of these is (part of) an expression, never a new clause
+_EXPRESSION_BEFORE = _KEYWORDS - {"MATCH", "UNION"} | {
+    "BY", "SKIP", "LIMIT", "IS", "CONTAINS", "STARTS", "ENDS", "WHEN", "YIELD", "DETACH",
+}
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str
+    text: str
+    start: int
+    end: int
+
+    @property
+    def value(self) -> str:
+        """Identifier text without backtick quoting."""
+        return self.text[1:-1] if self.text.startswith("`") else self.text
+
+    def keyword(self) -> Optional[str]:
+        if self.kind == "name" and not self.text.startswith("`"):
+            return self.text.upper()
+        return None
+
+
+def tokenize(cypher: str) -> List[Token]:
+    """Return the significant tokens of ``cypher`` (whitespace and comments dropped)."""
+    return [
+        Token(m.lastgroup, m.group(), m.start(), m.end())
+        for m in _TOKEN_RE.finditer(cypher)
+        if m.lastgroup not in ("ws", "comment")
+    ]
+
+
+def strip_fences(text: str) -> str:
+    """Return the Cypher inside a markdown code fence, or ``text`` without a bare ``cypher`` tag."""
+    m = _FENCE_RE.search(text)
+    if m:
+        text = m.group(1)
+    text = text.strip().strip("`").strip()
+    first, _, rest = text.partition("\n")
+    if first.strip().lower() == "cypher":
+        text = rest.strip()
+    return text
+
+
+@dataclass
+class ValidationIssue:
+    code: str
+    message: str
+
+    def __str__(self) -> str:
+        return self.message
+
+
+@dataclass
+class ValidationResult:
+    cypher: str
+    errors: List[ValidationIssue] = field(default_factory=list)
+    fixes: List[ValidationIssue] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ok": self.ok,
+            "errors": [{"code": e.code, "message": e.message} for e in self.errors],
+            "fixes": [{"code": f.code, "message": f.message} for f in self.fixes],
+        }
+
+
+@dataclass
+class _Node:
+    var: Optional[str]
+    labels: List[str]
+    keys: List[Token]
+    list_values: List[Token]
+    end: int                     # token index after ")"
+
+
+@dataclass
+class _Rel:
+    var: Optional[str]
+    types: List[str]
+    keys: List[Token]
+    direction: str               # "->", "<-" or "-"
+    variable_length: bool
+    left: Token                  # "-" or "<-"
+    right: Token                 # "-" or "->"
+    open_bracket: Optional[Token]  # None for "-->" style patterns
+
+
+class CypherValidator:
+    """Checks Cypher against one schema; build once and reuse (stateless per call)."""
+
+    def __init__(self, schema: Dict[str, Any], case_sensitive: Iterable[Tuple[str, str]] = (("Protein", "name"),)):
+        node_types = schema.get("NodeTypes", {})
+        rel_types = schema.get("RelationshipTypes", {})
+        self.node_properties: Dict[str, Set[str]] = {label: set(props) for label, props in node_types.items()}
+        self.rel_pairs: Dict[str, Set[Tuple[str, str]]] = {
+            rel: set(relationship_endpoints(meta)) for rel, meta in rel_types.items()
+        }
+        self.rel_properties: Dict[str, Set[str]] = {
+            rel: {k for k in meta if not k.startswith("_")} for rel, meta in rel_types.items()
+        }
+        self.labels: Set[str] = set(node_types)
+        for pairs in self.rel_pairs.values():
+            for a, b in pairs:
+                self.labels.update((a, b))
+        self.labels.discard("Unknown")
+        self.case_sensitive = {tuple(p) for p in case_sensitive}
+
+    # ── entry point ───────────────────────────────────────────────────
+    def validate(self, cypher: str, fix: bool = True) -> ValidationResult:
+        """Check ``cypher``; with ``fix`` apply the deterministic repairs first."""
+        fixes: List[ValidationIssue] = []
+        errors: List[ValidationIssue] = []
+
+        text = strip_fences(cypher) if fix else cypher.strip()
+        if fix and text != cypher.strip():
+            fixes.append(ValidationIssue("markdown", "removed markdown fences around the query"))
+        toks = tokenize(text)
+        if not toks:
+            return ValidationResult(text, [ValidationIssue("empty", "the query is empty")])
+
+        chains = self._parse_patterns(toks)
+        var_labels, rel_vars = self._bindings(chains)
+        edits: List[Tuple[int, int, str]] = []   # (start, end, replacement) in ``text``
+
+        self._check_clauses(toks, errors)
+        self._check_patterns(chains, var_labels, errors, fixes, edits, fix)
+        new_rel_vars = self._name_anonymous(chains, toks, var_labels, rel_vars, errors, fixes, edits, fix)
+        self._check_properties(toks, chains, var_labels, rel_vars, errors)
+        self._check_returned(toks, list(rel_vars) + new_rel_vars, errors, fixes, edits, fix)
+
+        for start, end, replacement in sorted(edits, reverse=True):
+            text = text[:start] + replacement + text[end:]
+        text = self._check_limit(text, tokenize(text) if edits else toks, errors, fixes, fix)
+        return ValidationResult(text, errors, fixes)
+
+    # ── parsing ───────────────────────────────────────────────────────
+    def path_chains(self, toks: List[Token]) -> List[List[Any]]:
+        """Return the path chains ``[node, rel, node, ...]`` of tokenized Cypher (e.g. for costing)."""
+        return self._parse_patterns(toks)
+
+    def _parse_patterns(self, toks: List[Token]) -> List[List[Any]]:
+        """Return path chains ``[node, rel, node, rel, node, ...]`` found in ``toks``."""
+        chains, i = [], 0
+        while i < len(toks):
+            node = self._node_at(toks, i) if toks[i].text == "(" else None
+            if node is None:
+                i += 1
+                continue
+            chain = [node]
+            while True:
+                rel = self._rel_at(toks, chain[-1].end)
+                if rel is None:
+                    break
+                rel, after = rel
+                nxt = self._node_at(toks, after)
+                if nxt is None:
+                    break
+                chain.extend([rel, nxt])
+            chains.append(chain)
+            i = chain[-1].end
+        return chains
+
+    def _node_at(self, toks: List[Token], i: int) -> Optional[_Node]:
+        if i >= len(toks) or toks[i].text != "(":
+            return None
+        prev = toks[i - 1] if i else None
+        if prev is not None and prev.kind == "name" and prev.keyword() not in _KEYWORDS:
+            return None  # function call
+        j, var, labels = i + 1, None, []
+        if j < len(toks) and toks[j].kind == "name":
+            var = toks[j].value
+            j += 1
+        while j + 1 < len(toks) and (toks[j].text == ":" or (labels and toks[j].text in "&|")):
+            if toks[j + 1].kind != "name":
+                return None
+            labels.append(toks[j + 1].value)
+            j += 2
+        keys, list_values = [], []
+        if j < len(toks) and toks[j].text == "{":
+            j = self._parse_map(toks, j, keys, list_values)
+        if j >= len(toks) or toks[j].text != ")":
+            return None
+        return _Node(var, labels, keys, list_values, j + 1)
+
+    def _rel_at(self, toks: List[Token], i: int) -> Optional[Tuple[_Rel, int]]:
+        if i + 1 >= len(toks) or toks[i].text not in ("-", "<-"):
+            return None
+        left, j = toks[i], i + 1
+        var, types, keys, var_length, bracket = None, [], [], False, None
+        if toks[j].text == "[":
+            bracket, j = toks[j], j + 1
+            if j < len(toks) and toks[j].kind == "name":
+                var = toks[j].value
+                j += 1
+            while j + 1 < len(toks) and toks[j].text in (":", "|"):
+                if toks[j + 1].text == ":":
+                    j += 1
+                if toks[j + 1].kind != "name":
+                    return None
+                types.append(toks[j + 1].value)
+                j += 2
+            depth = 0
+            while j < len(toks) and not (depth == 0 and toks[j].text == "]"):
+                if toks[j].text == "*" and depth == 0:
+                    var_length = True
+                elif toks[j].text == "{" and depth == 0:
+                    j = self._parse_map(toks, j, keys, [])
+                    continue
+                depth += toks[j].text in "([{"
+                depth -= toks[j].text in ")}"
+                j += 1
+            if j >= len(toks):
+                return None
+            j += 1
+        if j >= len(toks) or toks[j].text not in ("-", "->"):
+            return None
+        right = toks[j]
+        if left.text == "<-" and right.text == "->":
+            direction = "-"
+        else:
+            direction = "<-" if left.text == "<-" else "->" if right.text == "->" else "-"
+        return _Rel(var, types, keys, direction, var_length, left, right, bracket), j + 1
+
+    @staticmethod
+    def _parse_map(toks: List[Token], j: int, keys: List[Token], list_values: List[Token]) -> int:
+        """Collect the top-level keys of the ``{...}`` map at ``j``; return the index after ``}``."""
+        depth, j = 0, j
+        while j < len(toks):
+            t = toks[j].text
+            if t in "{[(":
+                depth += 1
+            elif t in "}])":
+                depth -= 1
+                if depth == 0:
+                    return j + 1
+            elif depth == 1 and toks[j].kind == "name" and j + 1 < len(toks) and toks[j + 1].text == ":":
+                keys.append(toks[j])
+                if j + 2 < len(toks) and toks[j + 2].text == "[":
+                    list_values.append(toks[j])
+            j += 1
+        return j
+
+    @staticmethod
+    def _bindings(chains: List[List[Any]]) -> Tuple[Dict[str, Set[str]], Dict[str, Set[str]]]:
+        var_labels: Dict[str, Set[str]] = {}
+        rel_vars: Dict[str, Set[str]] = {}
+        for chain in chains:
+            for part in chain:
+                if isinstance(part, _Node) and part.var:
+                    var_labels.setdefault(part.var, set()).update(part.labels)
+                elif isinstance(part, _Rel) and part.var:
+                    rel_vars.setdefault(part.var, set()).update(part.types)
+        return var_labels, rel_vars
+
+    # ── rules ─────────────────────────────────────────────────────────
+    @staticmethod
+    def _check_clauses(toks: List[Token], errors: List[ValidationIssue]) -> None:
+        errors.extend(read_only_issues(toks))
+
+    def _check_patterns(self, chains, var_labels, errors, fixes, edits, fix) -> None:
+        for chain in chains:
+            for node in chain[0::2]:
+                for label in node.labels:
+                    if label not in self.labels:
+                        errors.append(ValidationIssue(
+                            "unknown_label", f"label {label} is not in the schema" + _suggest(label, self.labels)
+                        ))
+                for key in node.list_values:
+                    errors.append(ValidationIssue(
+                        "list_in_pattern",
+                        f"list value for {key.value} inside a node pattern; use WHERE {node.var or 'n'}.{key.value} IN [...]",
+                    ))
+            for k in range(1, len(chain), 2):
+                left, rel, right = chain[k - 1], chain[k], chain[k + 1]
+                if rel.variable_length:
+                    errors.append(ValidationIssue("variable_length", "variable-length relationships ([*]) are not allowed"))
+                unknown = [t for t in rel.types if t not in self.rel_pairs]
+                for t in unknown:
+                    errors.append(ValidationIssue(
+                        "unknown_relationship",
+                        f"relationship type {t} is not in the schema" + _suggest(t, self.rel_pairs),
+                    ))
+                if rel.types and not unknown:
+                    self._check_endpoints(left, rel, right, var_labels, errors, fixes, edits, fix)
+
+    def _check_endpoints(self, left, rel, right, var_labels, errors, fixes, edits, fix) -> None:
+        a = self._labels_of(left, var_labels)
+        b = self._labels_of(right, var_labels)
+        forward = any(self._fits(t, a, b) for t in rel.types)
+        backward = any(self._fits(t, b, a) for t in rel.types)
+        if rel.direction == "-" and (forward or backward):
+            return
+        if (rel.direction == "->" and forward) or (rel.direction == "<-" and backward):
+            return
+        shown = f"({_fmt(a)})-[:{'|'.join(rel.types)}]-({_fmt(b)})"
+        if (rel.direction == "->" and backward) or (rel.direction == "<-" and forward):
+            issue = ValidationIssue("direction", f"{shown} is drawn against the schema direction")
+            if fix:
+                # "<-[..]-" <-> "-[..]->"
+                if rel.direction == "->":
+                    edits += [(rel.left.start, rel.left.end, "<-"), (rel.right.start, rel.right.end, "-")]
+                else:
+                    edits += [(rel.left.start, rel.left.end, "-"), (rel.right.start, rel.right.end, "->")]
+                issue.message = f"flipped {shown} to the schema direction"
+                fixes.append(issue)
+            else:
+                errors.append(issue)
+            return
+        allowed = ", ".join(f"({x})->({y})" for t in rel.types for x, y in sorted(self.rel_pairs[t]))
+        errors.append(ValidationIssue("endpoints", f"{shown} does not exist; {'|'.join(rel.types)} connects {allowed}"))
+
+    def _fits(self, rel_type: str, a: Set[str], b: Set[str]) -> bool:
+        return any((not a or x in a) and (not b or y in b) for x, y in self.rel_pairs[rel_type])
+
+    @staticmethod
+    def _labels_of(node: _Node, var_labels: Dict[str, Set[str]]) -> Set[str]:
+        return set(node.labels) | (var_labels.get(node.var, set()) if node.var else set())
+
+    def _name_anonymous(self, chains, toks, var_labels, rel_vars, errors, fixes, edits, fix) -> List[str]:
+        rels = [part for chain in chains for part in chain[1::2]]
+        anonymous = [rel for rel in rels if not rel.var]
+        if not anonymous:
+            return []
+        used = {t.value for t in toks if t.kind == "name"}
+        names = iter(["r"] if len(rels) == 1 else (f"r{i}" for i in count(1)))
+        assigned = []
+        for rel in anonymous:
+            if not fix:
+                errors.append(ValidationIssue("anonymous_relationship", "every relationship must be assigned to a variable"))
+                continue
+            name = next(n for n in names if n not in used)
+            used.add(name)
+            rel.var = name
+            assigned.append(name)
+            if rel.open_bracket is not None:
+                edits.append((rel.open_bracket.end, rel.open_bracket.end, name))
+            else:  # "-->" / "<--" / "--"
+                edits.append((rel.left.end, rel.right.start, f"[{name}]"))
+            fixes.append(ValidationIssue("anonymous_relationship", f"named an anonymous relationship {name}"))
+        return assigned
+
+    def _check_properties(self, toks, chains, var_labels, rel_vars, errors) -> None:
+        for i in range(len(toks) - 2):
+            if toks[i].kind != "name" or toks[i + 1].text != "." or toks[i + 2].kind != "name":
+                continue
+            if i and toks[i - 1].text == ".":
+                continue  # nested access (map.key.sub)
+            var, prop = toks[i].value, toks[i + 2].value
+            if var in rel_vars:
+                self._check_property(rel_vars[var], self.rel_properties, prop, errors)
+            elif var in var_labels:
+                self._check_property(var_labels[var], self.node_properties, prop, errors)
+                if (
+                    i >= 2 and toks[i - 1].text == "(" and toks[i - 2].text.lower() == "tolower"
+                    and any((label, prop) in self.case_sensitive for label in var_labels[var])
+                ):
+                    errors.append(ValidationIssue(
+                        "case_sensitive", f"{var}.{prop} is case-sensitive: compare it without toLower()"
+                    ))
+        for chain in chains:
+            for node in chain[0::2]:
+                names = var_labels.get(node.var, set(node.labels)) if node.var else set(node.labels)
+                for key in node.keys:
+                    self._check_property(names, self.node_properties, key.value, errors)
+            for rel in chain[1::2]:
+                names = rel_vars.get(rel.var, set(rel.types)) if rel.var else set(rel.types)
+                for key in rel.keys:
+                    self._check_property(names, self.rel_properties, key.value, errors)
+
+    @staticmethod
+    def _check_property(names: Set[str], properties: Dict[str, Set[str]], prop: str, errors) -> None:
+        """Flag ``prop`` when none of the labels/types ``names`` has it (unknown schema info is skipped)."""
+        known = [properties[n] for n in names if properties.get(n)]
+        if not names or len(known) != len(names) or any(prop in k for k in known):
+            return
+        errors.append(ValidationIssue(
+            "unknown_property",
+            f"{'|'.join(sorted(names))} has no property {prop}" + _suggest(prop, set().union(*known)),
+        ))
+
+    @staticmethod
+    def _check_returned(toks, rel_vars, errors, fixes, edits, fix) -> None:
+        if not rel_vars or any(t.keyword() == "WITH" for t in toks):
+            return  # WITH re-scopes variables; leave those queries to the model
+        starts = [i for i, t in enumerate(toks) if t.keyword() == "RETURN"]
+        if not starts:
+            errors.append(ValidationIssue("no_return", "the query has no RETURN clause"))
+            return
+        i = starts[-1] + 1
+        end = i
+        while end < len(toks) and toks[end].keyword() not in _PROJECTION_END and toks[end].text != ";":
+            end += 1
+        projection = toks[i:end]
+        if any(t.text == "*" for t in projection):
+            return
+        returned = {t.value for t in projection if t.kind == "name"}
+        missing = [v for v in dict.fromkeys(rel_vars) if v not in returned]
+        if not missing:
+            return
+        plain = projection and all(
+            (t.kind == "name" and t.keyword() not in _KEYWORDS) if k % 2 == 0 else t.text == ","
+            for k, t in enumerate(projection)
+        )
+        if fix and plain:
+            edits.append((projection[-1].end, projection[-1].end, "".join(f", {v}" for v in missing)))
+            fixes.append(ValidationIssue("relationship_not_returned", f"added {', '.join(missing)} to RETURN"))
+        else:
+            errors.append(ValidationIssue(
+                "relationship_not_returned", f"relationship variables must be returned: {', '.join(missing)}"
+            ))
+
+    @staticmethod
+    def _check_limit(text, toks, errors, fixes, fix) -> str:
+        tail = [t for t in toks if t.text != ";"][-2:]
+        if len(tail) == 2 and tail[0].keyword() == "LIMIT" and tail[1].kind in ("number", "param"):
+            return text
+        if not fix:
+            errors.append(ValidationIssue("limit", f"the query must end with LIMIT {DEFAULT_LIMIT}"))
+            return text
+        fixes.append(ValidationIssue("limit", f"appended LIMIT {DEFAULT_LIMIT}"))
+        # after the last token, not the last character: a trailing comment would swallow it
+        end = tail[-1].end if tail else len(text)
+        rest = text[end:].lstrip()
+        rest = " " + rest[1:].lstrip() if rest.startswith(";") else " " + rest
+        return (text[:end] + f" LIMIT {DEFAULT_LIMIT}" + rest).rstrip()
+
+
+def read_only_issues(toks: List[Token]) -> List[ValidationIssue]:
+    """Clause allow-list check: only ``ALLOWED_CLAUSES``, no procedures or plugin functions.
+
+    Needs no schema, so it also guards queries that bypass the full validator.
+    """
+    issues: List[ValidationIssue] = []
+    first = toks[0].keyword() if toks else None
+    if first is not None and first not in _CLAUSE_STARTS and first not in WRITE_CLAUSES | _OTHER_CLAUSES:
+        issues.append(ValidationIssue("clause", f"a query must start with MATCH, WITH, UNWIND or RETURN, not {first}"))
+    depth = 0   # inside (...) or [...]: patterns, arguments, lists - no clauses there
+    for i, tok in enumerate(toks):
+        if tok.kind == "op" and tok.text in "([":
+            depth += 1
+        elif tok.kind == "op" and tok.text in ")]":
+            depth = max(depth - 1, 0)
+        word = tok.keyword()
+        if word is None:
+            continue
+        if (i and toks[i - 1].text in (".", ":")) or (i + 1 < len(toks) and toks[i + 1].text == ":"):
+            continue  # property, label or map key that happens to share the name
+        if word in WRITE_CLAUSES and depth == 0:
+            issues.append(ValidationIssue("write_clause", f"{word} is not allowed: queries must be read-only"))
+        elif word in _OTHER_CLAUSES and depth == 0 and _clause_position(toks, i):
+            issues.append(ValidationIssue(
+                "clause", f"{word} is not allowed: only {', '.join(sorted(ALLOWED_CLAUSES))} may be used"))
+        elif (i + 2 < len(toks) and toks[i + 1].text == "." and word.lower() not in BUILTIN_NAMESPACES
+              and _is_call(toks, i + 2)):
+            issues.append(ValidationIssue("procedure", f"{tok.text}.{toks[i + 2].text}(...) is not allowed"))
+    return issues
+
+
+def _clause_position(toks: List[Token], i: int) -> bool:
+    """Whether ``toks[i]`` can open a clause: first, or after a complete clause or expression.
+
+    ``RETURN start``, ``WITH d, next`` and ``x = filter`` use the word as a
+    variable; ``MATCH (d) CALL ...`` and ``... RETURN d SHOW ...`` open a clause.
+    """
+    if i == 0:
+        return True
+    prev = toks[i - 1]
+    if prev.kind == "op":
+        return prev.text in (")", "]", "}", "{", ";")
+    return prev.keyword() not in _EXPRESSION_BEFORE
+
+
+def _is_call(toks: List[Token], i: int) -> bool:
+    """Whether ``toks[i]`` ends a dotted name that is invoked (``a.b.c(``)."""
+    while i + 2 < len(toks) and toks[i + 1].text == "." and toks[i + 2].kind == "name":
+        i += 2
+    return toks[i].kind == "name" and i + 1 < len(toks) and toks[i + 1].text == "("
+
+
+def _suggest(name: str, candidates: Iterable[str]) -> str:
+    close = difflib.get_close_matches(name, list(candidates), n=1, cutoff=0.6)
+    return f" (did you mean {close[0]}?)" if close else ""
+
+
+def _fmt(labels: Set[str]) -> str:
+    return ":" + "|".join(sorted(labels)) if labels else ""
+
+
+_validator: Optional[CypherValidator] = None
+
+
+def get_validator() -> CypherValidator:
+    """Return a validator for the loaded schema (built once per process)."""
+    global _validator
+    if _validator is None:
+        _validator = CypherValidator(get_schema())
+    return _validator
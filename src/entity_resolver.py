@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+entity_resolver.py
+Map the names a user types ("her2", "type 2 diabetes") to the values stored
+in the graph (``ERBB2``, ``type 2 diabetes mellitus``) before prompting.
+
+``export_neo4j_schema.py --names`` dumps every ``name`` plus its aliases
+(``synonyms``, ``mondo_name``) per label into one compact file, read here
+through ``mmap`` without loading it:
+
+- normalised keys (lower case, punctuation folded to spaces), sorted, with
+  offset arrays and the first 8 bytes of each key as an integer - exact and
+  longest-span matching is a binary search over plain integers;
+- a character-trigram index over the keys for the fuzzy fallback, where the
+  rarest trigrams of a mention pick the candidates that are scored.
+
+Only the standard library is used, so the exporter can write the file from
+a bare Neo4j environment.
+
+    ENTITY_NAMES_PATH=data/input/entity_names.bin   # unset: resolver off
+    ENTITY_FUZZY_THRESHOLD=0.7                      # trigram Dice similarity
+
+Usage
+-----
+from entity_resolver import get_entity_resolver
+resolver = get_entity_resolver()            # EntityResolver or None
+mentions = resolver.resolve("Which drugs target her2?")
+resolver.render(mentions)   # "### Entity Values" prompt section
+
+python -m src.entity_resolver data/input/entity_names.bin "Which drugs target her2?"
+"""
+
+from __future__ import annotations
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+MAGIC = b"T2CNAMES"
+FORMAT_VERSION = 1
+NAME_PROPERTY = "name"
+ALIAS_PROPERTIES = ("synonyms", "mondo_name")
+MAX_SPAN_WORDS = 6
+MAX_VALUES_PER_MENTION = 3
+MAX_POSTINGS = 50_000       # a trigram on more keys than this picks no candidates
+FUZZY_CANDIDATES = 64       # candidates scored per fuzzy lookup
+
+_WORD_RE = re.compile(r"[^\W_]+")
+# Words that never start or make up an entity mention on their own
+_STOPWORDS = {
+    "a", "all", "an", "and", "any", "are", "be", "by", "can", "do", "does", "find", "for",
+    "from", "get", "give", "has", "have", "how", "in", "into", "is", "it", "its", "list",
+    "many", "me", "of", "on", "or", "related", "return", "show", "that", "the", "their",
+    "them", "these", "this", "those", "to", "was", "were", "what", "which", "who", "with",
+    # question verbs
+    "associate", "cause", "connect", "detect", "express", "interact", "involve", "know",
+    "link", "mention", "name", "relate", "target", "treat", "use",
+}
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping for vocabulary checks: "treated" -> "treat"."""
+    for suffix in ("ing", "ed", "es", "s", "d"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize(text: str) -> str:
+    """Lower-case ``text`` and fold punctuation to single spaces: "Type-2 Diabetes" -> "type 2 diabetes"."""
+    return " ".join(_WORD_RE.findall(text.casefold()))
+
+
+def _grams(key: str) -> Set[str]:
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _gram_id(gram: str) -> int:
+    return zlib.crc32(gram.encode("utf-8"))
+
+
+def _prefix(key: bytes) -> int:
+    """First 8 bytes of ``key`` as an integer; orders like the bytes themselves."""
+    return int.from_bytes(key[:8].ljust(8, b"\0"), "big")
+
+
+def _dice(a: Set[str], b: Set[str]) -> float:
+    return 2.0 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+# ── writing ────────────────────────────────────────────────────────────
+def _pad(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 8)
+
+
+def write_name_index(path, rows: Iterable[Tuple[str, str, Iterable[str]]]) -> Dict[str, int]:
+    """Write ``(label, name, aliases)`` rows to ``path``; return entry/key/trigram counts."""
+    labels: Dict[str, int] = {}
+    values: List[Tuple[int, str]] = []
+    entry_ids: Dict[Tuple[int, str], int] = {}
+    keys: Set[Tuple[bytes, int]] = set()
+    for label, name, aliases in rows:
+        if not name:
+            continue
+        lid = labels.setdefault(label, len(labels))
+        eid = entry_ids.get((lid, name))
+        if eid is None:
+            eid = entry_ids[(lid, name)] = len(values)
+            values.append((lid, name))
+        for alias in (name, *(aliases or ())):
+            key = normalize(str(alias))
+            if key:
+                keys.add((key.encode("utf-8"), eid))
+    sorted_keys = sorted(keys)
+
+    key_blob, key_offsets, key_entries = bytearray(), array("I", [0]), array("I")
+    key_prefixes = array("Q", (_prefix(key) for key, _ in sorted_keys))
+    postings_by_gram: Dict[int, array] = {}
+    for kid, (key, eid) in enumerate(sorted_keys):
+        key_blob += key
+        key_offsets.append(len(key_blob))
+        key_entries.append(eid)
+        for gram in _grams(key.decode("utf-8")):
+            postings_by_gram.setdefault(_gram_id(gram), array("I")).append(kid)
+
+    value_blob, value_offsets, value_labels = bytearray(), array("I", [0]), array("I")
+    for lid, name in values:
+        value_blob += name.encode("utf-8")
+        value_offsets.append(len(value_blob))
+        value_labels.append(lid)
+
+    grams, gram_offsets, postings = array("I"), array("I", [0]), array("I")
+    for gram in sorted(postings_by_gram):
+        grams.append(gram)
+        postings.extend(postings_by_gram[gram])
+        gram_offsets.append(len(postings))
+
+    sections = {
+        "keys": bytes(key_blob), "key_offsets": key_offsets.tobytes(), "key_entries": key_entries.tobytes(),
+        "key_prefixes": key_prefixes.tobytes(),
+        "values": bytes(value_blob), "value_offsets": value_offsets.tobytes(),
+        "value_labels": value_labels.tobytes(),
+        "grams": grams.tobytes(), "gram_offsets": gram_offsets.tobytes(), "postings": postings.tobytes(),
+    }
+    layout, offset = {}, 0
+    for name, data in sections.items():
+        layout[name] = [offset, len(data)]
+        offset += len(_pad(data))
+    header = _pad(json.dumps({
+        "version": FORMAT_VERSION,
+        "labels": sorted(labels, key=labels.get),
+        "sections": layout,
+    }).encode("utf-8"))
+
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(MAGIC + array("I", [len(header), 0]).tobytes() + header)
+        for data in sections.values():
+            f.write(_pad(data))
+    tmp.replace(path)
+    return {"entries": len(values), "keys": len(sorted_keys), "trigrams": len(grams)}
+
+
+# ── reading ────────────────────────────────────────────────────────────
+class NameIndex:
+    """Read-only, memory-mapped view of a file written by :func:`write_name_index`."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mm)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not an entity name index")
+        header_len = view[8:12].cast("I")[0]
+        header = json.loads(bytes(view[16:16 + header_len]).rstrip(b"\0"))
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported name index version {header['version']}")
+        self.labels: List[str] = header["labels"]
+        base = 16 + header_len
+
+        def section(name: str) -> memoryview:
+            start, length = header["sections"][name]
+            return view[base + start:base + start + length]
+
+        self._keys = section("keys")
+        self._key_offsets = section("key_offsets").cast("I")
+        self._key_entries = section("key_entries").cast("I")
+        self._key_prefixes = section("key_prefixes").cast("Q")
+        self._values = section("values")
+        self._value_offsets = section("value_offsets").cast("I")
+        self._value_labels = section("value_labels").cast("I")
+        self._grams = section("grams").cast("I")
+        self._gram_offsets = section("gram_offsets").cast("I")
+        self._postings = section("postings").cast("I")
+        self._all = range(len(self._key_entries))
+
+    def __len__(self) -> int:
+        return len(self._key_entries)
+
+    def _key(self, kid: int) -> bytes:
+        return bytes(self._keys[self._key_offsets[kid]:self._key_offsets[kid + 1]])
+
+    def _entry(self, eid: int) -> Tuple[str, str]:
+        value = bytes(self._values[self._value_offsets[eid]:self._value_offsets[eid + 1]])
+        return self.labels[self._value_labels[eid]], value.decode("utf-8")
+
+    def _first(self, key: bytes) -> int:
+        # Narrow down on the integer prefixes, then compare whole keys
+        p = _prefix(key)
+        lo = bisect_left(self._key_prefixes, p)
+        hi = bisect_right(self._key_prefixes, p, lo)
+        return bisect_left(self._all, key, lo, hi, key=self._key) if hi > lo else lo
+
+    def probe(self, key: str) -> Tuple[List[Tuple[str, str]], bool]:
+        """``(entries for key, whether a longer key "key ..." exists)`` in one binary search.
+
+        Keys hold only word characters and single spaces, and a space sorts
+        before all of them, so any "key ..." directly follows the "key" entries.
+        """
+        raw, out = key.encode("utf-8"), []
+        kid = self._first(raw)
+        while kid < len(self) and self._key(kid) == raw:
+            out.append(self._entry(self._key_entries[kid]))
+            kid += 1
+        return out, kid < len(self) and self._key(kid).startswith(raw + b" ")
+
+    def exact(self, key: str) -> List[Tuple[str, str]]:
+        """``(label, value)`` entries whose name or alias normalises to ``key``."""
+        return self.probe(key)[0]
+
+    def _posting(self, gram: str) -> memoryview:
+        gid = _gram_id(gram)
+        i = bisect_left(self._grams, gid)
+        if i == len(self._grams) or self._grams[i] != gid:
+            return self._postings[0:0]
+        return self._postings[self._gram_offsets[i]:self._gram_offsets[i + 1]]
+
+    def fuzzy(self, key: str, threshold: float) -> List[Tuple[str, str, float]]:
+        """Entries whose key has trigram Dice similarity >= ``threshold`` with ``key``, best first."""
+        grams = _grams(key)
+        lists = sorted((self._posting(g) for g in grams), key=len)
+        # A key sharing most trigrams with ``key`` holds at least one of its rarest ones
+        need = len(grams) - math.ceil(threshold * len(grams)) + 1
+        shared: Counter = Counter()
+        for posting in lists[:need]:
+            if len(posting) <= MAX_POSTINGS:
+                shared.update(posting)
+        best: Dict[int, float] = {}
+        for kid, _ in shared.most_common(FUZZY_CANDIDATES):
+            score = _dice(grams, _grams(self._key(kid).decode("utf-8")))
+            eid = self._key_entries[kid]
+            if score >= threshold and score > best.get(eid, 0.0):
+                best[eid] = score
+        ranked = sorted(best.items(), key=lambda item: -item[1])
+        return [(*self._entry(eid), round(score, 3)) for eid, score in ranked]
+
+
+@dataclass
+class EntityMention:
+    text: str           # the words in the question
+    label: str
+    value: str          # the stored ``name``
+    score: float = 1.0  # 1.0 exact, else trigram similarity
+
+
+class EntityResolver:
+    """Longest exact spans first, then a fuzzy match for leftover runs of words; thread-safe."""
+
+    def __init__(self, index: NameIndex, fuzzy_threshold: float = 0.7, ignore: Iterable[str] = ()):
+        self.index = index
+        self.fuzzy_threshold = fuzzy_threshold
+        # Schema vocabulary ("drugs", "treated") on its own is not an entity
+        self.ignore = {_stem(w) for w in _STOPWORDS} | set(_STOPWORDS)
+        for text in ignore:
+            self.ignore.update(_stem(w) for w in normalize(text).split())
+        self._lock = threading.Lock()
+        self.questions = 0
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self._seconds = 0.0
+
+    def _longest(self, words: List[str], i: int) -> Tuple[int, List[Tuple[str, str]]]:
+        """Longest span starting at ``i`` that is a key: ``(end, entries)``."""
+        end, found, key = i, [], ""
+        for j in range(i, min(len(words), i + MAX_SPAN_WORDS)):
+            key = f"{key} {words[j]}" if key else words[j]
+            entries, longer = self.index.probe(key)
+            if entries:
+                end, found = j + 1, entries
+            if not longer:
+                break
+        return end, found
+
+    def _ignored(self, word: str) -> bool:
+        return word in self.ignore or _stem(word) in self.ignore
+
+    def _resolve(self, question: str) -> List[EntityMention]:
+        words = normalize(question).split()
+        mentions: List[EntityMention] = []
+        run: List[str] = []
+
+        def flush():
+            if run and len(run) <= MAX_SPAN_WORDS and len(" ".join(run)) >= 4:
+                text = " ".join(run)
+                for label, value, score in self.index.fuzzy(text, self.fuzzy_threshold)[:MAX_VALUES_PER_MENTION]:
+                    mentions.append(EntityMention(text, label, value, score))
+            run.clear()
+
+        # Spans may contain schema words ("protein kinase c"); runs left for
+        # the fuzzy match are broken by them
+        i = 0
+        while i < len(words):
+            end, entries = self._longest(words, i)
+            span = words[i:end]
+            if entries and not all(self._ignored(w) for w in span):
+                flush()
+                text = " ".join(span)
+                mentions.extend(EntityMention(text, label, value) for label, value in entries[:MAX_VALUES_PER_MENTION])
+                i = end
+                continue
+            if self._ignored(words[i]):
+                flush()
+            else:
+                run.append(words[i])
+            i += 1
+        flush()
+        return mentions
+
+    def resolve(self, question: str) -> List[EntityMention]:
+        """Return the graph values for the entity mentions in ``question``."""
+        start = time.perf_counter()
+        mentions = self._resolve(question)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.questions += 1
+            self.exact_hits += any(m.score == 1.0 for m in mentions)
+            self.fuzzy_hits += any(m.score < 1.0 for m in mentions)
+            self._seconds += elapsed
+        return mentions
+
+    def canonical(self, label: str, text: str) -> Optional[str]:
+        """The one stored ``label`` name that ``text`` exactly normalises to, else ``None``."""
+        values = {value for lbl, value in self.index.exact(normalize(text)) if lbl == label}
+        return values.pop() if len(values) == 1 else None
+
+    @staticmethod
+    def render(mentions: List[EntityMention]) -> str:
+        """The prompt section listing the stored values, or ``""`` without mentions."""
+        if not mentions:
+            return ""
+        lines = ["### Entity Values", "Names in the question as stored in the graph (use these exact values):"]
+        for m in mentions:
+            note = "" if m.score == 1.0 else f" (approximate, {m.score:.2f})"
+            lines.append(f"\"{m.text}\": {m.label}.{NAME_PROPERTY} = '{m.value}'{note}")
+        return "\n".join(lines)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "names": len(self.index),
+                "questions": self.questions,
+                "exact_hits": self.exact_hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "avg_us": round(self._seconds * 1e6 / self.questions, 1) if self.questions else 0.0,
+            }
+
+
+_resolver: Optional[EntityResolver] = None
+_resolver_loaded = False
+
+
+def get_entity_resolver(ignore: Iterable[str] = ()) -> Optional[EntityResolver]:
+    """Return the resolver over ``ENTITY_NAMES_PATH`` (loaded once), or ``None`` when unset/missing."""
+    global _resolver, _resolver_loaded
+    if not _resolver_loaded:
+        _resolver_loaded = True
+        path = os.environ.get("ENTITY_NAMES_PATH")
+        if path and Path(path).expanduser().exists():
+            _resolver = EntityResolver(
+                NameIndex(Path(path).expanduser()),
+                fuzzy_threshold=float(os.environ.get("ENTITY_FUZZY_THRESHOLD", "0.7")),
+                ignore=ignore,
+            )
+    return _resolver
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("usage: python -m src.entity_resolver NAMES_FILE QUESTION...")
+    resolver = EntityResolver(NameIndex(sys.argv[1]))
+    for question in sys.argv[2:]:
+        print(resolver.render(resolver.resolve(question)) or f"{question}: no entities")
+        print(resolver.stats())
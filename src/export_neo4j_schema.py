@@ -3,6 +3,7 @@ import json
 from pathlib import Path
 from neo4j import GraphDatabase
 from utils import get_env_variable
+from entity_resolver import ALIAS_PROPERTIES, NAME_PROPERTY, write_name_index
 import sys
 
 # Map Neo4j property types to simplified types; It is a helper function you write to normalize Neo4j’s internal data types into clean, predictable, JSON-friendly types.
@@ -36,6 +37,8 @@ def main():
     print("entering into Main Function")
     parser = argparse.ArgumentParser(description="Export Neo4j schema.")
     parser.add_argument("--output_dir", required=True, help="Path to store neo4j_schema.json")
+    parser.add_argument("--names", action="store_true",
+                        help="Also dump entity names/synonyms to entity_names.bin for the resolver")
     args = parser.parse_args()
 
     try:
@@ -57,6 +60,10 @@ def main():
     with driver.session(database=db_name) as session:
         node_schema = get_node_schema(session)
         rel_schema  = get_relationship_schema(session)
+        if args.names:
+            names_path = output_dir / "entity_names.bin"
+            counts = write_name_index(names_path, get_entity_names(session, node_schema))
+            print(f"Entity names dumped → {names_path} ({counts['entries']} names, {counts['keys']} keys)")
 
     node_schema = _sort_schema(node_schema)
     rel_schema  = _sort_schema(rel_schema)
@@ -104,6 +111,25 @@ def get_node_schema(session):
     return schema
 
 
+def get_entity_names(session, node_schema):
+    """Yield ``(label, name, aliases)`` for every node with a name, streamed label by label."""
+    for label, props in node_schema.items():
+        if NAME_PROPERTY not in props:
+            continue
+        aliases = [p for p in ALIAS_PROPERTIES if p in props]
+        # Decide list vs scalar per node: a property's types can be mixed ("String, StringArray")
+        alias_expr = " + ".join(f"CASE WHEN n.`{p}` IS :: LIST<ANY> NOT NULL THEN n.`{p}` ELSE [n.`{p}`] END"
+                                for p in aliases) or "[]"
+        q = f"""
+        MATCH (n:`{label}`)
+        WHERE n.`{NAME_PROPERTY}` IS NOT NULL
+        RETURN n.`{NAME_PROPERTY}` AS name, [a IN {alias_expr} WHERE a IS NOT NULL] AS aliases
+        """
+        print(f"dumping names for {label}")
+        for rec in session.run(q):
+            yield label, rec["name"], rec["aliases"]
+
+
 def get_relationship_schema(session):
     print("relationship schema function entered")
     rel_schema = {}
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+fast_path.py
+Rule-based Cypher for simple one-hop questions - no LLM call.
+
+Many questions are "X related to Y by REL": one relationship between two
+labels, filtered on one named entity.  Those are answered from the schema
+alone - relationship endpoint pairs, plus the verb of each relationship from
+its schema hint ("Drug treats Disease") or its type name:
+
+    "Which drugs treat asthma?"
+    MATCH (d:Drug)-[r:TREATS]->(d2:Disease)
+    WHERE toLower(d2.name) CONTAINS toLower('asthma')
+    RETURN d, r, d2 LIMIT 10
+
+The generator only answers when exactly one relationship/orientation fits
+the labels and verb in the question and exactly one entity is left over
+(a quoted literal or one contiguous run of words); anything else returns
+``None`` and the caller falls back to the LLM.  A run of words is only an
+entity when it reads as a bare name: at most three words (longer only when
+the entity resolver knows the exact name), no other relationship's verb
+("diseases associated with TP53"), no ordering or limit words ("asthma
+with fewest side effects", "asthma limit 50") and - unless the resolver
+knows the name - no preposition, conjunction or number ("asthma in 2020").  Output follows SYSTEM_RULES:
+named relationship, ``toLower`` filters except on case-sensitive properties
+(``Protein.name``) and on names the entity resolver maps to a stored value
+("her2" -> ``p.name = 'ERBB2'``), nodes and relationship returned, ``LIMIT 10``.
+
+Usage
+-----
+from fast_path import OneHopGenerator
+fast = OneHopGenerator(get_schema(), get_schema_hints())
+cypher = fast.generate("Which drugs treat asthma?")   # str or None
+fast.stats()    # {questions, hits, hit_rate, avg_us, ...}
+"""
+
+from __future__ import annotations
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from src.schema_loader import relationship_endpoints
+from src.utils import stem
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9][\w'\-]*")
+_QUOTED_RE = re.compile(r"""'([^']+)'|"([^"]+)\"""")
+# Words that can surround the labels, verb and entity of a one-hop question
+_FUNCTION_WORDS = {
+    "a", "all", "an", "any", "are", "be", "been", "by", "can", "could", "did", "do", "does",
+    "find", "for", "from", "get", "give", "has", "have", "in", "into", "is", "list", "me",
+    "of", "on", "related", "return", "show", "that", "the", "their", "to", "was", "were",
+    "what", "which", "who", "whose", "with", "connected", "linked",
+}
+# A leftover word from this set means a follow-up or a compound question
+_REJECT_WORDS = {"it", "its", "they", "them", "those", "these", "this", "and", "or", "not", "how", "many",
+                 "count", "number", "most", "top", "both", "either", "without", "except",
+                 "fewest", "least", "limit", "sort", "sorted", "order", "ordered", "first"}
+# Prepositions and conjunctions that make a run of leftover words more than one name
+_JOINING_WORDS = {
+    "about", "after", "and", "as", "at", "before", "between", "but", "by", "during", "for", "from",
+    "in", "into", "nor", "of", "on", "or", "over", "per", "since", "than", "to", "under", "via",
+    "with", "within", "without",
+}
+_MAX_ENTITY_WORDS = 3     # longer runs only when the resolver knows the exact name
+DEFAULT_LIMIT = 10
+_SLOT = "QUOTEDENTITY"
+
+
+@dataclass(frozen=True)
+class _Relation:
+    type: str
+    pairs: Tuple[Tuple[str, str], ...]
+    verb: FrozenSet[str]        # stems that name the relationship in a question
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in re.split(r"[\s_]+", text.lower()) if w]
+
+
+def _skip_back(tokens, i: int) -> int:
+    """Index of the word before ``i``, skipping articles ("the disease asthma")."""
+    i -= 1
+    while i >= 0 and tokens[i].group().lower() in ("the", "a", "an"):
+        i -= 1
+    return i
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+class OneHopGenerator:
+    """Deterministic one-hop Cypher from schema vocabulary; thread-safe."""
+
+    def __init__(
+        self,
+        schema: Dict[str, Any],
+        hints: Optional[Dict[str, Any]] = None,
+        case_sensitive: Iterable[Tuple[str, str]] = (("Protein", "name"),),
+        resolver=None,
+    ):
+        node_types = schema.get("NodeTypes", {})
+        self.properties: Dict[str, Set[str]] = {label: set(props) for label, props in node_types.items()}
+        self.case_sensitive = {tuple(p) for p in case_sensitive}
+        self.resolver = resolver    # EntityResolver: "her2" -> the stored "ERBB2"
+        # Label -> stem sequence; longest first so "modified protein" beats "protein"
+        self.labels = sorted(
+            ((label, tuple(stem(w) for w in _words(label))) for label in node_types),
+            key=lambda item: -len(item[1]),
+        )
+        label_stems = {s for _, stems in self.labels for s in stems}
+
+        rel_hints = (hints or {}).get("relationships", {})
+        self.relations: List[_Relation] = []
+        for rel, meta in schema.get("RelationshipTypes", {}).items():
+            pairs = tuple(p for p in relationship_endpoints(meta) if p[0] in node_types and p[1] in node_types)
+            if not pairs:
+                continue
+            verb = self._verb(rel_hints.get(rel, ""), pairs) or {
+                stem(w) for w in _words(rel) if w not in _FUNCTION_WORDS} - label_stems
+            self.relations.append(_Relation(rel, pairs, frozenset(verb)))
+        self.by_name = {r.type.lower(): r for r in self.relations}
+        self.verb_stems = frozenset(s for r in self.relations for s in r.verb)
+
+        self._lock = threading.Lock()
+        self.questions = 0
+        self.hits = 0
+        self.rejected = 0       # generated but failed validation (reported by the caller)
+        self._seconds = 0.0
+
+    @staticmethod
+    def _verb(hint: str, pairs: Tuple[Tuple[str, str], ...]) -> Set[str]:
+        """Stems of the hint's verb phrase: "Protein is detected in Disease" -> {"detect"}."""
+        words = _words(hint)
+        start, end = pairs[0][0], pairs[0][1]
+        head, tail = _words(start), _words(end)
+        if words[:len(head)] == head:
+            words = words[len(head):]
+        if tail and words[-len(tail):] == tail:
+            words = words[:-len(tail)]
+        return {stem(w) for w in words if w not in _FUNCTION_WORDS}
+
+    # ── matching ──────────────────────────────────────────────────────
+    def _match(self, question: str) -> Optional[str]:
+        question = question.strip().rstrip("?.! ")
+        quoted = [m.group(1) or m.group(2) for m in _QUOTED_RE.finditer(question)]
+        if len(quoted) > 1:
+            return None
+        text = _QUOTED_RE.sub(f" {_SLOT} ", question)
+        tokens = list(_TOKEN_RE.finditer(text))
+        stems = [stem(t.group()) for t in tokens]
+        # label:<L> | verb | rel | entity | None
+        role: List[Optional[str]] = ["entity" if t.group() == _SLOT else None for t in tokens]
+
+        mentions: List[Tuple[int, int, str]] = []          # (first token, last token, label)
+        for label, label_stems in self.labels:
+            n = len(label_stems)
+            for i in range(len(tokens) - n + 1):
+                if tuple(stems[i:i + n]) == label_stems and all(r is None for r in role[i:i + n]):
+                    role[i:i + n] = [f"label:{label}"] * n
+                    mentions.append((i, i + n - 1, label))
+        mentions.sort()
+        mentioned = {label for _, _, label in mentions}
+
+        # The relationship: an explicit type name ("by TREATS") or its verb
+        named = [i for i, t in enumerate(tokens) if t.group().lower() in self.by_name]
+        if len(named) > 1:
+            return None
+        if named:
+            relations = [self.by_name[tokens[named[0]].group().lower()]]
+            role[named[0]] = "rel"
+        else:
+            q_stems = {s for s, r in zip(stems, role) if r is None}
+            relations = [r for r in self.relations if r.verb and r.verb <= q_stems]
+        fits = {(r, f, t) for r in relations for f, t in r.pairs if mentioned and mentioned <= {f, t}}
+        if not fits and not mentioned and len(relations) == 1 and len(relations[0].pairs) == 1:
+            fits = {(relations[0], *relations[0].pairs[0])}
+        if len(fits) != 1:
+            return None
+        relation, start, end = fits.pop()
+        if not named:
+            for i, s in enumerate(stems):
+                if role[i] is None and s in relation.verb:
+                    role[i] = "verb"
+        verb_at = [i for i, r in enumerate(role) if r in ("verb", "rel")]
+        if not verb_at:
+            return None
+        verb_pos = verb_at[0]
+
+        # The entity: a quoted literal, else the single run of leftover words
+        leftover = [i for i, t in enumerate(tokens)
+                    if role[i] is None and t.group().lower() not in _FUNCTION_WORDS]
+        if any(tokens[i].group().lower() in _REJECT_WORDS for i in leftover):
+            return None
+        if quoted:
+            if leftover:
+                return None
+            first = last = role.index("entity")
+            entity = quoted[0].strip()
+        else:
+            if not leftover or leftover[-1] - leftover[0] > 5:
+                return None
+            first, last = leftover[0], leftover[-1]
+            if any(r is not None for r in role[first:last + 1]):
+                return None
+            entity = text[tokens[first].start():tokens[last].end()]
+
+        # A label right before or after the entity names its type ("the disease
+        # asthma", "Alzheimer's disease"); any other label is the one asked for
+        typed = {label for i, j, label in mentions if j == _skip_back(tokens, first) or i == last + 1}
+        asked = {label for i, j, label in mentions if not (j == _skip_back(tokens, first) or i == last + 1)}
+        if start == end:
+            return None     # same label on both ends: direction is a guess, leave it to the LLM
+        if len(asked) > 1 or len(typed) > 1 or typed & asked:
+            return None
+        asked_label = asked.pop() if asked else None
+        typed_label = typed.pop() if typed else None
+        if named:
+            # "drugs related to X by TREATS": word order says nothing, the labels decide
+            if not asked_label and not typed_label:
+                return None
+            asked_start = asked_label == start if asked_label else typed_label == end
+        else:
+            # Active voice with the entity after the verb asks for the start node
+            # ("which drugs treat X"); otherwise for the end node ("what does X treat")
+            passive = any(t.group().lower() == "by" for t in tokens[verb_pos + 1:first])
+            asked_start = (first > verb_pos) != passive
+        if asked_label and (asked_label == start) != asked_start:
+            return None
+        if typed_label and (typed_label == end) != asked_start:
+            return None
+        entity_label = end if asked_start else start
+        if "name" not in self.properties.get(entity_label, ()):
+            return None
+        words = [t.group().lower() for t in tokens[first:last + 1]]
+        if not quoted and not self._bare_name(words, stems[first:last + 1], relation, entity_label, entity):
+            return None
+        return self._cypher(relation.type, start, end, asked_start, entity)
+
+    def _bare_name(self, words: List[str], stems: List[str], relation: _Relation, label: str, entity: str) -> bool:
+        """Whether a run of leftover words is one name rather than a name plus more of the query."""
+        if self.resolver and self.resolver.canonical(label, entity) is not None:
+            return True     # a stored name, whatever its words
+        if len(stems) > _MAX_ENTITY_WORDS:
+            return False
+        if any(w in _JOINING_WORDS or w.isdigit() for w in words):
+            return False
+        return not any(s in self.verb_stems and s not in relation.verb for s in stems)
+
+    def _cypher(self, rel: str, start: str, end: str, entity_on_end: bool, entity: str) -> str:
+        a = start[0].lower()
+        b = end[0].lower() if end[0].lower() != a else f"{end[0].lower()}2"
+        var, label = (b, end) if entity_on_end else (a, start)
+        stored = self.resolver.canonical(label, entity) if self.resolver else None
+        if stored is not None:
+            condition = f"{var}.name = {_quote(stored)}"
+        elif (label, "name") in self.case_sensitive:
+            condition = f"{var}.name = {_quote(entity)}"
+        else:
+            condition = f"toLower({var}.name) CONTAINS toLower({_quote(entity)})"
+        return (
+            f"MATCH ({a}:{start})-[r:{rel}]->({b}:{end})\n"
+            f"WHERE {condition}\n"
+            f"RETURN {a}, r, {b} LIMIT {DEFAULT_LIMIT}"
+        )
+
+    # ── entry point ───────────────────────────────────────────────────
+    def generate(self, question: str) -> Optional[str]:
+        """Return Cypher for a confident one-hop match, else ``None``."""
+        start = time.perf_counter()
+        cypher = self._match(question)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.questions += 1
+            self.hits += cypher is not None
+            self._seconds += elapsed
+        return cypher
+
+    def reject(self) -> None:
+        """Count a generated query the caller discarded (e.g. it failed validation)."""
+        with self._lock:
+            self.hits -= 1
+            self.rejected += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "questions": self.questions,
+                "hits": self.hits,
+                "rejected": self.rejected,
+                "hit_rate": round(self.hits / self.questions, 4) if self.questions else 0.0,
+                "avg_us": round(self._seconds * 1e6 / self.questions, 1) if self.questions else 0.0,
+            }
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+hedging.py
+Hedged LLM calls: when the primary backend is slower than usual, send the
+same prompt to a second backend and keep whichever valid answer comes first.
+
+The hedge fires once the primary has run longer than the ``percentile`` of
+its recent latencies, so only the slow tail pays for a second request.  A
+sliding-window cap (``max_rate``) keeps hedging from doubling the load when
+the primary is slow across the board.  The async path cancels the losing
+call; the sync path cannot interrupt a running call, so the loser finishes in
+a worker thread and its answer is dropped.
+
+With ``slots`` (the backend concurrency semaphore) each async call, the
+hedge included, holds its own slot, and the hedge delay only starts once the
+primary has one - time spent queueing is not backend latency.
+
+Usage
+-----
+from hedging import HedgedRunnable
+main = HedgedRunnable(prompt | make_llm("llama"), prompt | make_llm("groq"),
+                      check=validator.validate, percentile=95, max_rate=0.1, slots=semaphore)
+message = await main.ainvoke(inputs)
+main.stats()        # {calls, hedged, hedge_wins, hedge_rate, delay_ms}
+"""
+
+from __future__ import annotations
+import asyncio
+import concurrent.futures
+import contextlib
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from src.utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Sync hedges need a second thread while the caller's thread waits on the first
+_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+
+class HedgedRunnable(Runnable):
+    """Runs ``primary``; after the hedge delay also ``secondary``; first valid answer wins.
+
+    ``check(text)`` decides validity (anything with ``.ok``); without it the
+    first answer wins.  If neither answer is valid, the first one to arrive is
+    returned; if both calls fail, the primary's error is raised.
+    Streaming is not hedged and goes to ``primary``.
+    """
+
+    def __init__(
+        self,
+        primary: Runnable,
+        secondary: Runnable,
+        check: Optional[Callable[[str], Any]] = None,
+        percentile: float = 95,
+        max_rate: float = 0.1,
+        initial_delay: float = 2.0,
+        min_delay: float = 0.05,
+        min_samples: int = 20,
+        window: int = 1000,
+        slots: Optional[asyncio.Semaphore] = None,
+    ):
+        self.primary = primary
+        self.secondary = secondary
+        self.check = check
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        # callers must not wrap ainvoke in the same semaphore (see ModelCascade)
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=window)
+        self._decisions: deque = deque(maxlen=window)   # 1 per hedged call, 0 otherwise
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    # ── policy ────────────────────────────────────────────────────────
+    def delay(self) -> float:
+        """Seconds to wait for the primary before hedging."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            return max(self.min_delay, percentile(self._latencies, self.percentile))
+
+    def _start(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self._decisions.append(0)
+
+    def _allow_hedge(self) -> bool:
+        """Count this call as hedged unless that would exceed ``max_rate``."""
+        with self._lock:
+            hedged = sum(self._decisions)
+            if hedged + 1 > self.max_rate * len(self._decisions):
+                return False
+            self._decisions[-1] = 1
+            self.hedged += 1
+            return True
+
+    def _record(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _valid(self, message) -> bool:
+        return self.check is None or self.check(message.content).ok
+
+    def _won(self, hedge: bool) -> None:
+        if hedge:
+            with self._lock:
+                self.hedge_wins += 1
+
+    # ── calls ─────────────────────────────────────────────────────────
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any):
+        self._start()
+        start = time.monotonic()
+        primary = _EXECUTOR.submit(self.primary.invoke, input, config, **kwargs)
+        calls = {primary: False}
+        try:
+            delay = self.delay()
+            concurrent.futures.wait([primary], timeout=delay)
+            if not primary.done() and self._allow_hedge():
+                logger.info("hedging: primary slower than %.2fs", delay)
+                calls[_EXECUTOR.submit(self.secondary.invoke, input, config, **kwargs)] = True
+
+            pending, fallback, errors = set(calls), None, {}
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in sorted(done, key=calls.get):     # primary first on a tie
+                    if future is primary and future.exception() is None:
+                        self._record(time.monotonic() - start)
+                    if future.exception() is not None:
+                        errors[calls[future]] = future.exception()
+                        continue
+                    if self._valid(future.result()):
+                        self._won(calls[future])
+                        return future.result()
+                    fallback = future.result() if fallback is None else fallback
+            if fallback is not None:
+                return fallback
+            raise errors.get(False) or errors[True]
+        finally:
+            if not primary.done():
+                # A lower bound, but it keeps the hedge delay from drifting down
+                self._record(time.monotonic() - start)
+            for future in calls:
+                future.cancel()
+
+    async def _asecondary(self, input: Any, config: Optional[RunnableConfig], **kwargs: Any):
+        async with self.slots or contextlib.nullcontext():
+            return await self.secondary.ainvoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any):
+        self._start()
+        if self.slots is not None:
+            await self.slots.acquire()
+        start = time.monotonic()
+        primary = asyncio.ensure_future(self.primary.ainvoke(input, config, **kwargs))
+        if self.slots is not None:
+            # released however the primary ends, even if cancelled before it starts
+            primary.add_done_callback(lambda _: self.slots.release())
+        calls = {primary: False}
+        try:
+            delay = self.delay()
+            await asyncio.wait([primary], timeout=delay)
+            if not primary.done() and self._allow_hedge():
+                logger.info("hedging: primary slower than %.2fs", delay)
+                calls[asyncio.ensure_future(self._asecondary(input, config, **kwargs))] = True
+
+            pending, fallback, errors = set(calls), None, {}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=calls.get):
+                    if task is primary and task.exception() is None:
+                        self._record(time.monotonic() - start)
+                    if task.exception() is not None:
+                        errors[calls[task]] = task.exception()
+                        continue
+                    if self._valid(task.result()):
+                        self._won(calls[task])
+                        return task.result()
+                    fallback = task.result() if fallback is None else fallback
+            if fallback is not None:
+                return fallback
+            raise errors.get(False) or errors[True]
+        finally:
+            if not primary.done():
+                self._record(time.monotonic() - start)
+            for task in calls:
+                task.cancel()
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator:
+        yield from self.primary.stream(input, config, **kwargs)
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator:
+        async for chunk in self.primary.astream(input, config, **kwargs):
+            yield chunk
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.delay()
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+                "delay_ms": round(delay * 1000, 1),
+            }
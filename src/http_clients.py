@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+http_clients.py
+Process-wide pooled HTTP clients shared by every LLM built with ``make_llm``.
+
+Without them each ChatOpenAI instance gets its own connection pool, so a new
+agent (provider switch, schema reload, repair/hedge models) pays TCP and TLS
+setup again.  Here all providers share one keep-alive pool per process (and
+one per event loop on the async side: pooled connections cannot cross loops).
+
+Pool sizes come from the environment:
+
+    LLM_HTTP_MAX_CONNECTIONS=100        # open connections, all hosts together
+    LLM_HTTP_MAX_KEEPALIVE=20           # idle connections kept for reuse
+    LLM_HTTP_KEEPALIVE_EXPIRY=30        # seconds an idle connection is kept
+    LLM_HTTP2=true                      # negotiate HTTP/2 over TLS (h2 ships with httpx[http2])
+
+Usage
+-----
+from http_clients import get_http_client, get_async_http_client
+ChatOpenAI(..., http_client=get_http_client(), http_async_client=get_async_http_client())
+"""
+
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Callable, Optional
+
+import httpx
+
+from src.utils import get_env_variable
+
+logger = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+_TRANSPORT: Optional[httpx.HTTPTransport] = None
+_ASYNC_TRANSPORT: Optional["LoopLocalTransport"] = None
+_CLIENT: Optional[httpx.Client] = None
+_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(get_env_variable("LLM_HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(get_env_variable("LLM_HTTP_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(get_env_variable("LLM_HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+
+
+def _http2() -> bool:
+    """HTTP/2 if asked for and the optional ``h2`` package is installed."""
+    if get_env_variable("LLM_HTTP2", "true").lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.info("h2 not installed; LLM HTTP clients use HTTP/1.1 only")
+        return False
+    return True
+
+
+class LoopLocalTransport(httpx.AsyncBaseTransport):
+    """Keeps one async connection pool per running event loop.
+
+    httpcore connections belong to the loop that opened them, so a single
+    pool breaks as soon as a second loop (a CLI ``asyncio.run``, a test)
+    reuses it.
+    """
+
+    def __init__(self, factory: Callable[[], httpx.AsyncBaseTransport]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncBaseTransport]" = (
+            weakref.WeakKeyDictionary())
+
+    def _transport(self) -> httpx.AsyncBaseTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = self._factory()
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+def shared_transport() -> httpx.HTTPTransport:
+    """The process-wide sync connection pool."""
+    global _TRANSPORT
+    with _LOCK:
+        if _TRANSPORT is None:
+            _TRANSPORT = httpx.HTTPTransport(limits=_limits(), http2=_http2())
+        return _TRANSPORT
+
+
+def shared_async_transport() -> LoopLocalTransport:
+    """The process-wide async connection pool (one per event loop)."""
+    global _ASYNC_TRANSPORT
+    with _LOCK:
+        if _ASYNC_TRANSPORT is None:
+            limits, http2 = _limits(), _http2()
+            _ASYNC_TRANSPORT = LoopLocalTransport(lambda: httpx.AsyncHTTPTransport(limits=limits, http2=http2))
+        return _ASYNC_TRANSPORT
+
+
+# Per-request timeouts come from each ChatOpenAI's ``request_timeout``
+def get_http_client() -> httpx.Client:
+    global _CLIENT
+    transport = shared_transport()
+    with _LOCK:
+        if _CLIENT is None:
+            _CLIENT = httpx.Client(transport=transport, timeout=None, follow_redirects=True)
+        return _CLIENT
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    global _ASYNC_CLIENT
+    transport = shared_async_transport()
+    with _LOCK:
+        if _ASYNC_CLIENT is None:
+            _ASYNC_CLIENT = httpx.AsyncClient(transport=transport, timeout=None, follow_redirects=True)
+        return _ASYNC_CLIENT
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+llm_cache.py
+Persistent SQLite cache of LLM completions, shared by every model built by
+``make_llm`` and by every uvicorn worker on the host.
+
+Entries are keyed by a hash of the fully rendered prompt plus a hash of the
+model configuration string LangChain passes in (model name, temperature, ...).
+The database runs in WAL mode so several processes can read while one writes;
+the least recently used rows are evicted once ``max_entries`` is exceeded.
+Inside ``fresh_completions()`` (a request sent with ``use_cache=false``)
+lookups miss, so the model is called again and its answer replaces the row.
+
+Usage
+-----
+from llm_cache import fresh_completions, get_completion_cache
+llm = ChatOpenAI(..., cache=get_completion_cache())
+with fresh_completions():
+    llm.invoke(prompt)      # never served from the cache
+"""
+
+from __future__ import annotations
+import contextlib
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+from src.utils import get_env_variable, get_project_root
+
+logger = logging.getLogger(__name__)
+
+# last_access is only rewritten when older than this, to keep reads cheap
+_TOUCH_INTERVAL_S = 60.0
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS completions (
+    prompt_hash TEXT NOT NULL,
+    llm_hash    TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    created     REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (prompt_hash, llm_hash)
+);
+CREATE INDEX IF NOT EXISTS completions_last_access ON completions (last_access);
+"""
+
+# Set for the calls of one request (tasks and executor threads copy it)
+_FRESH: ContextVar[bool] = ContextVar("llm_cache_fresh", default=False)
+
+
+@contextlib.contextmanager
+def fresh_completions() -> Iterator[None]:
+    """Skip cached completions for calls made in this context; their answers still refresh the cache."""
+    token = _FRESH.set(True)
+    try:
+        yield
+    finally:
+        _FRESH.reset(token)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _dump_generations(generations: Sequence[Generation]) -> str:
+    return json.dumps([
+        {"text": g.text, "chat": isinstance(g, ChatGeneration)} for g in generations
+    ])
+
+
+def _load_generations(value: str) -> list[Generation]:
+    return [
+        ChatGeneration(message=AIMessage(content=g["text"])) if g["chat"] else Generation(text=g["text"])
+        for g in json.loads(value)
+    ]
+
+
+class SQLiteCompletionCache(BaseCache):
+    """Size-bounded, multi-process safe completion cache backed by SQLite."""
+
+    def __init__(self, path: str | Path, max_entries: int = 10_000, busy_timeout_ms: int = 5_000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA_SQL)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite connections are not thread-safe)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if _FRESH.get():
+            return None
+        key = (_sha256(prompt), _sha256(llm_string))
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, last_access FROM completions WHERE prompt_hash = ? AND llm_hash = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > _TOUCH_INTERVAL_S:
+                conn.execute(
+                    "UPDATE completions SET last_access = ? WHERE prompt_hash = ? AND llm_hash = ?",
+                    (now, *key),
+                )
+            return _load_generations(row[0])
+        except sqlite3.Error as e:
+            logger.warning("LLM cache lookup failed: %s", e)
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)",
+                    (_sha256(prompt), _sha256(llm_string), _dump_generations(return_val), now, now),
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.warning("LLM cache update failed: %s", e)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (count,) = conn.execute("SELECT COUNT(*) FROM completions").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM completions WHERE rowid IN ("
+                "SELECT rowid FROM completions ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self, **kwargs) -> None:
+        self._connect().execute("DELETE FROM completions")
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+
+_COMPLETION_CACHE: SQLiteCompletionCache | None = None
+
+
+def get_completion_cache() -> Optional[SQLiteCompletionCache]:
+    """Return the process-wide completion cache, or ``None`` if ``LLM_CACHE`` is off."""
+    global _COMPLETION_CACHE
+    if get_env_variable("LLM_CACHE", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _COMPLETION_CACHE is None:
+        path = Path(get_env_variable("LLM_CACHE_PATH", "data/cache/llm_cache.sqlite3")).expanduser()
+        _COMPLETION_CACHE = SQLiteCompletionCache(
+            get_project_root() / path,  # relative paths are under the project root, as for the data files
+            max_entries=int(get_env_variable("LLM_CACHE_MAX_ENTRIES", "10000")),
+        )
+    return _COMPLETION_CACHE
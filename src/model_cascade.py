@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+model_cascade.py
+Try a cheap, fast model first and escalate to larger ones only when its
+Cypher fails schema validation (or comes back empty).
+
+Tiers are configured as a comma-separated list of ``provider[:model]``
+entries, cheapest first, e.g. ``LLM_CASCADE=llama:llama3.2-3b,llama,groq``.
+Every tier records how often its answer was accepted and how long it took,
+which is what the tier order should be tuned on.
+
+Usage
+-----
+from model_cascade import ModelCascade, parse_tiers
+cascade = ModelCascade([(name, prompt | llm) for name, llm in tiers], agent.check)
+result, tier = await cascade.ainvoke(inputs)
+cascade.stats()     # {tier: {calls, accepted, hit_rate, p50_ms, ...}}
+"""
+
+from __future__ import annotations
+import contextlib
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import Runnable
+
+from src.cypher_validator import ValidationResult
+from src.utils import percentile
+
+logger = logging.getLogger(__name__)
+
+
+def parse_tiers(spec: str) -> List[Tuple[str, Optional[str]]]:
+    """Parse ``"llama:small-model,llama,groq"`` into ``[(provider, model or None), ...]``."""
+    tiers = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        provider, _, model = item.partition(":")
+        tiers.append((provider.strip(), model.strip() or None))
+    return tiers
+
+
+class TierStats:
+    """Outcome counters and a window of recent latencies for one tier."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.accepted = 0   # answer validated and was returned
+        self.invalid = 0    # answer failed validation (escalated, or repaired on the last tier)
+        self.failed = 0     # the call raised
+        self.latencies: deque = deque(maxlen=window)
+
+    def record(self, outcome: str, seconds: Optional[float]) -> None:
+        with self._lock:
+            self.calls += 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            if seconds is not None:
+                self.latencies.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = list(self.latencies)
+            return {
+                "calls": self.calls,
+                "accepted": self.accepted,
+                "invalid": self.invalid,
+                "failed": self.failed,
+                "hit_rate": round(self.accepted / self.calls, 4) if self.calls else 0.0,
+                "avg_ms": round(sum(latencies) * 1000 / len(latencies), 1) if latencies else 0.0,
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            }
+
+
+class ModelCascade:
+    """Runs ``(name, runnable)`` tiers in order until one's output validates.
+
+    The last tier's output is returned even when invalid, so the caller can
+    still repair it.  An exception from a tier escalates too, except on the
+    last tier, where it propagates.
+    """
+
+    def __init__(self, tiers: Sequence[Tuple[str, Runnable]], check: Callable[[str], ValidationResult]):
+        if not tiers:
+            raise ValueError("a cascade needs at least one tier")
+        self.tiers = list(tiers)
+        self.check = check
+        self._stats = {name: TierStats() for name, _ in self.tiers}
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self.tiers]
+
+    def _judge(self, index: int, text: str, seconds: Optional[float]) -> Tuple[ValidationResult, bool]:
+        """Validate tier ``index``'s output; return it and whether to stop here."""
+        name = self.tiers[index][0]
+        result = self.check(text)
+        last = index == len(self.tiers) - 1
+        self._stats[name].record("accepted" if result.ok else "invalid", seconds)
+        if not result.ok and not last:
+            logger.info("cascade: %s failed validation, escalating", name)
+        return result, result.ok or last
+
+    def _failed(self, index: int, error: Exception, seconds: float) -> None:
+        name = self.tiers[index][0]
+        self._stats[name].record("failed", seconds)
+        if index == len(self.tiers) - 1:
+            raise error
+        logger.warning("cascade: %s failed (%s), escalating", name, error)
+
+    def invoke(self, inputs: Dict[str, Any], first: Optional[str] = None) -> Tuple[ValidationResult, str]:
+        """Return ``(validation result, tier name)``.
+
+        ``first`` is the first tier's output when the caller already has it
+        (e.g. streamed); that tier is then not called again.
+        """
+        for index, (name, runnable) in enumerate(self.tiers):
+            start = time.monotonic()
+            if index == 0 and first is not None:
+                text, seconds = first, None
+            else:
+                try:
+                    text = runnable.invoke(inputs).content
+                except Exception as e:
+                    self._failed(index, e, time.monotonic() - start)
+                    continue
+                seconds = time.monotonic() - start
+            result, done = self._judge(index, text, seconds)
+            if done:
+                return result, name
+        raise AssertionError("unreachable")
+
+    async def ainvoke(self, inputs: Dict[str, Any], first: Optional[str] = None, slots=None) -> Tuple[ValidationResult, str]:
+        """Async :meth:`invoke`; each call holds ``slots`` (a semaphore) while in flight."""
+        for index, (name, runnable) in enumerate(self.tiers):
+            start = time.monotonic()
+            if index == 0 and first is not None:
+                text, seconds = first, None
+            else:
+                try:
+                    # a runnable holding its own slots (HedgedRunnable) is not wrapped again
+                    own = getattr(runnable, "slots", None) is not None
+                    async with contextlib.nullcontext() if own else slots or contextlib.nullcontext():
+                        text = (await runnable.ainvoke(inputs)).content
+                except Exception as e:
+                    self._failed(index, e, time.monotonic() - start)
+                    continue
+                seconds = time.monotonic() - start
+            result, done = self._judge(index, text, seconds)
+            if done:
+                return result, name
+        raise AssertionError("unreachable")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: self._stats[name].snapshot() for name in self.names}
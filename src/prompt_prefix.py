@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+prompt_prefix.py
+Keep the prompt's leading bytes identical across requests so self-hosted
+servers (vLLM ``--enable-prefix-caching``, llama.cpp ``cache_prompt``) can
+reuse the KV cache of the shared prefix, and measure how much of it is reused.
+
+With ``PROMPT_PREFIX_CACHE=true`` the agent's system message is a static
+prefix - ``SYSTEM_RULES`` plus the full, deterministically rendered schema and
+hints - and only the history and question vary after it.  The prefix hash
+changes exactly when the rules, schema or hints do.
+
+``PrefixTracker`` compares each rendered prompt with the previous one and
+reports the shared leading characters/tokens, which is the upper bound on
+what the server's prefix cache can skip.
+
+Usage
+-----
+from prompt_prefix import PrefixTracker, prefix_hash, render_messages
+tracker = PrefixTracker(static_prefix)
+tracker.record(render_messages(prompt.format_messages(**inputs)))
+tracker.stats()     # {requests, prefix_hash, last_shared_chars, avg_shared_ratio, ...}
+"""
+
+from __future__ import annotations
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+
+from src.utils import count_tokens
+
+
+def prefix_hash(text: str) -> str:
+    """Short stable fingerprint of a prompt prefix."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def render_messages(messages: Sequence[BaseMessage]) -> str:
+    """Flatten chat messages in order, the way a chat template lays them out."""
+    return "".join(f"<{m.type}>\n{m.content}\n" for m in messages)
+
+
+class PrefixTracker:
+    """Shared-prefix length between consecutive prompts."""
+
+    def __init__(self, static_prefix: str = ""):
+        self._lock = threading.Lock()
+        self.static_prefix_hash = prefix_hash(static_prefix)
+        self.static_prefix_chars = len(static_prefix)
+        self.static_prefix_tokens = count_tokens(static_prefix) if static_prefix else 0
+        self.requests = 0
+        self.prefix_hits = 0        # requests that kept the whole static prefix
+        self._previous: Optional[str] = None
+        self._shared_ratio_sum = 0.0
+        self.last_shared_chars = 0
+        self.last_shared_tokens = 0
+        self.last_prompt_chars = 0
+
+    def record(self, prompt: str) -> int:
+        """Note ``prompt`` and return how many leading characters it shares with the previous one."""
+        with self._lock:
+            previous, self._previous = self._previous, prompt
+            self.requests += 1
+            shared = len(os.path.commonprefix([previous, prompt])) if previous is not None else 0
+            self.last_shared_chars = shared
+            self.last_prompt_chars = len(prompt)
+            self._shared_ratio_sum += shared / len(prompt) if prompt else 0.0
+            if previous is not None and self.static_prefix_chars and shared >= self.static_prefix_chars:
+                self.prefix_hits += 1
+            self.last_shared_tokens = count_tokens(prompt[:shared]) if shared else 0
+        return shared
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prefix_hash": self.static_prefix_hash,
+                "static_prefix_chars": self.static_prefix_chars,
+                "static_prefix_tokens": self.static_prefix_tokens,
+                "prefix_hits": self.prefix_hits,
+                "last_prompt_chars": self.last_prompt_chars,
+                "last_shared_chars": self.last_shared_chars,
+                "last_shared_tokens": self.last_shared_tokens,
+                "avg_shared_ratio": round(self._shared_ratio_sum / self.requests, 4) if self.requests else 0.0,
+            }
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+query_executor.py
+Run validated, read-only Cypher on Neo4j and stream the records back as
+NDJSON, one line per record, instead of buffering the whole result.
+
+One ``neo4j`` driver (and so one connection pool) serves the process.
+Queries run in explicit READ transactions - the server rejects writes even
+if one slipped past validation - with a timeout, and records are pulled from
+the server ``fetch_size`` at a time as the client reads them.  A READ
+transaction still lets procedures through (``CALL apoc.load.json(...)``,
+``CALL dbms.listConfig()``), so every query is first held to the validator's
+clause allow-list and refused, without touching the driver, if it fails.
+
+    DB_URL=neo4j://localhost:7687       # as for export_neo4j_schema.py
+    DB_NAME=neo4j
+    DB_USER= / DB_PASSWORD=             # optional
+    NEO4J_MAX_POOL_SIZE=50
+    NEO4J_ACQUISITION_TIMEOUT=30        # seconds to wait for a pooled connection
+    NEO4J_FETCH_SIZE=1000               # records per server round trip
+    NEO4J_TX_TIMEOUT=30                 # seconds per query
+    NEO4J_MAX_ROWS=10000                # rows streamed before the result is cut
+
+Lines: ``{"keys": [...]}``, then per record any nodes and relationships
+not seen before - ``{"node": {"id", "labels", "properties"}}``,
+``{"relationship": {"id", "type", "start", "end", "properties"}}`` (element
+ids) - and the ``{"row": [...]}`` itself, where elements are referenced by
+index as ``{"$node": i}``, ``{"$rel": i}`` and paths as ``{"$path": {"nodes":
+[i...], "relationships": [j...]}}``; finally ``{"summary": {"rows", "nodes",
+"relationships", "ms", "truncated", "cached"}}`` - or ``{"error": "..."}``
+in place of whatever did not happen.  Results are cached (see
+result_cache.py) unless the caller opts out.
+
+Usage
+-----
+from query_executor import get_query_executor
+for line in get_query_executor().stream("MATCH (d:Drug) RETURN d LIMIT 10"):
+    ...
+"""
+
+from __future__ import annotations
+import json
+import logging
+import threading
+import time
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.cypher_validator import read_only_issues, tokenize
+from src.result_cache import CachedResult, ResultCache, result_key
+from src.schema_prompt import excluded_properties
+from src.utils import get_env_variable
+
+logger = logging.getLogger(__name__)
+
+
+def _line(obj: Dict[str, Any]) -> str:
+    return json.dumps(obj, default=str, separators=(",", ":")) + "\n"
+
+
+class _GraphPayload:
+    """Per-result index of the nodes and relationships already streamed.
+
+    Each element is written once, on its own line, before the first row
+    that references it; rows carry ``{"$node": i}`` / ``{"$rel": i}``.
+    """
+
+    def __init__(self, executor: "QueryExecutor"):
+        self.executor = executor
+        self.nodes: Dict[str, int] = {}
+        self.relationships: Dict[str, int] = {}
+
+    def row(self, values: Iterable[Any]) -> List[str]:
+        """The lines for one record: any new elements, then the row itself."""
+        pending: List[str] = []
+        row = [self._ref(v, pending) for v in values]
+        pending.append(_line({"row": row}))
+        return pending
+
+    def _node(self, node, pending: List[str]) -> int:
+        index = self.nodes.get(node.element_id)
+        if index is None:
+            index = self.nodes[node.element_id] = len(self.nodes)
+            pending.append(_line({"node": self.executor.encode(node)}))
+        return index
+
+    def _relationship(self, rel, pending: List[str]) -> int:
+        index = self.relationships.get(rel.element_id)
+        if index is None:
+            index = self.relationships[rel.element_id] = len(self.relationships)
+            pending.append(_line({"relationship": self.executor.encode(rel)}))
+        return index
+
+    def _ref(self, value: Any, pending: List[str]) -> Any:
+        if hasattr(value, "labels"):
+            return {"$node": self._node(value, pending)}
+        if hasattr(value, "start_node"):
+            return {"$rel": self._relationship(value, pending)}
+        if hasattr(value, "relationships") and hasattr(value, "nodes"):
+            return {"$path": {"nodes": [self._node(n, pending) for n in value.nodes],
+                              "relationships": [self._relationship(r, pending) for r in value.relationships]}}
+        if isinstance(value, dict):
+            return {k: self._ref(v, pending) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._ref(v, pending) for v in value]
+        return value
+
+
+class QueryExecutor:
+    """Streams query results from a pooled driver; thread-safe."""
+
+    def __init__(
+        self,
+        driver,
+        database: Optional[str] = None,
+        fetch_size: int = 1000,
+        timeout: float = 30.0,
+        max_rows: int = 10_000,
+        exclude: Optional[Iterable[str]] = None,
+        cache: Optional[ResultCache] = None,
+    ):
+        self.driver = driver
+        self.database = database
+        self.fetch_size = fetch_size
+        self.timeout = timeout
+        self.max_rows = max_rows
+        # Embeddings and other excluded properties never leave the server
+        self.exclude = list(excluded_properties() if exclude is None else exclude)
+        self.cache = cache
+
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.cache_hits = 0
+        self.failed = 0
+        self.truncated = 0
+        self.rows = 0
+        self.in_flight = 0
+        self._seconds = 0.0
+
+    # ── values ────────────────────────────────────────────────────────
+    def _properties(self, entity) -> Dict[str, Any]:
+        return {k: self.encode(v) for k, v in entity.items()
+                if not any(fnmatchcase(k, pat) for pat in self.exclude)}
+
+    def encode(self, value: Any) -> Any:
+        """A JSON-ready form of one record value, graph elements written out in full."""
+        if hasattr(value, "labels"):
+            return {"id": value.element_id, "labels": sorted(value.labels), "properties": self._properties(value)}
+        if hasattr(value, "start_node"):
+            return {
+                "id": value.element_id, "type": value.type,
+                "start": value.start_node.element_id, "end": value.end_node.element_id,
+                "properties": self._properties(value),
+            }
+        if hasattr(value, "relationships") and hasattr(value, "nodes"):
+            return {"nodes": [self.encode(n) for n in value.nodes],
+                    "relationships": [self.encode(r) for r in value.relationships]}
+        if isinstance(value, dict):
+            return {k: self.encode(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.encode(v) for v in value]
+        return value
+
+    # ── execution ─────────────────────────────────────────────────────
+    def _session(self):
+        from neo4j import READ_ACCESS
+
+        return self.driver.session(
+            database=self.database, default_access_mode=READ_ACCESS, fetch_size=self.fetch_size)
+
+    def stream(self, cypher: str, params: Optional[Dict[str, Any]] = None,
+               head: Optional[Dict[str, Any]] = None, use_cache: bool = True) -> Iterator[str]:
+        """Yield NDJSON lines for ``cypher``; ``head`` is merged into the first line.
+
+        A complete result small enough for the cache is kept and re-served
+        from memory until it expires.  Closing the generator early (client
+        gone) rolls the transaction back and returns the connection to the pool.
+        """
+        issues = read_only_issues(tokenize(cypher))
+        if issues:
+            with self._lock:
+                self.queries += 1
+                self.failed += 1
+            yield _line({**(head or {}), "error": "; ".join(map(str, issues))})
+            return
+        cache = self.cache if use_cache and self.cache and self.cache.max_bytes > 0 else None
+        key = result_key(cypher, params, self.database) if cache else None
+        cached = cache.get(key) if cache else None
+        with self._lock:
+            self.queries += 1
+            self.cache_hits += cached is not None
+        if cached is not None:
+            yield _line({**(head or {}), "keys": cached.keys})
+            yield cached.body.decode("utf-8")
+            yield _line({"summary": {"rows": cached.rows, "nodes": cached.nodes,
+                                     "relationships": cached.relationships, "ms": 0.0,
+                                     "truncated": cached.truncated, "cached": True}})
+            return
+
+        start, rows, truncated, started = time.perf_counter(), 0, False, False
+        graph = _GraphPayload(self)
+        body: Optional[List[bytes]] = [] if cache else None
+        size = 0
+        with self._lock:
+            self.in_flight += 1
+        try:
+            with self._session() as session, session.begin_transaction(timeout=self.timeout) as tx:
+                result = tx.run(cypher, params or {})
+                keys = list(result.keys())
+                yield _line({**(head or {}), "keys": keys})
+                started = True
+                for record in result:
+                    if rows >= self.max_rows:
+                        truncated = True
+                        break
+                    chunk = "".join(graph.row(record.values()))
+                    if body is not None:
+                        data = chunk.encode("utf-8")
+                        size += len(data)
+                        if cache.accepts(size):
+                            body.append(data)
+                        else:
+                            body = None  # too big to cache: stop copying, keep streaming
+                    yield chunk
+                    rows += 1
+                # read-only: leaving the block rolls back, nothing to commit
+        except Exception as e:
+            logger.warning("query failed after %d rows: %s", rows, e)
+            with self._lock:
+                self.failed += 1
+            yield _line({"error": str(e)} if started else {**(head or {}), "error": str(e)})
+            return
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+                self.rows += rows
+                self.truncated += truncated
+                self._seconds += elapsed
+        if body is not None:
+            cache.set(key, CachedResult(keys, b"".join(body), rows, len(graph.nodes),
+                                        len(graph.relationships), truncated))
+        yield _line({"summary": {"rows": rows, "nodes": len(graph.nodes),
+                                 "relationships": len(graph.relationships),
+                                 "ms": round(elapsed * 1000, 1), "truncated": truncated, "cached": False}})
+
+    def close(self) -> None:
+        self.driver.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            executed = self.queries - self.cache_hits
+            return {
+                "queries": self.queries,
+                "cache_hits": self.cache_hits,
+                "failed": self.failed,
+                "truncated": self.truncated,
+                "rows": self.rows,
+                "in_flight": self.in_flight,
+                "avg_ms": round(self._seconds * 1000 / executed, 1) if executed else 0.0,
+                "fetch_size": self.fetch_size,
+                "timeout": self.timeout,
+                "max_rows": self.max_rows,
+                "result_cache": self.cache.stats() if self.cache else None,
+            }
+
+
+_EXECUTOR: Optional[QueryExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_query_executor() -> QueryExecutor:
+    """Return the process-wide executor, opening the pooled driver on first use.
+
+    Raises ``EnvironmentError`` when ``DB_URL`` is not set.
+    """
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            from neo4j import GraphDatabase
+
+            uri = get_env_variable("DB_URL")
+            user, password = get_env_variable("DB_USER", ""), get_env_variable("DB_PASSWORD", "")
+            driver = GraphDatabase.driver(
+                uri,
+                auth=(user, password) if user else None,
+                max_connection_pool_size=int(get_env_variable("NEO4J_MAX_POOL_SIZE", "50")),
+                connection_acquisition_timeout=float(get_env_variable("NEO4J_ACQUISITION_TIMEOUT", "30")),
+            )
+            _EXECUTOR = QueryExecutor(
+                driver,
+                database=get_env_variable("DB_NAME", "") or None,
+                fetch_size=int(get_env_variable("NEO4J_FETCH_SIZE", "1000")),
+                timeout=float(get_env_variable("NEO4J_TX_TIMEOUT", "30")),
+                max_rows=int(get_env_variable("NEO4J_MAX_ROWS", "10000")),
+                cache=ResultCache(
+                    max_bytes=int(get_env_variable("RESULT_CACHE_MAX_BYTES", str(64 << 20))),
+                    ttl_seconds=float(get_env_variable("RESULT_CACHE_TTL", "300")),
+                    max_entry_bytes=int(get_env_variable("RESULT_CACHE_MAX_ENTRY_BYTES", str(4 << 20))),
+                ),
+            )
+        return _EXECUTOR
+
+
+def query_executor_stats() -> Optional[Dict[str, Any]]:
+    """Stats of the executor, or ``None`` when no query has opened it yet."""
+    return _EXECUTOR.stats() if _EXECUTOR else None
+
+
+def close_query_executor() -> None:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.close()
+            _EXECUTOR = None
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+response_cache.py
+In-process LRU + TTL cache of generated Cypher for ``/api/ask``.
+
+Keys combine the normalised question, the schema/hints version and a digest
+of the recent conversation, so an answer is only reused when all three match.
+
+Usage
+-----
+from response_cache import ResponseCache, make_cache_key
+cache = ResponseCache(max_entries=1024, ttl_seconds=3600)
+key = make_cache_key(question, get_schema_version(), history)
+answer = cache.get(key) or cache.set(key, generate())
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+_WS_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"'[^']*'|\"[^\"]*\"|\S+")
+
+
+def _fold(word: str) -> str:
+    # Quoted values and words with inner capitals (TP53, mTOR) may be
+    # case-sensitive names; only plain and capitalised words are folded.
+    if word[0] in "'\"" or any(c.isupper() for c in word[1:]):
+        return word
+    return word.lower()
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case ordinary words, collapse whitespace and drop trailing punctuation."""
+    words = _WORD_RE.findall(_WS_RE.sub(" ", question.strip()))
+    return " ".join(_fold(w) for w in words).rstrip(" ?.!")
+
+
+def history_digest(history: List[Dict[str, str]], context_messages: int) -> str:
+    """Return a hash of the last ``context_messages`` ``{role, content}`` messages."""
+    recent = history[-context_messages:] if context_messages > 0 else []
+    payload = json.dumps([(m["role"], m["content"]) for m in recent])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def make_cache_key(
+    question: str,
+    schema_version: str,
+    history: List[Dict[str, str]],
+    context_messages: int = 2,
+) -> str:
+    """Return the cache key for ``question`` asked in the given context."""
+    parts = (normalize_question(question), schema_version, history_digest(history, context_messages))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl_seconds``."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key`` or ``None`` (counts a hit/miss)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> Any:
+        """Store ``value`` under ``key``, evicting expired then least-recent entries."""
+        if self.max_entries <= 0:
+            return value
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._purge_expired(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [k for k, (expires, _) in self._entries.items() if expires <= now]
+        for k in expired:
+            del self._entries[k]
+        self.evictions += len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+result_cache.py
+In-process cache of executed query results, bounded by bytes as well as
+TTL, so popular questions are re-served without touching Neo4j.
+
+Keys combine the normalised Cypher (whitespace and keyword case folded;
+string literals, labels, property names and map keys kept as written), the parameters and the database.  A result is stored
+as the deduplicated graph payload ``QueryExecutor`` streams - each node and
+relationship once, by element id, rows referencing them by index - already
+serialised, so a hit is written out as is.
+
+    RESULT_CACHE_MAX_BYTES=67108864     # total payload bytes; 0 turns it off
+    RESULT_CACHE_MAX_ENTRY_BYTES=4194304
+    RESULT_CACHE_TTL=300                # seconds
+
+Usage
+-----
+from result_cache import ResultCache, result_key
+cache = ResultCache(max_bytes=64 << 20, ttl_seconds=300)
+key = result_key(cypher, params, database)
+cached = cache.get(key) or cache.set(key, CachedResult(...))
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.cypher_validator import tokenize
+
+_KEYWORDS = {
+    "MATCH", "OPTIONAL", "WHERE", "AND", "OR", "XOR", "NOT", "RETURN", "WITH", "UNWIND", "AS",
+    "DISTINCT", "IN", "ORDER", "BY", "SKIP", "LIMIT", "ASC", "DESC", "CONTAINS", "STARTS", "ENDS",
+    "IS", "NULL", "TRUE", "FALSE", "CASE", "WHEN", "THEN", "ELSE", "END", "UNION", "ALL", "EXISTS",
+}
+
+
+def normalize_cypher(cypher: str) -> str:
+    """Cypher with single spaces between tokens, upper-case keywords and no trailing ``;``.
+
+    Identifiers are case-sensitive: a name after ``.`` or ``:``, before ``:``
+    or in backticks is never folded (``n.end`` is not ``n.END``).
+    """
+    toks = tokenize(cypher)
+    tokens = []
+    for i, t in enumerate(toks):
+        word = t.keyword()
+        if word in _KEYWORDS and not (
+                i and toks[i - 1].text in (".", ":") or i + 1 < len(toks) and toks[i + 1].text == ":"):
+            tokens.append(word)
+        else:
+            tokens.append(t.text)
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def result_key(cypher: str, params: Optional[Dict[str, Any]] = None, database: Optional[str] = None) -> str:
+    payload = json.dumps([normalize_cypher(cypher), params or {}, database], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedResult:
+    keys: List[str]
+    body: bytes         # the node, relationship and row lines, serialised
+    rows: int
+    nodes: int
+    relationships: int
+    truncated: bool = False
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+
+class ResultCache:
+    """Thread-safe LRU cache bounded by payload bytes; entries expire after ``ttl_seconds``."""
+
+    def __init__(self, max_bytes: int = 64 << 20, ttl_seconds: float = 300.0, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # one huge result must not flush everything else
+        self.max_entry_bytes = max_bytes // 8 if max_entry_bytes is None else max_entry_bytes
+        self._entries: "OrderedDict[str, Tuple[float, CachedResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.too_large = 0
+
+    def accepts(self, size: int) -> bool:
+        """Whether a payload of ``size`` bytes may still be cached (checked while it streams)."""
+        return 0 < self.max_bytes and size <= self.max_entry_bytes
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._drop(key)
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, result: CachedResult) -> CachedResult:
+        """Store ``result``, evicting expired then least-recent entries until it fits."""
+        if not self.accepts(result.size):
+            with self._lock:
+                self.too_large += 1
+            return result
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (now + self.ttl_seconds, result)
+            self.bytes += result.size
+            if self.bytes > self.max_bytes:
+                for k in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                    self._drop(k)
+                    self.evictions += 1
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return result
+
+    def _drop(self, key: str) -> None:
+        _, result = self._entries.pop(key)
+        self.bytes -= result.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "max_entry_bytes": self.max_entry_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "too_large": self.too_large,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -1,30 +1,200 @@
+#!/usr/bin/env python3
+"""
+schema_compress.py
+Question-aware schema pruning: keep only the slice of the Neo4j schema that a
+question needs, so the prompt does not carry every label and property.
 
-# def compress_schema(schema_json: dict) -> dict:
-#     """
-#     Expected schema_json format (example):
-#     {
-#       "nodes": {
-#         "Drug": ["id", "name"],
-#         "Disease": ["id", "name"]
-#       },
-#       "relationships": {
-#         "DRUG_TREATS_DISEASE": {
-#           "from": "Drug",
-#           "to": "Disease"
-#         }
-#       }
-#     }
-#     """
-
-#     nodes = list(schema_json.get("nodes", {}).keys())
-#     relationships = []
-
-#     for rel, meta in schema_json.get("relationships", {}).items():
-#         relationships.append(
-#             f"{rel} ({meta['from']} -> {meta['to']})"
-#         )
-
-#     return {
-#         "nodes": nodes,
-#         "relationships": relationships
-#     }
+Usage
+-----
+from schema_compress import compress_schema
+sub_schema = compress_schema(get_schema(), "Which drugs treat lung cancer?")
+
+python -m src.schema_compress "Which drugs treat lung cancer?"   # token report
+"""
+
+from __future__ import annotations
+import re
+import sys
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from src.schema_loader import SchemaGraph, get_schema, get_schema_graph, relationship_endpoints
+from src.utils import stem
+
+# Properties every selected label keeps so the model can still filter/return it.
+CORE_PROPERTIES = ("id", "name", "synonyms")
+
+_STOPWORDS = {
+    "a", "all", "and", "any", "are", "by", "can", "do", "does", "find", "for",
+    "from", "get", "give", "has", "have", "how", "in", "into", "is", "it",
+    "list", "me", "of", "on", "or", "return", "show", "that", "the", "their",
+    "them", "to", "what", "which", "who", "with",
+}
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stems(text: str) -> Set[str]:
+    words = _WORD_RE.findall(text.lower().replace("_", " "))
+    return {stem(w) for w in words if w not in _STOPWORDS}
+
+
+def detect_schema_elements(schema: Dict[str, Any], question: str) -> Dict[str, Set[str]]:
+    """Return the labels, relationship types and properties named in ``question``.
+
+    Matching is done on word stems, so ``"drugs treating"`` hits ``Drug`` and
+    ``TREATS``.  Properties are returned as ``"Label.prop"`` strings.
+    """
+    q_stems = _stems(question)
+    node_types = schema.get("NodeTypes", {})
+    rel_types = schema.get("RelationshipTypes", {})
+
+    label_stems = {lbl: _stems(lbl) for lbl in node_types}
+    all_label_stems = set().union(*label_stems.values()) if label_stems else set()
+
+    labels = {lbl for lbl, stems in label_stems.items() if stems and stems <= q_stems}
+
+    rels: Set[str] = set()
+    for rel in rel_types:
+        # label names inside a type (IS_BIOMARKER_OF_DISEASE) are not evidence
+        stems = _stems(rel) - all_label_stems
+        if stems and stems & q_stems:
+            rels.add(rel)
+
+    props: Set[str] = set()
+    for lbl, lbl_props in node_types.items():
+        for prop in lbl_props:
+            if prop in CORE_PROPERTIES:
+                continue
+            stems = _stems(prop) - {"mayo", "orphan", "mondo", "umls"}
+            # Drug.pathway should not fire on a question about Pathway nodes
+            if stems and stems <= q_stems and not stems <= all_label_stems:
+                props.add(f"{lbl}.{prop}")
+
+    return {"labels": labels, "relationships": rels, "properties": props}
+
+
+def compress_schema(
+    schema: Dict[str, Any],
+    question: str,
+    keep_properties: Iterable[str] = CORE_PROPERTIES,
+    graph: Optional[SchemaGraph] = None,
+) -> Dict[str, Any]:
+    """Return the sub-schema relevant to ``question`` in the same JSON shape.
+
+    Selected relationships are those named in the question, those connecting
+    two different named labels, the hops of the shortest paths between named
+    labels that are not directly connected, and - for a named label still
+    unconnected - all of its incident relationships (its neighbours along the endpoints).  Every
+    endpoint of a selected relationship is kept as a label.  When nothing in
+    the question matches the schema the full schema is returned unchanged.
+    """
+    found = detect_schema_elements(schema, question)
+    node_types = schema.get("NodeTypes", {})
+    rel_types = schema.get("RelationshipTypes", {})
+    prop_labels = {p.split(".", 1)[0] for p in found["properties"]}
+    seed_labels = found["labels"] | prop_labels
+
+    if not seed_labels and not found["relationships"]:
+        return schema
+
+    pairs = {rel: relationship_endpoints(meta) for rel, meta in rel_types.items()}
+    selected_rels = set(found["relationships"])
+    for rel, rel_pairs in pairs.items():
+        if any(a != b and a in seed_labels and b in seed_labels for a, b in rel_pairs):
+            selected_rels.add(rel)
+
+    covered = {lbl for rel in selected_rels for pair in pairs[rel] for lbl in pair}
+    # Labels two or three hops apart: only the (label, rel, label) hops on their shortest paths
+    if graph is None:
+        graph = get_schema_graph() if schema is get_schema() else SchemaGraph(schema)
+    path_hops: Set[tuple] = set()
+    for a, b in combinations(sorted(seed_labels), 2):
+        if a in covered and b in covered:
+            continue
+        for steps in graph.shortest_paths(a, b):
+            label = a
+            for rel, arrow, other in steps:
+                path_hops.add((rel, label, other) if arrow == "->" else (rel, other, label))
+                label = other
+            covered.update((a, b))
+    for lbl in seed_labels - covered:
+        selected_rels.update(
+            rel for rel, rel_pairs in pairs.items()
+            if any(lbl in pair for pair in rel_pairs)
+        )
+
+    labels = set(seed_labels)
+    for rel in selected_rels:
+        for a, b in pairs[rel]:
+            # a named relationship only drags in the pairs touching named labels
+            if rel in found["relationships"] and seed_labels and not (
+                {a, b} & seed_labels
+            ):
+                continue
+            labels.update((a, b))
+    for rel, a, b in path_hops:
+        labels.update((a, b))
+
+    keep = set(keep_properties)
+    sub_nodes: Dict[str, Dict[str, str]] = {}
+    for lbl in sorted(labels):
+        props = node_types.get(lbl, {})
+        sub_nodes[lbl] = {
+            p: t for p, t in sorted(props.items())
+            if p in keep or f"{lbl}.{p}" in found["properties"]
+        }
+
+    sub_rels: Dict[str, Any] = {}
+    for rel in sorted(selected_rels | {hop[0] for hop in path_hops}):
+        kept = [
+            {"from": a, "to": b} for a, b in pairs[rel]
+            if (rel in selected_rels and a in labels and b in labels) or (rel, a, b) in path_hops
+        ]
+        if kept:
+            sub_rels[rel] = {"_pairs": kept}
+
+    return {"NodeTypes": sub_nodes, "RelationshipTypes": sub_rels}
+
+
+def compress_hints(hints: Optional[Dict[str, Any]], sub_schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Keep only the relationship hints for types present in ``sub_schema``; other sections are kept whole."""
+    if not hints:
+        return hints
+    rels = sub_schema.get("RelationshipTypes", {})
+    kept = {
+        name: text for name, text in hints.get("relationships", {}).items()
+        if any(name == rel or name.startswith(rel + "_") for rel in rels)
+    }
+    rest = {k: v for k, v in hints.items() if k != "relationships"}
+    if kept:
+        rest["relationships"] = kept
+    return rest or None
+
+
+def token_report(question: str) -> List[str]:
+    """Return printable lines comparing full vs. pruned schema prompt tokens."""
+    from src.schema_loader import get_schema, get_schema_hints
+    from src.schema_prompt import build_schema_prompt
+    from src.utils import count_tokens
+
+    schema, hints = get_schema(), get_schema_hints()
+    full = count_tokens(build_schema_prompt(schema, hints))
+    sub_schema = compress_schema(schema, question)
+    pruned = count_tokens(build_schema_prompt(sub_schema, compress_hints(hints, sub_schema)))
+    saved = 100.0 * (full - pruned) / full if full else 0.0
+    return [
+        f"question : {question}",
+        f"labels   : {', '.join(sub_schema['NodeTypes'])}",
+        f"rels     : {', '.join(sub_schema['RelationshipTypes'])}",
+        f"tokens   : full={full} pruned={pruned} saved={saved:.1f}%",
+    ]
+
+
+if __name__ == "__main__":
+    questions = sys.argv[1:] or [
+        "Which drugs treat lung cancer?",
+        "Show proteins detected in pathology samples of breast cancer",
+        "What pathways is the metabolite glucose annotated in?",
+    ]
+    for q in questions:
+        print("\n".join(token_report(q)) + "\n")
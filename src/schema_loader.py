@@ -1,31 +1,44 @@
 #!/usr/bin/env python3
 """
 schema_loader.py
-Fast, memoised accessor for the Neo4j schema JSON and optional hints.
+Fast, memoised accessor for the Neo4j schema JSON and optional hints, and
+the label graph the relationship types form.
+
+    SCHEMA_PATH_MAX_HOPS=3      # longest label path precomputed
+    SCHEMA_PATHS_PER_PAIR=3     # shortest paths kept per label pair
 
 Usage
 -----
-from schema_loader import get_schema, get_schema_hints
+from schema_loader import get_schema, get_schema_graph, get_schema_hints
 schema = get_schema()       # dict, loaded once per process
 hints = get_schema_hints()  # dict or None, loaded once per process
+graph = get_schema_graph()  # SchemaGraph, built once per process
+graph.paths("Drug", "Gene") # ["(Drug)-[TREATS]->(Disease)<-[...]-(Gene)", ...]
 """
 
 from __future__ import annotations
+import hashlib
 import json, os
 from pathlib import Path
-from typing import Dict, Any, Optional
+from itertools import combinations
+from typing import Dict, Any, Iterable, Iterator, Optional, List, Tuple
 
 from dotenv import load_dotenv
 
 load_dotenv()
 _SCHEMA_PATH = Path(os.environ["NEO4J_SCHEMA_PATH"]).expanduser().resolve()
-_HINTS_PATH = Path(os.environ.get("SCHEMA_HINTS_PATH")).expanduser().resolve()
-#_HINTS_PATH = None
+_HINTS_PATH = (
+    Path(os.environ["SCHEMA_HINTS_PATH"]).expanduser().resolve()
+    if os.environ.get("SCHEMA_HINTS_PATH")
+    else None
+)
 
 # ── internal cache --------------------------------------------------------
 _cached_schema: Dict[str, Any] | None = None
 _cached_hints: Dict[str, Any] | None = None
-_hints_loaded: bool = True
+_hints_loaded: bool = False
+_cached_version: str | None = None
+_cached_graph: "SchemaGraph | None" = None
 
 def get_schema() -> Dict[str, Any]:
     """Return the Neo4j schema as a JSON dict (cached)."""
@@ -43,5 +56,130 @@ def get_schema_hints() -> Optional[Dict[str, Any]]:
         if _HINTS_PATH and _HINTS_PATH.exists():
             with _HINTS_PATH.open() as f:
                 _cached_hints = json.load(f)
-    return 
-    
\ No newline at end of file
+    return _cached_hints
+
+def get_schema_version() -> str:
+    """Return a short content hash of the loaded schema and hints (cached).
+
+    Anything derived from the schema (cached answers, indexes) should be keyed
+    by this so it is never reused across schema changes.
+    """
+    global _cached_version
+    if _cached_version is None:
+        payload = json.dumps([get_schema(), get_schema_hints()], sort_keys=True)
+        _cached_version = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+    return _cached_version
+
+def relationship_endpoints(rel_meta: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Return the ``(from, to)`` label pairs of one relationship type.
+
+    The exporter writes a single ``_endpoints: [from, to]`` pair while the
+    hand-curated schema lists every pair under ``_pairs``; both are accepted.
+    """
+    pairs = [(p["from"], p["to"]) for p in rel_meta.get("_pairs", [])]
+    endpoints = rel_meta.get("_endpoints")
+    if endpoints and len(endpoints) == 2 and tuple(endpoints) not in pairs:
+        pairs.append((endpoints[0], endpoints[1]))
+    return pairs
+
+
+# (relationship type, arrow, label reached): one hop of a label path
+Step = Tuple[str, str, str]
+
+
+class SchemaGraph:
+    """Label adjacency of the schema with shortest label paths precomputed.
+
+    Every relationship pair is an edge usable in both directions.  For each
+    ordered pair of distinct labels up to ``max_paths`` shortest paths of at
+    most ``max_hops`` hops are stored, so a lookup is one dict access.
+    """
+
+    def __init__(self, schema: Dict[str, Any], max_hops: int = 3, max_paths: int = 3):
+        self.max_hops = max_hops
+        self.max_paths = max_paths
+        self.labels = sorted(schema.get("NodeTypes", {}))
+        self.edges: Dict[str, List[Step]] = {label: [] for label in self.labels}
+        for rel, meta in sorted(schema.get("RelationshipTypes", {}).items()):
+            for start, end in relationship_endpoints(meta):
+                if start == end:
+                    continue    # self-loops never shorten a path between two labels
+                self.edges.setdefault(start, []).append((rel, "->", end))
+                self.edges.setdefault(end, []).append((rel, "<-", start))
+        for steps in self.edges.values():
+            steps.sort(key=lambda step: (step[2], step[0], step[1]))
+
+        self._paths: Dict[Tuple[str, str], List[Tuple[Step, ...]]] = {}
+        for source in self.edges:
+            self._index_from(source)
+
+    def _index_from(self, source: str) -> None:
+        # Breadth-first layers, remembering every edge that reaches a label
+        # on its shortest distance
+        dist = {source: 0}
+        preds: Dict[str, List[Tuple[str, Step]]] = {}
+        frontier = [source]
+        for hop in range(1, self.max_hops + 1):
+            reached: List[str] = []
+            for label in frontier:
+                for step in self.edges[label]:
+                    other = step[2]
+                    if other not in dist:
+                        dist[other] = hop
+                        reached.append(other)
+                    if dist[other] == hop:
+                        preds.setdefault(other, []).append((label, step))
+            frontier = reached
+        for target in preds:
+            self._paths[(source, target)] = list(self._walk_back(source, target, preds))
+
+    def _walk_back(self, source: str, target: str, preds) -> Iterator[Tuple[Step, ...]]:
+        """Yield up to ``max_paths`` shortest paths ``source`` -> ``target``, in a fixed order."""
+        count = 0
+
+        def walk(label: str, tail: Tuple[Step, ...]):
+            nonlocal count
+            if label == source:
+                count += 1
+                yield tail
+                return
+            for prev, step in preds[label]:
+                if count >= self.max_paths:
+                    return
+                yield from walk(prev, (step,) + tail)
+
+        yield from walk(target, ())
+
+    def neighbours(self, label: str) -> List[Step]:
+        """Typed edges of ``label``: ``(relationship, "->" | "<-", other label)``."""
+        return self.edges.get(label, [])
+
+    def shortest_paths(self, start: str, end: str) -> List[Tuple[Step, ...]]:
+        return self._paths.get((start, end), [])
+
+    def paths(self, start: str, end: str) -> List[str]:
+        """Shortest paths ``start`` -> ``end`` as ``(A)-[REL]->(B)`` patterns."""
+        return [self.render(start, steps) for steps in self.shortest_paths(start, end)]
+
+    def paths_between(self, labels: Iterable[str]) -> List[str]:
+        """Shortest paths between every pair of ``labels``."""
+        return [p for a, b in combinations(sorted(set(labels)), 2) for p in self.paths(a, b)]
+
+    @staticmethod
+    def render(start: str, steps: Iterable[Step]) -> str:
+        out = f"({start})"
+        for rel, arrow, label in steps:
+            out += f"-[{rel}]->({label})" if arrow == "->" else f"<-[{rel}]-({label})"
+        return out
+
+
+def get_schema_graph() -> SchemaGraph:
+    """Return the :class:`SchemaGraph` of the loaded schema (built once)."""
+    global _cached_graph
+    if _cached_graph is None:
+        _cached_graph = SchemaGraph(
+            get_schema(),
+            max_hops=int(os.environ.get("SCHEMA_PATH_MAX_HOPS", "3")),
+            max_paths=int(os.environ.get("SCHEMA_PATHS_PER_PAIR", "3")),
+        )
+    return _cached_graph
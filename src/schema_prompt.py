@@ -1,16 +1,136 @@
-# def build_schema_prompt(schema_summary: dict) -> str:
-#     nodes = "\n".join(f"- {n}" for n in schema_summary["nodes"])
-#     rels = "\n".join(f"- {r}" for r in schema_summary["relationships"])
-    
-#     return  f"""
-# Allowed node labels:
-# {nodes}
-
-# Allowed relationship types:
-# {rels}
-
-# Rules:
-# - Use only the labels and relationships listed above
-# - Respect relationship direction
-# - Add LIMIT 25 unless explicitly requested otherwise
-# """
+#!/usr/bin/env python3
+"""
+schema_prompt.py
+Render a (possibly pruned) schema and its hints into the prompt section the
+agent appends to ``SYSTEM_RULES``.
+
+The default ``compact`` format spends one line per label and per endpoint
+pair instead of indented JSON:
+
+    Drug(name:str,molecular_weight:float)
+    (Drug)-[TREATS]->(Disease)
+
+python -m src.schema_prompt        # token report for NEO4J_SCHEMA_PATH
+"""
+
+from __future__ import annotations
+import json
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.schema_loader import relationship_endpoints
+from src.utils import get_env_variable
+
+# Vector / bookkeeping properties the LLM must never filter on.
+DEFAULT_EXCLUDED_PROPERTIES = ("embedding",)
+
+_TYPE_ABBREVIATIONS = {
+    "String": "str",
+    "StringArray": "str[]",
+    "Double": "float",
+    "Float": "float",
+    "DoubleArray": "float[]",
+    "FloatArray": "float[]",
+    "Long": "int",
+    "Integer": "int",
+    "LongArray": "int[]",
+    "IntegerArray": "int[]",
+    "Boolean": "bool",
+    "Date": "date",
+    "DateTime": "datetime",
+}
+
+
+def excluded_properties() -> List[str]:
+    """Return the property name patterns dropped from the prompt.
+
+    Configured with ``SCHEMA_EXCLUDE_PROPERTIES`` (comma-separated, shell-style
+    wildcards allowed, e.g. ``embedding,*_bert,node_index``).
+    """
+    raw = get_env_variable("SCHEMA_EXCLUDE_PROPERTIES", ",".join(DEFAULT_EXCLUDED_PROPERTIES))
+    return [p.strip() for p in raw.split(",") if p.strip()]
+
+
+def _is_excluded(prop: str, patterns: Iterable[str]) -> bool:
+    return any(fnmatchcase(prop, pat) for pat in patterns)
+
+
+def render_compact_schema(
+    schema: Dict[str, Any],
+    hints: Optional[Dict[str, Any]] = None,
+    exclude: Optional[Iterable[str]] = None,
+) -> str:
+    """Return ``Label(prop:type,...)`` and ``(A)-[REL]->(B)`` lines for ``schema``."""
+    patterns = list(excluded_properties() if exclude is None else exclude)
+
+    lines = ["### Schema", "Nodes:"]
+    for label, props in sorted(schema.get("NodeTypes", {}).items()):
+        fields = ",".join(
+            f"{prop}:{_TYPE_ABBREVIATIONS.get(ptype, ptype)}"
+            for prop, ptype in sorted(props.items())
+            if not _is_excluded(prop, patterns)
+        )
+        lines.append(f"{label}({fields})")
+
+    lines.append("Relationships:")
+    for rel, meta in sorted(schema.get("RelationshipTypes", {}).items()):
+        for start, end in relationship_endpoints(meta):
+            lines.append(f"({start})-[{rel}]->({end})")
+
+    rel_hints = (hints or {}).get("relationships", {})
+    if rel_hints:
+        lines.append("Hints:")
+        lines.extend(f"{rel}: {text}" for rel, text in sorted(rel_hints.items()))
+    for section, value in sorted((hints or {}).items()):
+        if section != "relationships" and value:
+            lines.extend(_compact_hint_section(section, value))
+    return "\n".join(lines)
+
+
+def _compact_value(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _compact_hint_section(section: str, value: Any) -> List[str]:
+    """Any other hint section: ``key: value`` or ``- item`` lines under a ``Section:`` heading."""
+    if isinstance(value, dict):
+        return [f"{section}:"] + [f"{k}: {_compact_value(v)}" for k, v in sorted(value.items())]
+    if isinstance(value, list):
+        return [f"{section}:"] + [f"- {_compact_value(v)}" for v in value]
+    return [f"{section}: {_compact_value(value)}"]
+
+
+def render_json_schema(schema: Dict[str, Any], hints: Optional[Dict[str, Any]] = None) -> str:
+    """Return the schema as indented JSON (the original prompt format).
+
+    Keys are sorted so the same schema always renders to the same bytes.
+    """
+    prompt = "### Schema\n" + json.dumps(schema, indent=2, sort_keys=True)
+    if hints:
+        prompt += "\n\n### Schema Hints\n" + json.dumps(hints, indent=2, sort_keys=True)
+    return prompt
+
+
+def build_schema_prompt(
+    schema: Dict[str, Any],
+    hints: Optional[Dict[str, Any]] = None,
+    fmt: Optional[str] = None,
+) -> str:
+    """Return the schema prompt block in ``fmt`` (``SCHEMA_PROMPT_FORMAT``, default compact)."""
+    fmt = fmt or get_env_variable("SCHEMA_PROMPT_FORMAT", "compact")
+    if fmt == "json":
+        return render_json_schema(schema, hints)
+    if fmt == "compact":
+        return render_compact_schema(schema, hints)
+    raise ValueError(f"Unknown schema prompt format: {fmt}")
+
+
+if __name__ == "__main__":
+    from src.schema_loader import get_schema, get_schema_hints
+    from src.utils import count_tokens
+
+    schema, hints = get_schema(), get_schema_hints()
+    as_json = count_tokens(render_json_schema(schema, hints))
+    compact = count_tokens(render_compact_schema(schema, hints))
+    print(f"json (indent=2) : {as_json:6d} tokens")
+    print(f"compact         : {compact:6d} tokens ({100.0 * (as_json - compact) / as_json:.1f}% smaller)")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+semantic_cache.py
+Near-duplicate question cache: "drugs treating lung cancer" and "which drugs
+treat lung cancer?" map to the same stored Cypher without an LLM call.
+
+Questions are embedded locally (no network) as signed hashed vectors of
+stemmed words, word bigrams and character trigrams, and kept in one preallocated NumPy matrix; a lookup is a
+single matrix-vector product followed by an argmax.
+
+Similarity alone cannot tell "lung" from "liver" or BRCA1 from BRCA2, so a
+hit also needs the same *key words*, in the same order: every word that is
+neither filler nor schema vocabulary (``vocabulary``: labels, relationship
+types) - entity names, identifiers, numbers, negations.  "drugs treating
+lung cancer but not asthma" and "... asthma but not lung cancer" never share
+an answer.
+
+Usage
+-----
+from semantic_cache import SemanticCache
+cache = SemanticCache(threshold=0.92, vocabulary=[*schema["NodeTypes"], *schema["RelationshipTypes"]])
+cache.add("which drugs treat lung cancer?", cypher, namespace=schema_version)
+hit = cache.lookup("drugs treating lung cancer", namespace=schema_version)
+"""
+
+from __future__ import annotations
+import re
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.utils import stem
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_NAME_PART_RE = re.compile(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])")
+# Words that change the phrasing of a question but never its meaning
+_FILLER = {
+    "a", "all", "an", "any", "are", "can", "do", "does", "find", "for", "get",
+    "give", "is", "list", "me", "please", "return", "show", "tell", "that",
+    "the", "what", "which", "who",
+}
+
+
+# Phrasing that never names an entity; with the schema vocabulary these are
+# the only words that may differ between two questions sharing an answer
+_PHRASING = {
+    "about", "as", "at", "between", "by", "from", "have", "has", "in", "into", "of", "on",
+    "related", "connected", "linked", "to", "with", "how", "many", "count", "number",
+}
+
+
+_PHRASING_STEMS = {stem(w) for w in _PHRASING}
+
+
+# Whole-word features outweigh their character trigrams so that a different
+# entity ("TP53" vs "TP63") costs more similarity than a different phrasing.
+_WORD_WEIGHT = 3.0
+_BIGRAM_WEIGHT = 2.0
+
+
+def _words(text: str) -> List[str]:
+    return [
+        w if any(c.isdigit() for c in w) else stem(w)  # keep identifiers verbatim
+        for w in _WORD_RE.findall(text.lower())
+        if w not in _FILLER
+    ]
+
+
+def vocabulary_stems(names: Iterable[str]) -> Set[str]:
+    """Stems of the words in schema names: ``IS_BIOMARKER_OF_DISEASE``, ``ModifiedProtein``."""
+    return {stem(part) for name in names for part in _NAME_PART_RE.findall(name)}
+
+
+def key_words(text: str, vocabulary: FrozenSet[str] = frozenset()) -> Tuple[str, ...]:
+    """The words of ``text`` that must match for a hit, in order (``vocabulary``: stems)."""
+    return tuple(w for w in _words(text) if w not in vocabulary and w not in _PHRASING_STEMS)
+
+
+def _features(text: str) -> List[Tuple[str, float]]:
+    words = _words(text)
+    feats = [(f"w:{w}", _WORD_WEIGHT) for w in words]
+    # bigrams keep word order: "a but not b" is not "b but not a"
+    feats.extend((f"b:{a} {b}", _BIGRAM_WEIGHT) for a, b in zip(words, words[1:]))
+    for w in words:
+        padded = f" {w} "
+        feats.extend((padded[i:i + 3], 1.0) for i in range(len(padded) - 2))
+    return feats
+
+
+def embed(text: str, dim: int = 256) -> np.ndarray:
+    """Return the L2-normalised hashed n-gram embedding of ``text``.
+
+    crc32 is used instead of ``hash()`` so vectors are stable across processes.
+    """
+    vec = np.zeros(dim, dtype=np.float32)
+    for feat, weight in _features(text):
+        h = zlib.crc32(feat.encode("utf-8"))
+        vec[h % dim] += weight if (h >> 31) & 1 else -weight
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+class SemanticCache:
+    """Cosine top-1 cache over question embeddings with LRU eviction.
+
+    Rows are grouped by namespace and key words; a lookup only scores the
+    rows of its own group.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 10_000, dim: int = 256,
+                 vocabulary: Iterable[str] = ()):
+        self.threshold = threshold
+        self.vocabulary = frozenset(vocabulary_stems(vocabulary))
+        self.max_entries = max_entries
+        self.dim = dim
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._matrix = np.zeros((self.max_entries, self.dim), dtype=np.float32)
+        self._last_used = np.zeros(self.max_entries, dtype=np.float64)
+        self._namespace_ids = np.full(self.max_entries, -1, dtype=np.int32)
+        self._questions: List[Optional[str]] = [None] * self.max_entries
+        self._values: List[Any] = [None] * self.max_entries
+        self._namespaces: Dict[str, int] = {}
+        self._slots: Dict[Tuple[int, str], int] = {}  # (namespace id, question) -> row
+        self._size = 0
+
+    def _group(self, question: str, namespace: str) -> str:
+        """The namespace a row is stored and looked up under: caller's namespace plus key words."""
+        return namespace + "\x00" + " ".join(key_words(question, self.vocabulary))
+
+    def _namespace_id(self, namespace: str) -> int:
+        if namespace not in self._namespaces and len(self._namespaces) >= 2 * self.max_entries:
+            self._compact_namespaces()
+        return self._namespaces.setdefault(namespace, len(self._namespaces))
+
+    def _compact_namespaces(self) -> None:
+        """Forget namespaces no live entry uses and renumber the rest."""
+        live = set(self._namespace_ids[: self._size].tolist())
+        remap = {old: new for new, old in enumerate(sorted(live))}
+        self._namespaces = {ns: remap[i] for ns, i in self._namespaces.items() if i in remap}
+        ids = self._namespace_ids[: self._size]
+        self._namespace_ids[: self._size] = [remap[i] for i in ids.tolist()]
+        self._slots = {(remap[ns], q): row for (ns, q), row in self._slots.items()}
+
+    def _best(self, vec: np.ndarray, ns_id: int) -> Tuple[int, float]:
+        if self._size == 0:
+            return -1, 0.0
+        scores = self._matrix[: self._size] @ vec
+        scores[self._namespace_ids[: self._size] != ns_id] = -1.0
+        idx = int(np.argmax(scores))
+        return idx, float(scores[idx])
+
+    def lookup(self, question: str, namespace: str = "") -> Optional[Tuple[Any, float]]:
+        """Return ``(value, similarity)`` of the closest cached question, if above threshold."""
+        vec = embed(question, self.dim)
+        group = self._group(question, namespace)
+        with self._lock:
+            ns_id = self._namespaces.get(group)
+            idx, score = self._best(vec, ns_id) if ns_id is not None else (-1, 0.0)
+            if idx < 0 or score < self.threshold:
+                self.misses += 1
+                return None
+            self._last_used[idx] = time.monotonic()
+            self.hits += 1
+            return self._values[idx], score
+
+    def add(self, question: str, value: Any, namespace: str = "") -> None:
+        """Store ``value`` for ``question``, replacing an earlier entry for the same text."""
+        if self.max_entries <= 0:
+            return
+        vec = embed(question, self.dim)
+        with self._lock:
+            self._store(question, vec, value, self._namespace_id(self._group(question, namespace)), time.monotonic())
+
+    def _store(self, question: str, vec: np.ndarray, value: Any, ns_id: int, last_used: float) -> None:
+        key = (ns_id, question)
+        idx = self._slots.get(key)
+        if idx is None:
+            if self._size < self.max_entries:
+                idx = self._size
+                self._size += 1
+            else:
+                idx = int(np.argmin(self._last_used))
+                self._slots.pop((int(self._namespace_ids[idx]), self._questions[idx]), None)
+            self._slots[key] = idx
+        self._matrix[idx] = vec
+        self._namespace_ids[idx] = ns_id
+        self._questions[idx] = question
+        self._values[idx] = value
+        self._last_used[idx] = last_used
+
+    def rebuild(self, dim: Optional[int] = None, keep: Optional[Callable[[str], bool]] = None) -> int:
+        """Re-embed every entry (optionally at a new ``dim``) and compact the matrix.
+
+        Entries whose namespace fails ``keep`` are dropped, which is how stale
+        schema versions are purged.  Returns the new size.
+        """
+        with self._lock:
+            entries = [
+                (self._questions[i], self._values[i], ns, self._last_used[i])
+                for ns, ns_id in self._namespaces.items()
+                for i in np.flatnonzero(self._namespace_ids[: self._size] == ns_id)
+                if keep is None or keep(ns.split("\x00", 1)[0])
+            ]
+            entries.sort(key=lambda e: e[3])
+            self.dim = dim or self.dim
+            self._reset()
+            for question, value, ns, last_used in entries[-self.max_entries:]:
+                self._store(question, embed(question, self.dim), value, self._namespace_id(ns), last_used)
+            return self._size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._size,
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
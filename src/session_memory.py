@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+session_memory.py
+Per-session conversation memory with a token-budgeted window.
+
+Each session id gets its own history, trimmed from the oldest message so the
+prompt never carries more than ``max_tokens`` of conversation.  Sessions idle
+for ``idle_ttl`` seconds are dropped, and at most ``max_sessions`` are kept
+(least recently used first), which caps total memory.
+
+Usage
+-----
+from session_memory import SessionHistoryStore
+store = SessionHistoryStore(max_tokens=2000)
+history = store.get("browser-tab-id")     # BaseChatMessageHistory
+"""
+
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage
+
+from src.utils import count_tokens
+
+
+class BoundedChatMessageHistory(BaseChatMessageHistory):
+    """In-memory history that forgets its oldest messages past ``max_tokens``."""
+
+    def __init__(self, max_tokens: int = 2000):
+        self.max_tokens = max_tokens
+        self._messages: List[BaseMessage] = []
+        self._tokens: List[int] = []
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self) -> List[BaseMessage]:  # type: ignore[override]
+        with self._lock:
+            return list(self._messages)
+
+    @property
+    def token_count(self) -> int:
+        return sum(self._tokens)
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.add_messages([message])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self._lock:
+            for message in messages:
+                self._messages.append(message)
+                self._tokens.append(count_tokens(str(message.content)))
+            self._trim()
+
+    # In-memory, so the async variants need no executor hop
+    async def aget_messages(self) -> List[BaseMessage]:
+        return self.messages
+
+    async def aadd_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.add_messages(messages)
+
+    def _trim(self) -> None:
+        # always keep the newest message, and never start the window on an answer
+        while len(self._messages) > 1 and sum(self._tokens) > self.max_tokens:
+            self._messages.pop(0)
+            self._tokens.pop(0)
+        while len(self._messages) > 1 and getattr(self._messages[0], "type", "") == "ai":
+            self._messages.pop(0)
+            self._tokens.pop(0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._messages.clear()
+            self._tokens.clear()
+
+
+class SessionHistoryStore:
+    """Thread-safe map of session id to :class:`BoundedChatMessageHistory`."""
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 3600.0, max_tokens: int = 2000):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_tokens = max_tokens
+        self._sessions: "OrderedDict[str, tuple[float, BoundedChatMessageHistory]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def get(self, session_id: str) -> BoundedChatMessageHistory:
+        """Return the history for ``session_id``, creating it if needed."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.pop(session_id, None)
+            history = entry[1] if entry else BoundedChatMessageHistory(self.max_tokens)
+            self._sessions[session_id] = (now, history)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            return history
+
+    def peek(self, session_id: str) -> Optional[BoundedChatMessageHistory]:
+        """Return the history for ``session_id`` if it exists; never creates or refreshes one."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or now - entry[0] >= self.idle_ttl:
+                return None
+            return entry[1]
+
+    def _evict_idle(self, now: float) -> None:
+        # entries are ordered by last access, so stop at the first fresh one
+        while self._sessions:
+            session_id, (last_access, _) = next(iter(self._sessions.items()))
+            if now - last_access < self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            self.evicted += 1
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_ttl": self.idle_ttl,
+                "max_tokens_per_session": self.max_tokens,
+                "evicted": self.evicted,
+                "tokens": sum(h.token_count for _, h in self._sessions.values()),
+            }
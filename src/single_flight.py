@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+single_flight.py
+Coalesce identical in-flight async calls: while a call for a key is running,
+later callers with the same key await its result instead of starting their
+own (e.g. a dashboard refresh firing the same question from many tabs).
+
+The shared call runs as its own task.  A caller that is cancelled (client
+disconnect) only stops waiting; the call itself is cancelled once nobody is
+waiting for it.  Errors reach every waiter and are not remembered, so the
+next caller retries.
+
+Usage
+-----
+from single_flight import SingleFlight
+flights = SingleFlight()
+answer, leader = await flights.do(cache_key, lambda: agent.arespond(question))
+"""
+
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+@dataclass
+class _Call:
+    task: asyncio.Future
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Per-key deduplication of concurrent coroutine calls (single event loop)."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return ``(result, leader)``; ``leader`` is ``False`` when the result was shared."""
+        call = self._calls.get(key)
+        leader = call is None
+        if leader:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), leader
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+                self._forget(key, call)
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / calls, 4) if calls else 0.0,
+        }
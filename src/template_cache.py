@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+template_cache.py
+Entity-slot templates: remember the *shape* of an answered question and reuse
+its Cypher for later questions that differ only in entity values.
+
+    learn:  "which drugs treat lung cancer?" -> ... toLower(d.name) = "lung cancer" ...
+            template  "which drugs treat {0}"  ->  ... = "{0}" ...
+    lookup: "which drugs treat asthma?"      -> ... toLower(d.name) = "asthma" ...
+
+A template is only learnt when every string literal of the generated Cypher
+appears verbatim (case-insensitively) in the question, so each slot is known
+to come from the user's words.  A slot takes at most as many words as the
+learnt value and no conjunctions or modifiers ("but not", "most", "limit"),
+so a question with extra qualifiers goes to the LLM instead.
+
+Usage
+-----
+from template_cache import TemplateCache
+cache = TemplateCache()
+cache.learn(question, cypher, namespace=schema_version)
+cypher = cache.lookup(new_question, namespace=schema_version)
+"""
+
+from __future__ import annotations
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_STRING_LITERAL_RE = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*\"""")
+_WS_RE = re.compile(r"\s+")
+# Slot words never span a separator, and never include a conjunction or a
+# modifier ("asthma but not diabetes", "the most diseases", "lung cancer
+# limit 50"): those change the query's shape, not just its values.
+_MODIFIERS = (
+    "and", "or", "not", "but", "except", "without", "with", "in", "by", "per", "than",
+    "most", "least", "fewest", "more", "less", "top", "limit", "first", "sorted", "order", "the",
+)
+_SLOT_WORD = rf"(?!(?:{'|'.join(_MODIFIERS)})\b)[^\s,;?]+"
+_MIN_STATIC_WORDS = 2
+
+
+@dataclass(frozen=True)
+class Literal:
+    start: int
+    end: int
+    value: str
+    quote: str
+
+
+def extract_string_literals(cypher: str) -> List[Literal]:
+    """Return the quoted string literals in ``cypher`` (escapes left as written)."""
+    return [
+        Literal(m.start(), m.end(), m.group()[1:-1], m.group()[0])
+        for m in _STRING_LITERAL_RE.finditer(cypher)
+    ]
+
+
+def _normalize(question: str) -> str:
+    return _WS_RE.sub(" ", question.strip()).rstrip(" ?.!")
+
+
+def _slot_re(words: int) -> str:
+    """A slot of one word up to as many words as the learnt value had."""
+    return rf"({_SLOT_WORD}(?: {_SLOT_WORD}){{0,{max(words, 1) - 1}}})"
+
+
+def _case_of(literal: str, span: str) -> Callable[[str], str]:
+    """Return how the question's span was transformed into the Cypher literal."""
+    if literal == span:
+        return str
+    if literal == span.upper():
+        return str.upper
+    if literal == span.lower():
+        return str.lower
+    return str
+
+
+@dataclass
+class _Template:
+    pattern: re.Pattern
+    cypher_parts: List[str]                 # static Cypher text around the slots
+    slot_order: List[Tuple[int, str, Callable[[str], str]]]  # (slot, quote, case)
+
+
+class TemplateCache:
+    """LRU-bounded store of question templates, indexed by their static prefix."""
+
+    def __init__(self, max_templates: int = 2048):
+        self.max_templates = max_templates
+        self._templates: "OrderedDict[Tuple[str, str], _Template]" = OrderedDict()
+        self._by_prefix: Dict[Tuple[str, str], List[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.learnt = 0
+
+    # ── building ──────────────────────────────────────────────────────
+    def learn(self, question: str, cypher: str, namespace: str = "") -> bool:
+        """Derive and store a template from an answered question; return ``True`` if stored."""
+        built = self._build(question, cypher)
+        if built is None:
+            return False
+        skeleton, prefix, template = built
+        key = (namespace, skeleton)
+        with self._lock:
+            if key not in self._templates:
+                self._by_prefix.setdefault((namespace, prefix), []).append(skeleton)
+            self._templates[key] = template
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_templates:
+                (ns, old), _ = self._templates.popitem(last=False)
+                self._drop_prefix(ns, old)
+            self.learnt += 1
+        return True
+
+    def _drop_prefix(self, namespace: str, skeleton: str) -> None:
+        prefix_key = (namespace, _word_prefix(skeleton.split("\x00", 1)[0]))
+        bucket = self._by_prefix.get(prefix_key, [])
+        if skeleton in bucket:
+            bucket.remove(skeleton)
+        if not bucket:
+            self._by_prefix.pop(prefix_key, None)
+
+    def _build(self, question: str, cypher: str) -> Optional[Tuple[str, str, _Template]]:
+        literals = extract_string_literals(cypher)
+        if not literals or any("\\" in lit.value for lit in literals):
+            return None
+        q = _normalize(question)
+        q_lower = q.lower()
+
+        # locate each distinct literal in the question, left to right
+        spans: Dict[str, Tuple[int, int]] = {}
+        for lit in literals:
+            key = lit.value.lower()
+            if key in spans:
+                continue
+            pos = q_lower.find(key)
+            if not key or pos < 0 or not _on_word_boundary(q_lower, pos, pos + len(key)):
+                return None
+            spans[key] = (pos, pos + len(key))
+        ordered = sorted(spans.items(), key=lambda kv: kv[1][0])
+        for (_, (_, end)), (_, (start, _)) in zip(ordered, ordered[1:]):
+            if start < end:
+                return None  # overlapping literals
+        slot_of = {key: i for i, (key, _) in enumerate(ordered)}
+
+        statics, regex, cursor = [], ["^"], 0
+        for key, (start, end) in ordered:
+            statics.append(q_lower[cursor:start])
+            regex.append(re.escape(q_lower[cursor:start]) + _slot_re(len(q_lower[start:end].split())))
+            cursor = end
+        statics.append(q_lower[cursor:])
+        regex.append(re.escape(q_lower[cursor:]) + "$")
+        if len(" ".join(statics).split()) < _MIN_STATIC_WORDS:
+            return None
+
+        cypher_parts, slot_order, cursor = [], [], 0
+        for lit in literals:
+            cypher_parts.append(cypher[cursor:lit.start])
+            start, end = spans[lit.value.lower()]
+            slot_order.append((slot_of[lit.value.lower()], lit.quote, _case_of(lit.value, q[start:end])))
+            cursor = lit.end
+        cypher_parts.append(cypher[cursor:])
+
+        skeleton = "\x00".join(statics)
+        template = _Template(re.compile("".join(regex)), cypher_parts, slot_order)
+        return skeleton, _word_prefix(statics[0]), template
+
+    # ── lookup ────────────────────────────────────────────────────────
+    def lookup(self, question: str, namespace: str = "") -> Optional[str]:
+        """Return Cypher for ``question`` filled from a matching template, or ``None``."""
+        q = _normalize(question)
+        q_lower = q.lower()
+        with self._lock:
+            for prefix in _prefixes(q_lower):
+                for skeleton in self._by_prefix.get((namespace, prefix), ()):
+                    template = self._templates[(namespace, skeleton)]
+                    m = template.pattern.match(q_lower)
+                    if m is None:
+                        continue
+                    self._templates.move_to_end((namespace, skeleton))
+                    self.hits += 1
+                    values = [q[m.start(i + 1):m.end(i + 1)] for i in range(len(m.groups()))]
+                    return _fill(template, values)
+            self.misses += 1
+            return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self._by_prefix.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "templates": len(self._templates),
+                "learnt": self.learnt,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _on_word_boundary(text: str, start: int, end: int) -> bool:
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+def _word_prefix(text: str) -> str:
+    """Cut ``text`` back to its last whole word (keeps the trailing space)."""
+    return text[: text.rfind(" ") + 1]
+
+
+def _prefixes(q_lower: str) -> List[str]:
+    """Every candidate static prefix: '' and each leading run of whole words."""
+    out = [""]
+    for m in re.finditer(r"\S+ ?", q_lower):
+        out.append(q_lower[: m.end()])
+    return out
+
+
+def _fill(template: _Template, values: List[str]) -> str:
+    parts = [template.cypher_parts[0]]
+    for (slot, quote, case), static in zip(template.slot_order, template.cypher_parts[1:]):
+        value = case(values[slot]).replace("\\", "\\\\").replace(quote, "\\" + quote)
+        parts.append(f"{quote}{value}{quote}{static}")
+    return "".join(parts)
@@ -1,34 +1,52 @@
 #!/usr/bin/env python3
+import asyncio
 import json
+import logging
 import uuid
 import sys
-from typing import Optional 
+from typing import AsyncIterator, Iterator, Optional, Tuple
 from dotenv import load_dotenv
 
 # LLM wrappers
 from langchain_openai import ChatOpenAI
 
-# Message history
-from langchain_community.chat_message_histories import ChatMessageHistory
-
-# Runnable with history (memory)
-from langchain_core.runnables.history import RunnableWithMessageHistory
-
 # Prompt templates
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 
-from src.utils import get_env_variable
-from src.schema_loader import get_schema, get_schema_hints
-
-# from src.schema_cache import load_schema_once
-# from src.schema_compress import compress_schema
-# from src.schema_prompt import build_schema_prompt
+from src.utils import get_env_variable, count_tokens, clean_cypher
+from src.schema_loader import get_schema, get_schema_graph, get_schema_hints
+from src.schema_compress import compress_schema, compress_hints, detect_schema_elements
+from src.schema_prompt import build_schema_prompt
+from src.prompt_prefix import PrefixTracker, prefix_hash, render_messages
+from src.llm_cache import get_completion_cache
+from src.session_memory import SessionHistoryStore
+from src.cypher_validator import ValidationResult, get_validator
+from src.cypher_grammar import grammar_request_body
+from src.cypher_repair import Answer, CypherRepairer, RepairStats
+from src.model_cascade import ModelCascade, parse_tiers
+from src.hedging import HedgedRunnable
+from src.candidate_selection import CandidateSelector, get_plan_cost
+from src.fast_path import OneHopGenerator
+from src.entity_resolver import get_entity_resolver
+from src.http_clients import get_async_http_client, get_http_client
+from src.backend_pool import POOL_BASE_URL, get_backend_pool, parse_urls, pooled_clients
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# Single shared history store for all providers
-_SHARED_HISTORY = ChatMessageHistory()
+DEFAULT_SESSION_ID = "default"
+
+# Per-session, token-budgeted histories shared by all providers
+_SESSIONS = SessionHistoryStore(
+    max_sessions=int(get_env_variable("MAX_SESSIONS", "1000")),
+    idle_ttl=float(get_env_variable("SESSION_IDLE_TTL", "3600")),
+    max_tokens=int(get_env_variable("SESSION_HISTORY_MAX_TOKENS", "2000")),
+)
+
+# Completions in flight toward the LLM backend from this worker (async path)
+_LLM_SLOTS = asyncio.Semaphore(int(get_env_variable("LLM_MAX_CONCURRENCY", "64")))
 '''
 SYSTEM_RULES = (
    "You are a Neo4j Cypher-generating assistant. You must strictly follow ALL rules below:\n\n"
@@ -143,96 +161,407 @@ RETURN p, r, d LIMIT 10
 
 
 
-def make_llm(provider: str = "llama"):
-    """Return a Chat instance for the specified provider."""
+def make_llm(provider: str = "llama", **overrides):
+    """Return a Chat instance for the specified provider.
+
+    ``overrides`` replace the default ChatOpenAI arguments (e.g. ``max_tokens``).
+    A comma-separated base URL spreads calls over those replicas (see
+    :mod:`src.backend_pool`).  With ``CYPHER_GRAMMAR`` set, llama requests
+    carry the schema grammar (see :mod:`src.cypher_grammar`).
+    """
     if provider == "llama":
-        return ChatOpenAI(
+        kwargs = dict(
             base_url=get_env_variable("LLAMA_BASE_URL"),
             api_key="dummy",
             model=get_env_variable("LLAMA_MODEL"),
             temperature=0,
             request_timeout=20,
             max_tokens = 3008,
-            streaming=False
+            cache=get_completion_cache(),
         )
+        grammar = grammar_request_body()
+        if grammar:
+            kwargs["extra_body"] = grammar
     elif provider == "groq":
-        return ChatOpenAI(
+        kwargs = dict(
             base_url=get_env_variable("GROQ_BASE_URL"),
             model=get_env_variable("GROQ_MODEL"),
             api_key=get_env_variable("GROQ_API_KEY"),
             temperature=0, 
             request_timeout=20,
             max_tokens = 3008,
+            cache=get_completion_cache(),
         )
     else:
         raise ValueError(f"Unknown provider: {provider}")
+    # All providers share one keep-alive connection pool per process
+    kwargs.update(http_client=get_http_client(), http_async_client=get_async_http_client())
+    kwargs.update(overrides)
+
+    urls = parse_urls(kwargs.get("base_url") or "")
+    if len(urls) > 1:
+        pool = get_backend_pool(
+            provider, urls,
+            strategy=get_env_variable("LLM_ROUTING", "ewma"),
+            max_failures=int(get_env_variable("LLM_BACKEND_MAX_FAILURES", "2")),
+            cooldown=float(get_env_variable("LLM_BACKEND_COOLDOWN", "10")),
+        )
+        kwargs["base_url"] = POOL_BASE_URL
+        kwargs["http_client"], kwargs["http_async_client"] = pooled_clients(pool)
+    return ChatOpenAI(**kwargs)
 
 class Text2CypherAgent:
     """Single‑LLM agent that remembers conversation context + schema."""
 
-    def __init__(self, provider: str = "llama"):
+    def __init__(self, provider: str = "llama", prune_schema: Optional[bool] = None):
         self.provider = provider
         self.schema_json = get_schema()
-        self.schema_str = json.dumps(self.schema_json, indent=2)
-        self.hints = get_schema_hints() 
-        # raw_schema = load_schema_once()
-        # schema_summary = compress_schema(raw_schema)
-        # schema_prompt = build_schema_prompt(schema_summary)
-
-        #system_prompt = SYSTEM_RULES + "\n" + schema_prompt
-
-        
-        # Build system prompt with schema and optional hints
-        whole_schema = self.schema_str.replace('{', '{{').replace('}', '}}')
-        system_prompt = SYSTEM_RULES + "\n### Schema\n" + whole_schema
-        
-        if self.hints:
-           hints_str = json.dumps(self.hints, indent=2).replace('{', '{{').replace('}', '}}')
-           system_prompt += "\n\n### Schema Hints\n" + hints_str
-
-        self.llm = make_llm(provider)
-        self.session_id = "shared"  # All agents use same session for shared history
-
-        # build prompt template with history placeholder
+        self.hints = get_schema_hints()
+        if prune_schema is None:
+            prune_schema = get_env_variable("SCHEMA_PRUNING", "true").lower() in ("1", "true", "yes")
+        self.prune_schema = prune_schema
+        self.validate_cypher = get_env_variable("CYPHER_VALIDATION", "true").lower() in ("1", "true", "yes")
+        self.validator = get_validator()
+        # Shortest label paths between the labels a question names, from the
+        # precomputed schema graph, so multi-hop traversals need not be worked out
+        self.schema_graph = get_schema_graph()
+        self.path_hints = get_env_variable("SCHEMA_PATH_HINTS", "true").lower() in ("1", "true", "yes")
+        # Stored names for the entities a question mentions (ENTITY_NAMES_PATH)
+        self.entity_resolver = get_entity_resolver(
+            ignore=[*self.schema_json.get("NodeTypes", {}), *self.schema_json.get("RelationshipTypes", {})])
+
+        self.full_schema_prompt = build_schema_prompt(self.schema_json, self.hints)
+        self.full_schema_tokens = count_tokens(self.full_schema_prompt)
+
+        # Byte-stable system prompt (rules + full schema + hints) for servers
+        # that reuse the KV cache of a shared prompt prefix
+        self.prefix_cache = get_env_variable("PROMPT_PREFIX_CACHE", "false").lower() in ("1", "true", "yes")
+        self.static_prefix = SYSTEM_RULES + "\n" + self.full_schema_prompt
+        self.prefix_hash = prefix_hash(self.static_prefix)
+        self.prefix_tracker = PrefixTracker(self.static_prefix if self.prefix_cache else SYSTEM_RULES)
+        logger.info("static prompt prefix %s (%d chars, prefix cache layout %s)",
+                    self.prefix_hash, len(self.static_prefix), "on" if self.prefix_cache else "off")
+
+        # The system prompt is passed in whole as a variable: it changes per
+        # question when pruning is on, and SYSTEM_RULES itself contains braces.
         self.prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
+            ("system", "{system_prompt}"),
             MessagesPlaceholder(variable_name="history"),
             ("human", "{user_input}")
         ])
 
-        chain_core = self.prompt | self.llm
-
-        def get_history(session_id: str):
-            return _SHARED_HISTORY
-
-        self.chain = RunnableWithMessageHistory(
-            chain_core,
-            get_history,
-            input_messages_key="user_input",
-            history_messages_key="history",
+        # Cheapest tier first; the last one is the main model. History is read
+        # and written here rather than by RunnableWithMessageHistory, so only
+        # the final (validated/repaired) answer is remembered.
+        tiers = parse_tiers(get_env_variable("LLM_CASCADE", "")) or [(provider, None)]
+        tier_llms = [
+            (f"{p}:{m}" if m else p, make_llm(p, **({"model": m} if m else {})))
+            for p, m in tiers
+        ]
+        self.llm = tier_llms[-1][1]
+        self.chain = self.prompt | self.llm
+        tier_chains = [(name, self.prompt | llm) for name, llm in tier_llms]
+
+        # Optional hedge for the main tier: a second provider/replica is asked
+        # when the first is slower than its recent latency percentile
+        self.hedge = None
+        hedge_to = parse_tiers(get_env_variable("LLM_HEDGE_TO", ""))
+        if hedge_to:
+            hedge_provider, hedge_model = hedge_to[0]
+            name, main = tier_chains[-1]
+            self.hedge = HedgedRunnable(
+                main,
+                self.prompt | make_llm(hedge_provider, **({"model": hedge_model} if hedge_model else {})),
+                check=self.validator.validate if self.validate_cypher else None,
+                percentile=float(get_env_variable("LLM_HEDGE_PERCENTILE", "95")),
+                max_rate=float(get_env_variable("LLM_HEDGE_MAX_RATE", "0.1")),
+                slots=_LLM_SLOTS,
+            )
+            tier_chains[-1] = (name, self.hedge)
+        self.cascade = ModelCascade(tier_chains, self.check)
+
+        # Failed validation -> short follow-up turns with just the errors,
+        # bounded by attempts and wall-clock seconds
+        repair_budget = float(get_env_variable("CYPHER_REPAIR_BUDGET", "10"))
+        last_provider, last_model = tiers[-1]
+        self.repair_llm = make_llm(
+            last_provider,
+            max_tokens=int(get_env_variable("CYPHER_REPAIR_MAX_TOKENS", "512")),
+            request_timeout=repair_budget,
+            **({"model": last_model} if last_model else {}),
         )
+        self.repairer = CypherRepairer(
+            self.check,
+            max_attempts=int(get_env_variable("CYPHER_REPAIR_MAX_ATTEMPTS", "2")) if self.validate_cypher else 0,
+            budget=repair_budget,
+        )
+        self.repair_stats = RepairStats()
+
+        # k-candidate mode: sample several answers from the main model at once
+        # and keep the valid one with the cheapest plan. Costing may open a
+        # Neo4j driver, so the selector is only built when first needed.
+        self.candidates = int(get_env_variable("CYPHER_CANDIDATES", "1"))
+        self.candidate_chain = self.prompt | make_llm(
+            last_provider,
+            temperature=float(get_env_variable("CYPHER_CANDIDATE_TEMPERATURE", "0.7")),
+            cache=False,    # identical prompts must not collapse into one cached answer
+            **({"model": last_model} if last_model else {}),
+        )
+        self._selector: Optional[CandidateSelector] = None
 
-    def respond(self, user_text: str) -> str:
-        print("before invoke")
-        result = self.chain.invoke(
-            {"user_input": user_text},
-            config={"configurable": {"session_id": self.session_id}}
+        # Simple one-hop questions ("which drugs treat asthma?") are answered
+        # from the schema alone; anything the rules are unsure of goes to the LLM
+        self.fast_path = (
+            OneHopGenerator(self.schema_json, self.hints, resolver=self.entity_resolver)
+            if get_env_variable("FAST_PATH", "true").lower() in ("1", "true", "yes") else None
         )
-        print("after invoke")
-        return result.content.strip().strip("` ")
 
-    def get_history(self) -> list[dict[str, str]]:
-        """Return chat history as list of {role, content} dicts."""
+    def candidate_paths(self, user_text: str) -> str:
+        """Return the shortest schema paths between the labels named in ``user_text``, or ``""``."""
+        if not self.path_hints:
+            return ""
+        labels = detect_schema_elements(self.schema_json, user_text)["labels"]
+        paths = self.schema_graph.paths_between(labels)
+        return "### Candidate Paths\n" + "\n".join(paths) if paths else ""
+
+    def entity_values(self, user_text: str) -> str:
+        """Return the stored names of the entities mentioned in ``user_text``, or ``""``."""
+        if self.entity_resolver is None:
+            return ""
+        return self.entity_resolver.render(self.entity_resolver.resolve(user_text))
+
+    def question_context(self, user_text: str) -> str:
+        """Candidate paths and entity values for ``user_text``, or ``""``."""
+        return "\n\n".join(filter(None, [self.candidate_paths(user_text), self.entity_values(user_text)]))
+
+    def question_prompts(self, user_text: str) -> Tuple[str, str]:
+        """``(question context, schema prompt)`` for ``user_text``, the context resolved once.
+
+        Pass the pair to :meth:`astream` and :meth:`afinalize` when one
+        request calls both.
+        """
+        context = self.question_context(user_text)
+        return context, self.schema_prompt_for(user_text, context)
+
+    def schema_prompt_for(self, user_text: str, context: Optional[str] = None) -> str:
+        """Return the schema section relevant to ``user_text``, plus its question context."""
+        paths = self.question_context(user_text) if context is None else context
+        if not self.prune_schema:
+            return self.full_schema_prompt + "\n\n" + paths if paths else self.full_schema_prompt
+
+        sub_schema = compress_schema(self.schema_json, user_text)
+        schema_prompt = build_schema_prompt(sub_schema, compress_hints(self.hints, sub_schema))
+        pruned_tokens = count_tokens(schema_prompt)
+        logger.info(
+            "schema tokens: full=%d pruned=%d (%d labels, %d relationship types)",
+            self.full_schema_tokens,
+            pruned_tokens,
+            len(sub_schema.get("NodeTypes", {})),
+            len(sub_schema.get("RelationshipTypes", {})),
+        )
+        return schema_prompt + "\n\n" + paths if paths else schema_prompt
+
+    def build_system_prompt(self, user_text: str) -> str:
+        """Return SYSTEM_RULES plus the schema slice relevant to ``user_text``.
+
+        With the prefix cache layout this is the static prefix for every question.
+        """
+        if self.prefix_cache:
+            return self.static_prefix
+        return SYSTEM_RULES + "\n" + self.schema_prompt_for(user_text)
+
+    def _inputs(self, user_text: str, session_id: str, schema_prompt: str, record: bool = True,
+                context: Optional[str] = None) -> dict:
+        # The static prefix comes first and never varies; history and the
+        # question follow.  Pruned slices then only feed repair turns, and the
+        # candidate paths and entity values travel with the question.
+        paths = ""
+        if self.prefix_cache:
+            paths = self.question_context(user_text) if context is None else context
+        inputs = {
+            "system_prompt": self.static_prefix if self.prefix_cache else SYSTEM_RULES + "\n" + schema_prompt,
+            "history": _SESSIONS.get(session_id).messages,
+            "user_input": paths + "\n\n" + user_text if paths else user_text,
+        }
+        if record:
+            shared = self.prefix_tracker.record(render_messages(self.prompt.format_messages(**inputs)))
+            logger.debug("prompt shares %d leading chars with the previous one", shared)
+        return inputs
+
+    @property
+    def selector(self) -> CandidateSelector:
+        if self._selector is None:
+            self._selector = CandidateSelector(
+                self.candidate_chain, self.check, get_plan_cost(), k=max(self.candidates, 2))
+        return self._selector
+
+    def check(self, text: str) -> ValidationResult:
+        """Validate model output against the schema, applying the deterministic fixes."""
+        if not self.validate_cypher:
+            return ValidationResult(clean_cypher(text))
+        result = self.validator.validate(text)
+        if result.fixes:
+            logger.info("auto-fixed cypher: %s", "; ".join(map(str, result.fixes)))
+        if result.errors:
+            logger.warning("cypher failed validation: %s", "; ".join(map(str, result.errors)))
+        return result
+
+    def fast_answer(
+        self, user_text: str, session_id: str = DEFAULT_SESSION_ID, remember: bool = True
+    ) -> Optional[Answer]:
+        """Answer a simple one-hop question without the LLM, or return ``None``."""
+        if self.fast_path is None:
+            return None
+        cypher = self.fast_path.generate(user_text)
+        if cypher is None:
+            return None
+        result = self.check(cypher)
+        if not result.ok:
+            self.fast_path.reject()
+            return None
+        answer = Answer.from_validation(result)
+        answer.tier = "fast_path"
+        return self._finish(user_text, answer, session_id, remember)
+
+    def _finish(self, user_text: str, answer: Answer, session_id: str, remember: bool = True) -> Answer:
+        if remember:
+            self.add_to_history(user_text, answer.cypher, session_id)
+        self.repair_stats.record(answer)
+        if answer.repairs:
+            logger.info(
+                "cypher repair: %d turn(s) in %.0f ms, valid=%s",
+                answer.repairs, answer.repair_seconds * 1000, answer.ok,
+            )
+        return answer
+
+    # ── sync ──────────────────────────────────────────────────────────
+    def answer(self, user_text: str, session_id: str = DEFAULT_SESSION_ID, candidates: Optional[int] = None) -> Answer:
+        """Generate (escalating through the cascade), validate and repair Cypher.
+
+        ``candidates`` > 1 samples that many answers instead and keeps the
+        cheapest valid plan (default ``CYPHER_CANDIDATES``).
+        """
+        return self.finalize(user_text, None, session_id, candidates)
+
+    def finalize(
+        self, user_text: str, raw: Optional[str], session_id: str = DEFAULT_SESSION_ID,
+        candidates: Optional[int] = None,
+    ) -> Answer:
+        """Run the cascade (``raw``: first tier's output, if already streamed),
+        repair if still invalid, and record the exchange in history."""
+        fast = self.fast_answer(user_text, session_id) if raw is None else None
+        if fast is not None:
+            return fast
+        context, schema_prompt = self.question_prompts(user_text)
+        inputs = self._inputs(user_text, session_id, schema_prompt, record=raw is None, context=context)
+        k, cost = candidates or self.candidates, None
+        if raw is None and k > 1:
+            (result, cost), tier = self.selector.invoke(inputs, k=k), f"candidates:{k}"
+        else:
+            result, tier = self.cascade.invoke(inputs, first=raw)
+        answer = self.repairer.repair(
+            user_text, result, schema_prompt,
+            lambda messages: self.repair_llm.invoke(messages).content,
+        )
+        answer.tier, answer.plan_cost = tier, cost
+        return self._finish(user_text, answer, session_id)
+
+    def respond(self, user_text: str, session_id: str = DEFAULT_SESSION_ID) -> str:
+        return self.answer(user_text, session_id).cypher
+
+    def stream(self, user_text: str, session_id: str = DEFAULT_SESSION_ID) -> Iterator[str]:
+        """Yield the first tier's completion text as it arrives.
+
+        Chunks are raw model output - pass their join to :meth:`finalize`.
+        """
+        context, schema_prompt = self.question_prompts(user_text)
+        inputs = self._inputs(user_text, session_id, schema_prompt, context=context)
+        for chunk in self.cascade.tiers[0][1].stream(inputs):
+            if chunk.content:
+                yield chunk.content
+
+    # ── async ─────────────────────────────────────────────────────────
+    async def aanswer(
+        self, user_text: str, session_id: str = DEFAULT_SESSION_ID, candidates: Optional[int] = None,
+        remember: bool = True,
+    ) -> Answer:
+        """Async :meth:`answer`: no thread is held while the backend works.
+
+        At most ``LLM_MAX_CONCURRENCY`` completions run at once; the rest wait here.
+        ``remember=False`` leaves recording the exchange to the caller.
+        """
+        return await self.afinalize(user_text, None, session_id, candidates, remember)
+
+    async def afinalize(
+        self, user_text: str, raw: Optional[str], session_id: str = DEFAULT_SESSION_ID,
+        candidates: Optional[int] = None, remember: bool = True,
+        prompts: Optional[Tuple[str, str]] = None,
+    ) -> Answer:
+        """Async :meth:`finalize`; ``prompts`` from :meth:`question_prompts` if already built."""
+        fast = self.fast_answer(user_text, session_id, remember) if raw is None else None
+        if fast is not None:
+            return fast
+        context, schema_prompt = prompts or self.question_prompts(user_text)
+        inputs = self._inputs(user_text, session_id, schema_prompt, record=raw is None, context=context)
+        k, cost = candidates or self.candidates, None
+        if raw is None and k > 1:
+            (result, cost), tier = await self.selector.ainvoke(inputs, k=k, slots=_LLM_SLOTS), f"candidates:{k}"
+        else:
+            result, tier = await self.cascade.ainvoke(inputs, first=raw, slots=_LLM_SLOTS)
+
+        async def complete(messages):
+            async with _LLM_SLOTS:
+                return (await self.repair_llm.ainvoke(messages)).content
+
+        answer = await self.repairer.arepair(user_text, result, schema_prompt, complete)
+        answer.tier, answer.plan_cost = tier, cost
+        return self._finish(user_text, answer, session_id, remember)
+
+    async def arespond(self, user_text: str, session_id: str = DEFAULT_SESSION_ID) -> str:
+        return (await self.aanswer(user_text, session_id)).cypher
+
+    async def astream(
+        self, user_text: str, session_id: str = DEFAULT_SESSION_ID, prompts: Optional[Tuple[str, str]] = None,
+    ) -> AsyncIterator[str]:
+        """Async :meth:`stream`, holding one backend slot for the whole completion."""
+        context, schema_prompt = prompts or self.question_prompts(user_text)
+        inputs = self._inputs(user_text, session_id, schema_prompt, context=context)
+        async with _LLM_SLOTS:
+            async for chunk in self.cascade.tiers[0][1].astream(inputs):
+                if chunk.content:
+                    yield chunk.content
+
+    def get_history(self, session_id: str = DEFAULT_SESSION_ID) -> list[dict[str, str]]:
+        """Return the session's chat history as list of {role, content} dicts ([] for unknown ids)."""
+        history = _SESSIONS.peek(session_id)
         messages = []
-        for m in _SHARED_HISTORY.messages:
+        for m in history.messages if history else ():
             role = "assistant" if getattr(m, "type", "") == "ai" else "user"
             messages.append({"role": role, "content": m.content})
         return messages
 
-    def clear_history(self) -> None:
-        """Clear the shared history."""
-        global _SHARED_HISTORY
-        _SHARED_HISTORY = ChatMessageHistory()
+    def add_to_history(self, user_text: str, answer: str, session_id: str = DEFAULT_SESSION_ID) -> None:
+        """Record an exchange answered without the LLM (e.g. from a cache)."""
+        history = _SESSIONS.get(session_id)
+        history.add_user_message(user_text)
+        history.add_ai_message(answer)
+
+    def clear_history(self, session_id: str = DEFAULT_SESSION_ID) -> None:
+        """Forget the session's history."""
+        _SESSIONS.drop(session_id)
+
+    def candidate_stats(self) -> Optional[dict]:
+        return self._selector.stats() if self._selector else None
+
+    def fast_path_stats(self) -> Optional[dict]:
+        return self.fast_path.stats() if self.fast_path else None
+
+    def entity_stats(self) -> Optional[dict]:
+        return self.entity_resolver.stats() if self.entity_resolver else None
+
+    @staticmethod
+    def session_stats() -> dict:
+        return _SESSIONS.stats()
 
 if __name__ == "__main__":
     try:
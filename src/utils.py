@@ -1,4 +1,5 @@
 import logging
+import math
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -46,3 +47,61 @@ def get_env_variable(name: str, default=None, resolve_path=False) -> str:
         resolved_path = (project_root / value).resolve()
         return str(resolved_path)
     return value
+
+
+_TOKEN_ENCODING = None
+
+
+def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
+    """Return the number of prompt tokens in ``text``.
+
+    Uses ``tiktoken`` when its encoding can be loaded.  When the BPE file is
+    unavailable (e.g. no network on first use) a ~4 characters per token
+    estimate is returned instead, which is good enough for comparisons.
+    """
+    global _TOKEN_ENCODING
+    if _TOKEN_ENCODING is None:
+        try:
+            import tiktoken
+
+            _TOKEN_ENCODING = tiktoken.get_encoding(encoding_name)
+        except Exception as e:  # missing package or encoding download failed
+            logger.warning("tiktoken unavailable (%s); estimating token counts", e)
+            _TOKEN_ENCODING = False
+    if _TOKEN_ENCODING is False:
+        return (len(text) + 3) // 4
+    return len(_TOKEN_ENCODING.encode(text))
+
+
+_STEM_SUFFIXES = ("ations", "ation", "ions", "ion", "ings", "ing", "ies", "ied", "ed", "s")
+
+
+def stem(word: str) -> str:
+    """Crude suffix-stripping stem, good enough to match 'treating' to TREATS.
+
+    Not linguistically correct - it only has to map inflections of one word
+    to the same key (``"associated"``/``"association"`` -> ``"associ"``).
+    """
+    word = word.lower()
+    for _ in range(2):
+        for suffix in _STEM_SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                word = word[: -len(suffix)]
+                break
+        else:
+            break
+    return word[:6]
+
+
+def clean_cypher(text: str) -> str:
+    """Strip whitespace and the markdown backticks models wrap Cypher in."""
+    return text.strip().strip("` ")
+
+
+def percentile(values, q: float) -> float:
+    """Return the ``q``-th percentile (0-100) of ``values`` by nearest rank; 0.0 when empty."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered), math.ceil(q / 100 * len(ordered))) - 1)
+    return ordered[rank]
@@ -0,0 +1,23 @@
+"""Shared test helpers."""
+import importlib
+import sys
+
+import pytest
+
+
+def agent_module():
+    """The real src.text2cypher_agent, even if another test module stubbed it."""
+    stub = sys.modules.get('src.text2cypher_agent')
+    if stub is None or hasattr(stub, 'make_llm'):
+        return importlib.import_module('src.text2cypher_agent')
+    del sys.modules['src.text2cypher_agent']
+    try:
+        return importlib.import_module('src.text2cypher_agent')
+    finally:
+        sys.modules['src.text2cypher_agent'] = stub
+
+
+@pytest.fixture(name='agent_module')
+def agent_module_fixture():
+    """Fixture form of :func:`agent_module` for pytest-style tests."""
+    return agent_module()
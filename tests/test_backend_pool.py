@@ -0,0 +1,170 @@
+import asyncio
+import os
+import sys
+import types
+import unittest
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+
+from langchain_openai import ChatOpenAI
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from src.backend_pool import POOL_BASE_URL, BackendPool, get_backend_pool, parse_urls, pooled_clients
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def chat(pool):
+    client, async_client = pooled_clients(pool)
+    return ChatOpenAI(base_url=POOL_BASE_URL, api_key='dummy', model='fake', max_retries=0,
+                      http_client=client, http_async_client=async_client)
+
+
+class BackendPoolRoutingTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.pool = BackendPool(['http://a/v1', 'http://b/v1/'], max_failures=2, cooldown=10, clock=self.clock)
+        self.a, self.b = self.pool.backends
+
+    def test_parse_urls(self):
+        self.assertEqual(parse_urls(' http://a/v1/, ,http://b/v1'), ['http://a/v1', 'http://b/v1'])
+        self.assertEqual(self.b.url, 'http://b/v1')
+
+    def test_unmeasured_replicas_are_tried_first_then_lowest_ewma_wins(self):
+        self.pool.release(self.pool.acquire(), 0.5, True)
+        second = self.pool.acquire()
+        self.assertIs(second, self.b)
+        self.pool.release(second, 0.1, True)
+        self.assertIs(self.pool.acquire(), self.b)
+
+    def test_ewma_is_weighted_by_load(self):
+        self.a.ewma, self.b.ewma = 0.1, 0.3
+        picks = [self.pool.acquire() for _ in range(4)]
+        # a: 0.1*1, 0.1*2, 0.1*3 <= 0.3*1 ...
+        self.assertEqual([b.url for b in picks].count('http://a/v1'), 3)
+        self.assertEqual(self.b.in_flight, 1)
+
+    def test_least_loaded_strategy(self):
+        pool = BackendPool(['http://a', 'http://b'], strategy='least_loaded')
+        pool.backends[0].ewma, pool.backends[1].ewma = 0.1, 5.0
+        self.assertEqual([pool.acquire().url for _ in range(4)], ['http://a', 'http://b', 'http://a', 'http://b'])
+
+    def test_failing_replica_leaves_rotation_and_gets_one_trial_after_cooldown(self):
+        for _ in range(2):
+            self.pool.release(self.pool.acquire(exclude=[self.b]), 0.0, False, 'HTTP 503')
+        self.assertFalse(self.a.healthy)
+        self.assertEqual({self.pool.acquire().url for _ in range(3)}, {'http://b/v1'})
+
+        self.clock.now = 11
+        trial = self.pool.acquire()
+        self.assertIs(trial, self.a)
+        # Only one trial per cooldown
+        self.assertIs(self.pool.acquire(), self.b)
+        self.pool.release(trial, 0.05, True)
+        self.assertTrue(self.a.healthy)
+
+    def test_all_down_still_routes_to_the_replica_due_back_first(self):
+        self.a.healthy = self.b.healthy = False
+        self.a.retry_at, self.b.retry_at = 8, 5
+        self.assertIs(self.pool.acquire(), self.b)
+
+    def test_invalid_configuration(self):
+        with self.assertRaises(ValueError):
+            BackendPool([])
+        with self.assertRaises(ValueError):
+            BackendPool(['http://a'], strategy='random')
+
+    def test_named_pools_are_shared(self):
+        pool = get_backend_pool('test-shared', ['http://a', 'http://b'])
+        self.assertIs(get_backend_pool('test-shared', ['http://a/', 'http://b']), pool)
+        self.assertIsNot(get_backend_pool('test-shared', ['http://a']), pool)
+
+
+class BackendPoolServerTest(unittest.TestCase):
+    """Against real local OpenAI-compatible servers with different delays."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fast = FakeLLMServer(delay=0.01).__enter__()
+        cls.slow = FakeLLMServer(delay=0.15).__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fast.__exit__()
+        cls.slow.__exit__()
+
+    def setUp(self):
+        self.fast.requests = self.slow.requests = 0
+        self.fast.status = self.slow.status = 200
+        self.clock = Clock()
+        self.pool = BackendPool([self.slow.base_url, self.fast.base_url], cooldown=10, clock=self.clock)
+
+    def test_sync_calls_prefer_the_faster_replica(self):
+        llm = chat(self.pool)
+        for _ in range(10):
+            self.assertIn('MATCH', llm.invoke('q').content)
+        self.assertEqual(self.slow.requests, 1)
+        self.assertEqual(self.fast.requests, 9)
+        stats = {s['url']: s for s in self.pool.stats()}
+        self.assertGreater(stats[self.slow.base_url]['ewma_ms'], stats[self.fast.base_url]['ewma_ms'])
+        self.assertEqual(sum(s['in_flight'] for s in stats.values()), 0)
+
+    def test_concurrent_async_calls_spread_over_replicas(self):
+        llm = chat(self.pool)
+
+        async def run():
+            await llm.ainvoke('warm up')
+            await llm.ainvoke('warm up')
+            return await asyncio.gather(*(llm.ainvoke(f'q{i}') for i in range(24)))
+
+        replies = asyncio.run(run())
+        self.assertEqual(len(replies), 24)
+        # The fast replica takes most of the load, but not all of it once queued up
+        self.assertGreater(self.fast.requests, self.slow.requests)
+        self.assertGreater(self.slow.requests, 1)
+        self.assertEqual(sum(s['in_flight'] for s in self.pool.stats()), 0)
+
+    def test_streaming_goes_through_the_pool(self):
+        llm = chat(self.pool)
+        text = ''.join(chunk.content for chunk in llm.stream('q'))
+        self.assertIn('LIMIT 10', text)
+        self.assertEqual(sum(s['requests'] for s in self.pool.stats()), 1)
+        self.assertEqual(sum(s['in_flight'] for s in self.pool.stats()), 0)
+
+    def test_unhealthy_replica_is_removed_and_probed_back_in(self):
+        llm = chat(self.pool)
+        self.fast.status = 503
+        for _ in range(6):
+            try:
+                llm.invoke('q')
+            except Exception:
+                pass
+        stats = {s['url']: s for s in self.pool.stats()}
+        self.assertFalse(stats[self.fast.base_url]['healthy'])
+        self.assertEqual(stats[self.fast.base_url]['last_error'], 'HTTP 503')
+        self.assertEqual(self.fast.requests, 2)
+
+        self.clock.now = 11
+        self.pool.check()          # still down: stays out
+        self.assertFalse(self.pool.backends[1].healthy)
+
+        self.fast.status = 200
+        self.clock.now = 22
+        asyncio.run(self.pool.acheck())
+        self.assertTrue(self.pool.backends[1].healthy)
+
+    def test_refused_connection_fails_over(self):
+        pool = BackendPool(['http://127.0.0.1:9/v1', self.fast.base_url])
+        self.assertIn('MATCH', chat(pool).invoke('q').content)
+        down, up = pool.stats()
+        self.assertEqual((down['failures'], up['requests']), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
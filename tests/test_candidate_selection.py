@@ -0,0 +1,130 @@
+import asyncio
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from benchmarks.fake_llm_server import ANSWER, FakeLLMServer
+from src.candidate_selection import CandidateSelector, ExplainPlanCost, SchemaPlanCost, get_plan_cost
+from src.cypher_validator import get_validator
+from tests.conftest import agent_module
+
+CHEAP = "MATCH (d:Drug)-[r:TREATS]->(x:Disease) WHERE x.name = 'asthma' RETURN d, r, x LIMIT 10"
+COSTLY = "MATCH (d:Drug)-[r:TREATS]-(x:Disease) RETURN d, r, x LIMIT 10"
+INVALID = "MATCH (d:Drug)-[r:TREATZ]->(x:Disease) RETURN d, r, x LIMIT 10"
+
+
+def fake(*replies):
+    return FakeListChatModel(responses=list(replies))
+
+
+class SchemaPlanCostTest(unittest.TestCase):
+    def setUp(self):
+        self.cost = SchemaPlanCost()
+
+    def test_filtered_anchor_is_cheaper_than_a_label_scan(self):
+        self.assertLess(self.cost(CHEAP), self.cost(COSTLY))
+        inline = "MATCH (d:Drug {name: 'aspirin'})-[r:TREATS]->(x:Disease) RETURN d, r, x LIMIT 10"
+        self.assertLess(self.cost(inline), self.cost(CHEAP))
+
+    def test_untyped_hops_and_cartesian_products_are_expensive(self):
+        untyped = "MATCH (d:Drug)-[r]->(x:Disease) WHERE x.name = 'asthma' RETURN d, r, x LIMIT 10"
+        self.assertLess(self.cost(CHEAP), self.cost(untyped))
+        joined = CHEAP.replace(' RETURN', ' MATCH (x)-[r2:TREATS]-(d2:Drug) RETURN')
+        cartesian = CHEAP.replace(' RETURN', ' MATCH (g:Gene)-[r2:TRANSLATED_INTO]-(p:Protein) RETURN')
+        self.assertLess(self.cost(joined), self.cost(cartesian))
+
+    def test_get_plan_cost_falls_back_to_the_schema_without_a_database(self):
+        with mock.patch.dict(os.environ, {'DB_URL': '', 'CYPHER_CANDIDATE_COST': 'auto'}):
+            self.assertIsInstance(get_plan_cost(), SchemaPlanCost)
+        with mock.patch.dict(os.environ, {'CYPHER_CANDIDATE_COST': 'magic'}):
+            self.assertRaises(ValueError, get_plan_cost)
+
+    def test_explain_cost_shares_the_executor_driver(self):
+        executor = mock.MagicMock(driver=object(), database='neo4j')
+        with mock.patch.dict(os.environ, {'DB_URL': 'bolt://db', 'CYPHER_CANDIDATE_COST': 'auto'}), \
+                mock.patch('src.query_executor.get_query_executor', return_value=executor):
+            first, second = get_plan_cost(), get_plan_cost()
+        self.assertIs(first.driver, executor.driver)
+        self.assertIs(second.driver, first.driver)
+        self.assertEqual(first.database, 'neo4j')
+
+
+class ExplainPlanCostTest(unittest.TestCase):
+    def test_sums_estimated_rows_over_the_plan(self):
+        plan = {'operatorType': 'ProduceResults', 'args': {'EstimatedRows': 10.0}, 'children': [
+            {'operatorType': 'Expand(All)', 'args': {'EstimatedRows': 250.0}, 'children': [
+                {'operatorType': 'NodeByLabelScan', 'args': {'EstimatedRows': 40.0}, 'children': []}]}]}
+        session = mock.MagicMock()
+        session.__enter__.return_value.run.return_value.consume.return_value.plan = plan
+        driver = mock.MagicMock(session=mock.MagicMock(return_value=session))
+
+        self.assertEqual(ExplainPlanCost(driver, 'neo4j')(CHEAP), 300.0)
+        # planned as it will run: with the literal lifted into a parameter
+        session.__enter__.return_value.run.assert_called_once_with(
+            'EXPLAIN ' + CHEAP.replace("'asthma'", '$p0'), {'p0': 'asthma'})
+        driver.session.assert_called_once_with(database='neo4j')
+
+
+class CandidateSelectorTest(unittest.TestCase):
+    def setUp(self):
+        self.check = get_validator().validate
+        self.cost = SchemaPlanCost()
+
+    def test_cheapest_valid_candidate_wins(self):
+        selector = CandidateSelector(fake(INVALID, COSTLY, CHEAP), self.check, self.cost, k=3)
+        result, cost = selector.invoke('q')
+        self.assertEqual(result.cypher, CHEAP)
+        self.assertEqual(cost, self.cost(CHEAP))
+        stats = selector.stats()
+        self.assertEqual((stats['generated'], stats['valid'], stats['distinct']), (3, 2, 2))
+
+    def test_async_candidates_run_concurrently(self):
+        selector = CandidateSelector(fake(COSTLY, CHEAP, CHEAP, INVALID), self.check, self.cost)
+        result, _ = asyncio.run(selector.ainvoke('q', k=4, slots=asyncio.Semaphore(4)))
+        self.assertEqual(result.cypher, CHEAP)
+        self.assertEqual(selector.stats()['distinct'], 2)
+
+    def test_without_a_valid_candidate_the_first_is_returned_for_repair(self):
+        selector = CandidateSelector(fake(INVALID, INVALID), self.check, self.cost, k=2)
+        result, cost = selector.invoke('q')
+        self.assertFalse(result.ok)
+        self.assertIsNone(cost)
+        self.assertEqual(selector.stats()['no_valid'], 1)
+
+    def test_candidates_the_planner_rejects_are_dropped(self):
+        def cost(cypher):
+            if 'asthma' in cypher:
+                raise RuntimeError('Neo.ClientError.Statement.SyntaxError')
+            return 5.0
+
+        selector = CandidateSelector(fake(CHEAP, COSTLY), self.check, cost, k=2)
+        self.assertEqual(selector.invoke('q'), (self.check(COSTLY), 5.0))
+
+
+class AgentCandidatesTest(unittest.TestCase):
+    def test_agent_samples_k_candidates_from_the_backend(self):
+        env = {'CYPHER_CANDIDATES': '3', 'CYPHER_CANDIDATE_COST': 'schema', 'LLAMA_MODEL': 'fake',
+               'LLM_CACHE': 'false', 'LLM_CASCADE': '', 'LLM_HEDGE_TO': '', 'CYPHER_GRAMMAR': 'off',
+               'FAST_PATH': 'false'}
+        with FakeLLMServer(delay=0.0) as server, mock.patch.dict(os.environ, env):
+            os.environ['LLAMA_BASE_URL'] = server.base_url
+            agent = agent_module().Text2CypherAgent(provider='llama')
+            answer = asyncio.run(agent.aanswer('which drugs treat asthma?', 'candidates'))
+            agent.clear_history('candidates')
+        self.assertEqual(answer.cypher, ANSWER)
+        self.assertEqual(server.requests, 3)
+        self.assertEqual(server.last_body['temperature'], 0.7)
+        self.assertEqual(answer.report()['tier'], 'candidates:3')
+        self.assertIsNotNone(answer.plan_cost)
+        self.assertEqual(agent.candidate_stats()['valid'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
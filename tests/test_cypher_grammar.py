@@ -0,0 +1,93 @@
+import importlib.util
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from benchmarks.fake_llm_server import ANSWER, FakeLLMServer
+from src.cypher_grammar import build_cypher_grammar, get_cypher_grammar, grammar_request_body
+from tests.conftest import agent_module
+
+SCHEMA = {
+    'NodeTypes': {'Drug': {'name': 'String', 'embedding': 'DoubleArray'}, 'Disease': {'name': 'String'}},
+    'RelationshipTypes': {'TREATS': {'_pairs': [{'from': 'Drug', 'to': 'Disease'}], 'phase': 'Long'}},
+}
+
+
+class GrammarTextTest(unittest.TestCase):
+    def test_vocabulary_comes_from_the_schema(self):
+        grammar = build_cypher_grammar(SCHEMA)
+        self.assertIn('label ::= "Disease" | "Drug"\n', grammar)
+        self.assertIn('reltype ::= "TREATS"\n', grammar)
+        self.assertIn('prop ::= "name" | "phase"\n', grammar)
+        self.assertNotIn('"embedding"', grammar)
+        self.assertIn('"OPTIONAL"', grammar)
+        self.assertNotIn('"CREATE"', grammar)
+
+    def test_odd_names_are_backtick_quoted(self):
+        grammar = build_cypher_grammar({'NodeTypes': {'Cell Line': {}}, 'RelationshipTypes': {}})
+        self.assertIn('label ::= "`Cell Line`"', grammar)
+
+    def test_request_body_follows_the_environment(self):
+        with mock.patch.dict(os.environ, {'CYPHER_GRAMMAR': 'off'}):
+            self.assertIsNone(grammar_request_body())
+        with mock.patch.dict(os.environ, {'CYPHER_GRAMMAR': 'gbnf', 'CYPHER_GRAMMAR_PARAM': 'guided_grammar'}):
+            self.assertEqual(grammar_request_body(), {'guided_grammar': get_cypher_grammar()})
+        with mock.patch.dict(os.environ, {'CYPHER_GRAMMAR': 'regex'}):
+            self.assertRaises(ValueError, grammar_request_body)
+
+
+@unittest.skipUnless(importlib.util.find_spec('xgrammar'), 'xgrammar not installed')
+class GrammarAcceptanceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import xgrammar
+        from xgrammar.testing import _is_grammar_accept_string
+
+        grammar = xgrammar.Grammar.from_ebnf(get_cypher_grammar())
+        cls.accepts = staticmethod(lambda text: _is_grammar_accept_string(grammar, text))
+
+    def test_rule_abiding_queries_parse(self):
+        for query in [
+            ANSWER,
+            'MATCH (p:Protein)\nWHERE p.name IN ["H4C1","CT47A1"]\n'
+            'MATCH (p)-[r:DETECTED_IN_PATHOLOGY_SAMPLE]-(d:Disease)\nRETURN p, r, d LIMIT 10',
+            "MATCH (d:Drug)-[r:TREATS]->(x:Disease) WHERE toLower(x.name) CONTAINS toLower('asthma') "
+            "RETURN d, r, x LIMIT 10",
+        ]:
+            self.assertTrue(self.accepts(query), query)
+
+    def test_rule_breaking_output_cannot_be_decoded(self):
+        for text in [
+            '```cypher\n' + ANSWER + '\n```',
+            'Here is the query: ' + ANSWER,
+            ANSWER.replace('Drug', 'Drugz'),
+            ANSWER.replace('[r:TREATS]', '[:TREATS]'),
+            ANSWER.replace('TREATS', 'TREATS*1..3'),
+            ANSWER.replace(' LIMIT 10', ''),
+            'CREATE (d:Drug) RETURN d LIMIT 10',
+            "MATCH (p:Protein {name: ['A','B']})-[r:TREATS]-(d) RETURN p, r, d LIMIT 10",
+        ]:
+            self.assertFalse(self.accepts(text), text)
+
+
+class GrammarRequestTest(unittest.TestCase):
+    def test_llama_requests_carry_the_grammar(self):
+        env = {'CYPHER_GRAMMAR': 'gbnf', 'CYPHER_GRAMMAR_PARAM': 'grammar', 'LLM_CACHE': 'false',
+               'LLAMA_MODEL': 'fake', 'GROQ_MODEL': 'fake', 'GROQ_API_KEY': 'dummy'}
+        with FakeLLMServer(delay=0.0) as server, mock.patch.dict(os.environ, env):
+            os.environ['LLAMA_BASE_URL'] = os.environ['GROQ_BASE_URL'] = server.base_url
+            make_llm = agent_module().make_llm
+            self.assertEqual(make_llm('llama').invoke('which drugs treat asthma?').content, ANSWER)
+            self.assertEqual(server.last_body['grammar'], get_cypher_grammar())
+
+            make_llm('groq').invoke('which drugs treat asthma?')
+            self.assertNotIn('grammar', server.last_body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from src.cypher_params import parameterize, prepare
+from src.cypher_validator import get_validator
+
+
+class ParameterizeTest(unittest.TestCase):
+    def test_queries_differing_in_values_share_one_text(self):
+        a = parameterize("MATCH (d:Disease) WHERE toLower(d.name) = \"lung cancer\" RETURN d LIMIT 10")
+        b = parameterize("MATCH (d:Disease) WHERE toLower(d.name) = 'asthma' RETURN d LIMIT 10")
+        self.assertEqual(a.cypher, 'MATCH (d:Disease) WHERE toLower(d.name) = $p0 RETURN d LIMIT 10')
+        self.assertEqual(a.cypher, b.cypher)
+        self.assertEqual((a.params, b.params), ({'p0': 'lung cancer'}, {'p0': 'asthma'}))
+
+    def test_literal_lists_become_one_parameter(self):
+        short = parameterize('MATCH (p:Protein) WHERE p.name IN ["H4C1"] RETURN p LIMIT 10')
+        long = parameterize('MATCH (p:Protein) WHERE p.name IN ["H4C1", "H4C2", "H4C3"] RETURN p LIMIT 10')
+        self.assertEqual(short.cypher, long.cypher)
+        self.assertEqual(long.params, {'p0': ['H4C1', 'H4C2', 'H4C3']})
+
+    def test_shape_stays_inline(self):
+        q = parameterize("MATCH (d:Drug {name: 'O\\'Brien'}) WHERE d.score > 0.5 AND d.tags[0] = 'x' "
+                         "AND d.approved = true RETURN d, [d.a, 'y'] AS t SKIP 5 LIMIT 10")
+        self.assertEqual(q.cypher, "MATCH (d:Drug {name: $p0}) WHERE d.score > $p1 AND d.tags[$p2] = $p3 "
+                                   "AND d.approved = true RETURN d, [d.a, $p4] AS t SKIP 5 LIMIT 10")
+        self.assertEqual(q.params, {'p0': "O'Brien", 'p1': 0.5, 'p2': 0, 'p3': 'x', 'p4': 'y'})
+
+    def test_exponent_hex_and_leading_dot_numbers_stay_whole(self):
+        q = parameterize('MATCH (d:Drug) WHERE d.score > 1e-5 AND d.id = 0x1F AND d.p < .5 '
+                         'AND d.q = 2.5E3 AND d.r = 0o17 RETURN d LIMIT 10')
+        self.assertEqual(q.cypher, 'MATCH (d:Drug) WHERE d.score > $p0 AND d.id = $p1 AND d.p < $p2 '
+                                   'AND d.q = $p3 AND d.r = $p4 RETURN d LIMIT 10')
+        self.assertEqual(q.params, {'p0': 1e-5, 'p1': 31, 'p2': 0.5, 'p3': 2500.0, 'p4': 15})
+        ranged = parameterize('MATCH (a)-[*1..3]->(b) WHERE a.x = 1 RETURN b LIMIT 10')
+        self.assertEqual(ranged.cypher, 'MATCH (a)-[*1..3]->(b) WHERE a.x = $p0 RETURN b LIMIT 10')
+        self.assertEqual(parameterize('RETURN 1abc').cypher, 'RETURN 1abc')
+
+    def test_equal_literals_share_and_existing_names_are_kept(self):
+        q = parameterize("MATCH (a) WHERE a.x = 'v' OR a.y = 'v' OR a.z = $p0 OR a.w = 1 RETURN a LIMIT 10",
+                         {'p0': 'mine', 'p2': 2})
+        self.assertEqual(q.cypher, 'MATCH (a) WHERE a.x = $p1 OR a.y = $p1 OR a.z = $p0 OR a.w = $p3 RETURN a LIMIT 10')
+        self.assertEqual(q.params, {'p0': 'mine', 'p1': 'v', 'p2': 2, 'p3': 1})
+
+    def test_parameterized_query_still_validates(self):
+        cypher = ("MATCH (d:Drug)-[r:TREATS]->(x:Disease) WHERE toLower(x.name) CONTAINS toLower('asthma') "
+                  "RETURN d, r, x LIMIT 10")
+        self.assertTrue(get_validator().validate(parameterize(cypher).cypher, fix=False).ok)
+
+    def test_switch(self):
+        cypher = "MATCH (d:Drug) WHERE d.name = 'x' RETURN d LIMIT 10"
+        with mock.patch.dict(os.environ, {'CYPHER_PARAMETERIZE': 'false'}):
+            self.assertEqual(prepare(cypher, {'a': 1}).as_dict(), {'cypher': cypher, 'params': {'a': 1}})
+        with mock.patch.dict(os.environ, {'CYPHER_PARAMETERIZE': 'true'}):
+            self.assertEqual(prepare(cypher).params, {'p0': 'x'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import sys
+import types
+import unittest
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from src.cypher_repair import Answer, CypherRepairer, RepairStats, build_repair_messages
+from src.cypher_validator import get_validator
+
+BROKEN = "MATCH (d:Drug)-[r:TREATZ]->(x:Disease) WHERE x.nmae = 'asthma' RETURN d, r, x LIMIT 10"
+HALF = "MATCH (d:Drug)-[r:TREATS]->(x:Disease) WHERE x.nmae = 'asthma' RETURN d, r, x LIMIT 10"
+FIXED = "MATCH (d:Drug)-[r:TREATS]->(x:Disease) WHERE x.name = 'asthma' RETURN d, r, x LIMIT 10"
+
+
+class ScriptedModel:
+    def __init__(self, *replies, delay=0.0):
+        self.replies = list(replies)
+        self.delay = delay
+        self.prompts = []
+
+    def __call__(self, messages):
+        self.prompts.append(messages)
+        return self.replies.pop(0)
+
+    async def acall(self, messages):
+        self.prompts.append(messages)
+        await asyncio.sleep(self.delay)
+        return self.replies.pop(0)
+
+
+class CypherRepairTest(unittest.TestCase):
+    def setUp(self):
+        self.validate = get_validator().validate
+        self.broken = self.validate(BROKEN)
+
+    def test_repair_prompt_carries_only_errors_and_schema(self):
+        system, human = build_repair_messages('drugs for asthma', BROKEN, self.broken.errors, '### Schema\n(Drug)-[TREATS]->(Disease)')
+        self.assertIn('(Drug)-[TREATS]->(Disease)', system.content)
+        self.assertIn('TREATZ is not in the schema (did you mean TREATS?)', human.content)
+        self.assertIn(BROKEN, human.content)
+
+    def test_repairs_until_valid(self):
+        model = ScriptedModel(HALF, FIXED)
+        answer = CypherRepairer(self.validate, max_attempts=3).repair('q', self.broken, '', model)
+        self.assertTrue(answer.ok)
+        self.assertEqual(answer.cypher, FIXED)
+        self.assertEqual(answer.repairs, 2)
+        # the second turn is asked about the remaining error only
+        self.assertNotIn('TREATZ', model.prompts[1][1].content.split('Errors:')[1])
+
+    def test_attempts_are_capped(self):
+        answer = CypherRepairer(self.validate, max_attempts=1).repair('q', self.broken, '', ScriptedModel(HALF, FIXED))
+        self.assertFalse(answer.ok)
+        self.assertEqual((answer.cypher, answer.repairs), (HALF, 1))
+
+    def test_no_progress_stops_and_keeps_best(self):
+        model = ScriptedModel("MATCH (n:Nope)-[r:NOPE]-(m:Nada) RETURN n, r, m LIMIT 10", FIXED)
+        answer = CypherRepairer(self.validate, max_attempts=3).repair('q', self.broken, '', model)
+        self.assertEqual((answer.cypher, answer.repairs), (BROKEN, 1))
+
+    def test_valid_answer_is_not_repaired(self):
+        model = ScriptedModel()
+        answer = CypherRepairer(self.validate).repair('q', self.validate(FIXED), '', model)
+        self.assertEqual((answer.repairs, model.prompts), (0, []))
+
+    def test_async_turn_is_cut_at_budget(self):
+        model = ScriptedModel(FIXED, delay=1.0)
+        repairer = CypherRepairer(self.validate, max_attempts=3, budget=0.05)
+        answer = asyncio.run(repairer.arepair('q', self.broken, '', model.acall))
+        self.assertFalse(answer.ok)
+        self.assertEqual(answer.repairs, 1)
+        self.assertLess(answer.repair_seconds, 0.5)
+
+    def test_stats(self):
+        stats = RepairStats()
+        stats.record(Answer(FIXED))
+        stats.record(Answer(FIXED, repairs=2, repair_seconds=0.3))
+        stats.record(Answer(BROKEN, errors=self.broken.errors, repairs=1, repair_seconds=0.1))
+        s = stats.stats()
+        self.assertEqual((s['answers'], s['repaired'], s['unresolved'], s['repair_attempts']), (3, 2, 1, 3))
+        self.assertEqual(s['avg_repair_ms'], 200.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
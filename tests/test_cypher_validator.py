@@ -0,0 +1,145 @@
+import asyncio
+import os
+import sys
+import types
+import unittest
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+os.environ.setdefault('CORS_ALLOWED_ORIGINS', 'http://localhost:5173')
+
+import src.api_server as api_server
+from src.cypher_validator import CypherValidator, strip_fences, tokenize
+from src.schema_loader import get_schema
+
+
+class CypherValidatorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.validator = CypherValidator(get_schema())
+
+    def codes(self, cypher, fix=True):
+        result = self.validator.validate(cypher, fix=fix)
+        return [e.code for e in result.errors]
+
+    def test_valid_query_passes_unchanged(self):
+        cypher = ("MATCH (d:Drug)-[r:TREATS]->(x:Disease) "
+                  "WHERE toLower(x.name) = toLower('asthma') RETURN d, r, x LIMIT 10")
+        result = self.validator.validate(cypher)
+        self.assertTrue(result.ok, result.errors)
+        self.assertEqual(result.cypher, cypher)
+        self.assertEqual(result.fixes, [])
+
+    def test_unknown_schema_elements(self):
+        self.assertEqual(
+            self.codes("MATCH (p:Protien)-[r:TREATZ]-(d:Disease) WHERE d.nmae = 'x' RETURN p, r, d LIMIT 10"),
+            ['unknown_label', 'unknown_relationship', 'unknown_property'],
+        )
+        result = self.validator.validate("MATCH (p:Protein)-[r:ACTS_ON]-(q:Protein) WHERE p.nme = 'x' RETURN p, r, q LIMIT 10")
+        self.assertIn('did you mean name?', result.errors[0].message)
+
+    def test_endpoints_must_match_schema(self):
+        self.assertEqual(
+            self.codes("MATCH (d:Drug)-[r:TREATS]->(p:Protein) RETURN d, r, p LIMIT 10"), ['endpoints']
+        )
+        # labels bound in an earlier pattern still count
+        self.assertEqual(
+            self.codes("MATCH (d:Drug) MATCH (d)-[r:TREATS]-(p:Protein) RETURN d, r, p LIMIT 10"), ['endpoints']
+        )
+
+    def test_reversed_direction_is_flipped(self):
+        result = self.validator.validate("MATCH (x:Disease)-[r:TREATS]->(d:Drug) RETURN d, r, x LIMIT 10")
+        self.assertTrue(result.ok)
+        self.assertEqual(result.cypher, "MATCH (x:Disease)<-[r:TREATS]-(d:Drug) RETURN d, r, x LIMIT 10")
+        self.assertEqual(self.codes("MATCH (x:Disease)-[r:TREATS]->(d:Drug) RETURN d, r, x LIMIT 10", fix=False),
+                         ['direction'])
+
+    def test_only_allowed_clauses_pass(self):
+        for cypher, codes in [
+            ("CALL apoc.load.json('http://169.254.169.254/latest/meta-data') YIELD value RETURN value LIMIT 10",
+             ['clause', 'procedure', 'clause']),
+            ("MATCH (d:Drug) CALL dbms.listConfig() YIELD name RETURN d, name LIMIT 10", ['clause', 'procedure', 'clause']),
+            ("SHOW USERS", ['clause']),
+            ("USE system MATCH (d:Drug) RETURN d LIMIT 10", ['clause']),
+            ("MATCH (d:Drug) CALL { MATCH (x:Disease) RETURN x } RETURN d, x LIMIT 10", ['clause']),
+            ("MATCH (d:Drug) RETURN d, apoc.util.sha1([d.name]) LIMIT 10", ['procedure']),
+        ]:
+            self.assertEqual(self.codes(cypher), codes, cypher)
+        self.assertFalse(self.validator.validate("SHOW USERS").ok)
+        ok = ("MATCH (d:Drug)-[r:TREATS]->(x:Disease) WITH d, r, x ORDER BY d.name "
+              "RETURN d, r, x, point.distance(point({x: 0, y: 0}), point({x: 1, y: 1})) AS gap SKIP 1 LIMIT 10")
+        self.assertEqual(self.codes(ok), [])
+
+    def test_clause_words_used_as_variables_pass(self):
+        for cypher in ["MATCH (start:Protein)-[r:ACTS_ON]->(p2:Protein) RETURN start, r, p2 LIMIT 10",
+                       "MATCH (d:Drug)-[next:TREATS]->(x:Disease) WITH d, next, x WHERE x.name = 'a' "
+                       "RETURN d, next, x ORDER BY next.score LIMIT 10",
+                       "MATCH (d:Drug)-[r:TREATS]->(show:Disease) RETURN d, r, show AS use LIMIT 10"]:
+            self.assertEqual(self.codes(cypher), [], cypher)
+        self.assertEqual(self.codes("MATCH (d:Drug) WITH d SHOW USERS"), ['clause'])
+
+    def test_rule_violations(self):
+        self.assertEqual(
+            self.codes("MATCH (p:Protein)-[r*1..3]-(d:Disease) DETACH DELETE p RETURN p, r, d LIMIT 10"),
+            ['write_clause', 'write_clause', 'variable_length'],
+        )
+        self.assertEqual(
+            self.codes("MATCH (p:Protein {name: ['A', 'B']})-[r:ASSOCIATED_WITH]-(d:Disease) RETURN p, r, d LIMIT 10"),
+            ['list_in_pattern'],
+        )
+        self.assertEqual(
+            self.codes("MATCH (p:Protein)-[r:ACTS_ON]-(q:Protein) WHERE toLower(p.name) = 'tp53' RETURN p, r, q LIMIT 10"),
+            ['case_sensitive'],
+        )
+        self.assertEqual(
+            self.codes("MATCH (d:Drug)-[r:TREATS]->(x:Disease) RETURN d.name LIMIT 10"),
+            ['relationship_not_returned'],
+        )
+
+    def test_keywords_inside_strings_and_properties_are_ignored(self):
+        self.assertEqual(
+            self.codes("MATCH (d:Drug)-[r:TREATS]->(x:Disease) WHERE d.name = 'CREATE SET' RETURN d, r, x LIMIT 10"), []
+        )
+
+    def test_deterministic_fixes(self):
+        result = self.validator.validate("```cypher\nMATCH (g:Gene)-->(p:Protein)-[:ASSOCIATED_WITH]-(d:Disease)\nRETURN g, p, d;\n```")
+        self.assertTrue(result.ok, result.errors)
+        self.assertEqual(
+            result.cypher,
+            "MATCH (g:Gene)-[r1]->(p:Protein)-[r2:ASSOCIATED_WITH]-(d:Disease)\nRETURN g, p, d, r1, r2 LIMIT 10",
+        )
+        self.assertEqual(
+            [f.code for f in result.fixes],
+            ['markdown', 'anonymous_relationship', 'anonymous_relationship', 'relationship_not_returned', 'limit'],
+        )
+        self.assertEqual(
+            self.codes("MATCH (g:Gene)-->(p:Protein) RETURN g, p", fix=False),
+            ['anonymous_relationship', 'limit'],
+        )
+
+    def test_limit_is_added_before_a_trailing_comment(self):
+        result = self.validator.validate("MATCH (d:Drug)-[r:TREATS]->(x:Disease) RETURN d, r, x // done")
+        self.assertEqual(result.cypher, "MATCH (d:Drug)-[r:TREATS]->(x:Disease) RETURN d, r, x LIMIT 10 // done")
+        self.assertEqual([t.text for t in tokenize(result.cypher)][-2:], ['LIMIT', '10'])
+
+    def test_helpers(self):
+        self.assertEqual(strip_fences("```cypher\nMATCH (n) RETURN n\n```"), "MATCH (n) RETURN n")
+        self.assertEqual(strip_fences("cypher\nMATCH (n) RETURN n"), "MATCH (n) RETURN n")
+        kinds = [t.kind for t in tokenize("MATCH (n) // comment\nWHERE n.x = 'a' RETURN n LIMIT $k")]
+        self.assertNotIn('comment', kinds)
+        self.assertIn('string', kinds)
+        self.assertEqual(kinds[-1], 'param')
+
+
+class ValidateEndpointTest(unittest.TestCase):
+    def test_validate_endpoint_reports_fixes_and_errors(self):
+        res = asyncio.run(api_server.validate_cypher(api_server.ValidateRequest(
+            cypher="MATCH (d:Drug)-[:TREATS]->(p:Protein) RETURN d, p"
+        )))
+        self.assertFalse(res['ok'])
+        self.assertEqual([e['code'] for e in res['errors']], ['endpoints'])
+        self.assertTrue(res['cypher'].endswith('RETURN d, p, r LIMIT 10'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from src.entity_resolver import EntityResolver, NameIndex, normalize, write_name_index
+from src.fast_path import OneHopGenerator
+from src.schema_loader import get_schema, get_schema_hints
+
+ROWS = [
+    ('Protein', 'ERBB2', ['HER2', 'NEU']),
+    ('Gene', 'ERBB2', ['HER2']),
+    ('Protein', 'TP53', ['p53']),
+    ('Protein', 'protein kinase C alpha', ['PKCA']),
+    ('Disease', 'type 2 diabetes mellitus', ['T2DM']),
+    ('Disease', 'asthma', None),
+    ('Drug', 'Aspirin', ['acetylsalicylic acid']),
+    ('Drug', '', ['nameless']),
+]
+
+
+class NameIndexTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, 'entity_names.bin')
+        cls.counts = write_name_index(cls.path, ROWS)
+        cls.index = NameIndex(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.resolver = EntityResolver(self.index, ignore=['Drug', 'Disease', 'Protein', 'TREATS', 'INTERACTS_WITH'])
+
+    def test_file_round_trips(self):
+        self.assertEqual(self.counts['entries'], 7)
+        self.assertEqual(normalize('  Type-2  Diabetes! '), 'type 2 diabetes')
+        self.assertEqual(self.index.exact('her2'), [('Protein', 'ERBB2'), ('Gene', 'ERBB2')])
+        self.assertEqual(self.index.exact('acetylsalicylic acid'), [('Drug', 'Aspirin')])
+        self.assertEqual(self.index.exact('her'), [])
+        self.assertEqual(self.index.probe('protein kinase'), ([], True))
+
+    def test_not_an_index(self):
+        with open(self.path + '.txt', 'wb') as f:
+            f.write(b'{"NodeTypes": {}}' * 4)
+        self.assertRaises(ValueError, NameIndex, self.path + '.txt')
+
+    def test_exact_mentions_map_to_stored_values(self):
+        mentions = self.resolver.resolve('Which drugs interact with HER2 or p53?')
+        self.assertEqual([(m.text, m.label, m.value, m.score) for m in mentions], [
+            ('her2', 'Protein', 'ERBB2', 1.0), ('her2', 'Gene', 'ERBB2', 1.0), ('p53', 'Protein', 'TP53', 1.0),
+        ])
+
+    def test_longest_span_wins_even_over_schema_words(self):
+        mentions = self.resolver.resolve('Which drugs act on protein kinase C alpha?')
+        self.assertEqual([m.value for m in mentions], ['protein kinase C alpha'])
+        self.assertEqual(self.resolver.resolve('Which drugs treat diseases?'), [])
+
+    def test_fuzzy_fallback_for_near_misses(self):
+        mentions = self.resolver.resolve('Which drugs treat type 2 diabetes?')
+        self.assertEqual([(m.label, m.value) for m in mentions], [('Disease', 'type 2 diabetes mellitus')])
+        self.assertLess(mentions[0].score, 1.0)
+        self.assertIn("(approximate", self.resolver.render(mentions))
+        self.assertEqual(self.resolver.render([]), '')
+
+    def test_stats(self):
+        self.resolver.resolve('What does aspirin treat?')
+        self.resolver.resolve('hello there')
+        stats = self.resolver.stats()
+        self.assertEqual((stats['questions'], stats['exact_hits'], stats['fuzzy_hits']), (2, 1, 0))
+
+    def test_fast_path_filters_on_the_stored_name(self):
+        fast = OneHopGenerator(get_schema(), get_schema_hints(), resolver=self.resolver)
+        self.assertIn("WHERE p.name = 'ERBB2'", fast.generate('Which genes are translated into her2?'))
+        self.assertIn("WHERE d.name = 'Aspirin'", fast.generate('What does aspirin treat?'))
+
+
+class AgentEntityValuesTest(unittest.TestCase):
+    def test_prompt_carries_entity_values(self):
+        from tests.conftest import agent_module
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'entity_names.bin')
+            write_name_index(path, ROWS)
+            module = agent_module()
+            with mock.patch.dict(os.environ, {'ENTITY_NAMES_PATH': path}), \
+                    mock.patch('src.entity_resolver._resolver', None), \
+                    mock.patch('src.entity_resolver._resolver_loaded', False):
+                resolver = module.get_entity_resolver(ignore=get_schema()['NodeTypes'])
+            agent = module.Text2CypherAgent.__new__(module.Text2CypherAgent)
+            agent.schema_json, agent.path_hints, agent.entity_resolver = get_schema(), False, resolver
+            context = agent.question_context('Which drugs interact with her2?')
+            self.assertTrue(context.startswith('### Entity Values\n'))
+            self.assertIn("\"her2\": Protein.name = 'ERBB2'", context)
+            self.assertEqual(agent.entity_stats()['questions'], 1)
+            agent.entity_resolver = None
+            self.assertEqual(agent.question_context('Which drugs interact with her2?'), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from benchmarks.fake_llm_server import ANSWER, FakeLLMServer
+from src.cypher_validator import get_validator
+from src.fast_path import OneHopGenerator
+from src.schema_loader import get_schema, get_schema_hints
+from tests.conftest import agent_module
+
+TREATS_ASTHMA = (
+    "MATCH (d:Drug)-[r:TREATS]->(d2:Disease)\n"
+    "WHERE toLower(d2.name) CONTAINS toLower('asthma')\n"
+    "RETURN d, r, d2 LIMIT 10"
+)
+
+
+class OneHopGeneratorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fast = OneHopGenerator(get_schema(), get_schema_hints())
+
+    def test_simple_questions_map_to_one_hop(self):
+        for question in ['Which drugs treat asthma?', 'which drugs treat the disease asthma',
+                         "Find drugs related to 'asthma' by TREATS"]:
+            self.assertEqual(self.fast.generate(question), TREATS_ASTHMA, question)
+
+    def test_the_entity_side_follows_the_question(self):
+        for question in ['What does aspirin treat?', 'Which diseases are treated by aspirin?',
+                         'Which diseases does aspirin treat?']:
+            self.assertIn("WHERE toLower(d.name) CONTAINS toLower('aspirin')", self.fast.generate(question))
+        protein = self.fast.generate('Which genes are translated into TP53?')
+        self.assertIn("WHERE p.name = 'TP53'", protein)
+
+    def test_output_passes_validation(self):
+        validate = get_validator().validate
+        for question in ['Which drugs treat asthma?', 'Which genes are translated into TP53?',
+                         'What does the drug "O\'Brien mix" treat?']:
+            cypher = self.fast.generate(question)
+            self.assertTrue(validate(cypher).ok, cypher)
+
+    def test_anything_else_falls_back(self):
+        for question in ['Which drugs treat it?', 'How many drugs treat asthma?',
+                         'Which drugs treat asthma and diabetes?', 'Which proteins interact with TP53?',
+                         'What is the parent disease of asthma?', 'Show me everything']:
+            self.assertIsNone(self.fast.generate(question), question)
+
+    def test_modifiers_and_other_relationships_are_not_an_entity(self):
+        for question in ['which drugs treat diseases associated with TP53', 'Which drugs treat asthma limit 50',
+                         'which drugs treat asthma with fewest side effects', 'which drugs treat asthma sorted by name',
+                         'which drugs treat asthma with complications', 'which drugs treat small cell lung cancer',
+                         'which drugs treat asthma in 2020', 'which drugs treat cancer of the lung',
+                         'which drugs treat asthma or copd', 'which drugs treat type 2 diabetes']:
+            self.assertIsNone(self.fast.generate(question), question)
+        self.assertIn("'lung cancer'", self.fast.generate('which drugs treat lung cancer'))
+
+    def test_stats(self):
+        fast = OneHopGenerator(get_schema(), get_schema_hints())
+        fast.generate('Which drugs treat asthma?')
+        fast.generate('How many drugs treat asthma?')
+        fast.reject()
+        stats = fast.stats()
+        self.assertEqual((stats['questions'], stats['hits'], stats['rejected']), (2, 0, 1))
+
+
+class AgentFastPathTest(unittest.TestCase):
+    def _agent(self, server, fast_path):
+        env = {'FAST_PATH': fast_path, 'LLAMA_MODEL': 'fake', 'LLM_CACHE': 'false', 'LLM_CASCADE': '',
+               'LLM_HEDGE_TO': '', 'CYPHER_CANDIDATES': '1', 'CYPHER_GRAMMAR': 'off',
+               'LLAMA_BASE_URL': server.base_url}
+        with mock.patch.dict(os.environ, env):
+            return agent_module().Text2CypherAgent(provider='llama')
+
+    def test_one_hop_questions_skip_the_backend(self):
+        with FakeLLMServer(delay=0.0) as server:
+            agent = self._agent(server, 'true')
+            answer = asyncio.run(agent.aanswer('Which drugs treat asthma?', 'fast'))
+            self.assertEqual(server.requests, 0)
+            self.assertEqual(len(agent.get_history('fast')), 2)
+            other = agent.answer('How many drugs treat asthma?', 'fast')
+            agent.clear_history('fast')
+        self.assertEqual((answer.cypher, answer.report()['tier']), (TREATS_ASTHMA, 'fast_path'))
+        self.assertEqual(other.cypher, ANSWER)
+        self.assertEqual(server.requests, 1)
+        self.assertEqual(agent.fast_path_stats()['hit_rate'], 0.5)
+
+    def test_can_be_turned_off(self):
+        with FakeLLMServer(delay=0.0) as server:
+            agent = self._agent(server, 'false')
+            answer = agent.answer('Which drugs treat asthma?', 'slow')
+            agent.clear_history('slow')
+        self.assertEqual(answer.cypher, ANSWER)
+        self.assertIsNone(agent.fast_path_stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
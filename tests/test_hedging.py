@@ -0,0 +1,178 @@
+import asyncio
+import os
+import sys
+import time
+import types
+import unittest
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_openai import ChatOpenAI
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from src.cypher_validator import get_validator
+from src.hedging import HedgedRunnable
+
+VALID = "MATCH (d:Drug)-[r:TREATS]->(x:Disease) RETURN d, r, x LIMIT 10"
+INVALID = "MATCH (d:Drug)-[r:TREATZ]->(x:Disease) RETURN d, r, x LIMIT 10"
+
+
+class FakeBackend:
+    """Async/sync runnable body answering ``reply`` after ``delay`` seconds."""
+
+    def __init__(self, reply, delay=0.0):
+        self.reply, self.delay = reply, delay
+        self.calls = 0
+        self.cancelled = 0
+
+    def __call__(self, _):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self._answer()
+
+    async def acall(self, _):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self._answer()
+
+    def _answer(self):
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return AIMessage(content=self.reply)
+
+    def runnable(self):
+        return RunnableLambda(self, afunc=self.acall)
+
+
+def hedged(primary, secondary, **options):
+    options = {'initial_delay': 0.05, 'max_rate': 1.0, 'check': get_validator().validate, **options}
+    return HedgedRunnable(primary.runnable(), secondary.runnable(), **options)
+
+
+class HedgingTest(unittest.TestCase):
+    def test_fast_primary_is_not_hedged(self):
+        primary, secondary = FakeBackend(VALID), FakeBackend(VALID)
+        runnable = hedged(primary, secondary)
+        self.assertEqual(runnable.invoke('q').content, VALID)
+        self.assertEqual(asyncio.run(runnable.ainvoke('q')).content, VALID)
+        self.assertEqual(secondary.calls, 0)
+        self.assertEqual(runnable.stats()['hedged'], 0)
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        primary, secondary = FakeBackend(VALID, delay=5), FakeBackend(VALID)
+        runnable = hedged(primary, secondary)
+        started = time.monotonic()
+        self.assertEqual(asyncio.run(runnable.ainvoke('q')).content, VALID)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(primary.cancelled, 1)
+        stats = runnable.stats()
+        self.assertEqual((stats['calls'], stats['hedged'], stats['hedge_wins']), (1, 1, 1))
+
+    def test_sync_path_returns_the_hedge_without_waiting_for_the_primary(self):
+        primary, secondary = FakeBackend(VALID, delay=0.5), FakeBackend(VALID)
+        runnable = hedged(primary, secondary)
+        started = time.monotonic()
+        self.assertEqual(runnable.invoke('q').content, VALID)
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(runnable.stats()['hedge_wins'], 1)
+
+    def test_first_valid_answer_wins(self):
+        # The hedge answers first but invalid: wait for the primary
+        primary, secondary = FakeBackend(VALID, delay=0.2), FakeBackend(INVALID)
+        runnable = hedged(primary, secondary)
+        self.assertEqual(asyncio.run(runnable.ainvoke('q')).content, VALID)
+        self.assertEqual(runnable.stats()['hedge_wins'], 0)
+
+        # Neither valid: the first to arrive is returned
+        primary, secondary = FakeBackend(INVALID + ' ', delay=0.2), FakeBackend(INVALID)
+        self.assertEqual(asyncio.run(hedged(primary, secondary).ainvoke('q')).content, INVALID)
+
+    def test_errors(self):
+        primary, secondary = FakeBackend(RuntimeError('primary down'), delay=0.1), FakeBackend(VALID)
+        self.assertEqual(asyncio.run(hedged(primary, secondary).ainvoke('q')).content, VALID)
+
+        primary, secondary = FakeBackend(RuntimeError('primary down'), delay=0.1), FakeBackend(ValueError('hedge'))
+        with self.assertRaisesRegex(RuntimeError, 'primary down'):
+            asyncio.run(hedged(primary, secondary).ainvoke('q'))
+        with self.assertRaisesRegex(RuntimeError, 'primary down'):
+            hedged(primary, secondary).invoke('q')
+
+    def test_hedge_rate_is_capped(self):
+        primary, secondary = FakeBackend(VALID, delay=0.08), FakeBackend(VALID, delay=0.5)
+        runnable = hedged(primary, secondary, initial_delay=0.01, max_rate=0.25)
+
+        async def run():
+            for _ in range(8):
+                await runnable.ainvoke('q')
+
+        asyncio.run(run())
+        stats = runnable.stats()
+        self.assertEqual(stats['calls'], 8)
+        self.assertEqual(stats['hedged'], 2)
+        self.assertEqual(secondary.calls, 2)
+
+    def test_hedges_take_backend_slots(self):
+        primary, secondary = FakeBackend(VALID, delay=0.2), FakeBackend(VALID, delay=0.2)
+        in_flight, peak = [0], [0]
+
+        def counted(backend):
+            async def acall(x):
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+                try:
+                    return await backend.acall(x)
+                finally:
+                    in_flight[0] -= 1
+            return RunnableLambda(backend, afunc=acall)
+
+        async def run():
+            slots = asyncio.Semaphore(2)
+            runnable = HedgedRunnable(counted(primary), counted(secondary), initial_delay=0.05, max_rate=1.0,
+                                      slots=slots)
+            await asyncio.gather(*(runnable.ainvoke('q') for _ in range(4)))
+            return runnable, slots
+
+        runnable, slots = asyncio.run(run())
+        self.assertLessEqual(peak[0], 2)
+        self.assertGreater(runnable.stats()['hedged'], 0)
+        self.assertEqual(slots._value, 2)  # every slot given back
+
+    def test_delay_follows_recent_latency_percentile(self):
+        primary = FakeBackend(VALID)
+        runnable = hedged(primary, FakeBackend(VALID), min_samples=5, percentile=50, min_delay=0.0)
+        self.assertEqual(runnable.delay(), 0.05)
+        for seconds in (0.1, 0.2, 0.3, 0.4, 2.0):
+            runnable._record(seconds)
+        self.assertAlmostEqual(runnable.delay(), 0.3)
+
+    def test_stream_goes_to_primary(self):
+        primary, secondary = FakeBackend(VALID), FakeBackend(VALID)
+        chunks = list(hedged(primary, secondary).stream('q'))
+        self.assertEqual(chunks[0].content, VALID)
+        self.assertEqual(secondary.calls, 0)
+
+
+class HedgingServerTest(unittest.TestCase):
+    def test_slow_server_is_hedged_to_a_fast_one(self):
+        with FakeLLMServer(delay=2.0) as slow, FakeLLMServer(delay=0.01) as fast:
+            def chat(server):
+                return ChatOpenAI(base_url=server.base_url, api_key='dummy', model='fake', max_retries=0)
+
+            runnable = HedgedRunnable(chat(slow), chat(fast), check=get_validator().validate,
+                                      initial_delay=0.1, max_rate=1.0)
+            started = time.monotonic()
+            message = asyncio.run(runnable.ainvoke('q'))
+            self.assertIn('LIMIT 10', message.content)
+            self.assertLess(time.monotonic() - started, 1.5)
+            self.assertEqual((slow.requests, fast.requests), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sys
+import types
+import unittest
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+import httpx
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from src.backend_pool import BackendPool, pooled_clients
+from src.http_clients import (
+    LoopLocalTransport, get_async_http_client, get_http_client, shared_async_transport, shared_transport,
+)
+from tests.conftest import agent_module
+
+
+class SharedHttpClientTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeLLMServer(delay=0.0).__enter__()
+        os.environ['LLAMA_BASE_URL'] = cls.server.base_url
+        os.environ.setdefault('LLAMA_MODEL', 'fake')
+        os.environ['LLM_CACHE'] = 'false'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.__exit__(None, None, None)
+
+    def test_clients_are_process_wide(self):
+        self.assertIs(get_http_client(), get_http_client())
+        self.assertIs(get_async_http_client(), get_async_http_client())
+        self.assertIs(get_http_client()._transport, shared_transport())
+
+    def test_every_llm_reuses_one_keep_alive_connection(self):
+        make_llm = agent_module().make_llm
+        first, second = make_llm('llama'), make_llm('llama', max_tokens=64)
+        self.assertIs(first.root_client._client, second.root_client._client)
+        for llm in (first, second, first):
+            self.assertIn('MATCH', llm.invoke('which drugs treat asthma?').content)
+        self.assertEqual(len(shared_transport()._pool.connections), 1)
+
+    def test_async_pool_is_per_event_loop(self):
+        transport = LoopLocalTransport(httpx.AsyncHTTPTransport)
+
+        async def current():
+            return transport._transport()
+
+        first, second = asyncio.run(current()), asyncio.run(current())
+        self.assertIsNot(first, second)
+
+        async def ask():
+            return (await agent_module().make_llm('llama').ainvoke('which drugs treat asthma?')).content
+
+        # A second event loop must not trip over connections from the first
+        self.assertIn('MATCH', asyncio.run(ask()))
+        self.assertIn('MATCH', asyncio.run(ask()))
+
+    def test_closing_a_pooled_client_keeps_the_shared_pool_open(self):
+        client, async_client = pooled_clients(BackendPool([self.server.base_url]))
+        client.close()
+        asyncio.run(async_client.aclose())
+        self.assertEqual(get_http_client().get(self.server.base_url + '/models').status_code, 200)
+        self.assertIs(async_client._transport.transport, shared_async_transport())
+
+
+if __name__ == '__main__':
+    unittest.main()
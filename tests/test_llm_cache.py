@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+from src import llm_cache
+from src.llm_cache import SQLiteCompletionCache, fresh_completions
+
+
+def _gen(text):
+    return [ChatGeneration(message=AIMessage(content=text))]
+
+
+def _write_many(path, worker):
+    cache = SQLiteCompletionCache(path, max_entries=1000)
+    for i in range(50):
+        cache.update(f'prompt-{worker}-{i}', 'llm', _gen(f'answer-{worker}-{i}'))
+
+
+class SQLiteCompletionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'cache' / 'llm.sqlite3'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_survives_reopen(self):
+        SQLiteCompletionCache(self.path).update('prompt', 'model=a', _gen('MATCH (n) RETURN n'))
+        reopened = SQLiteCompletionCache(self.path)
+        self.assertEqual(reopened.lookup('prompt', 'model=a')[0].message.content, 'MATCH (n) RETURN n')
+        self.assertIsNone(reopened.lookup('prompt', 'model=b'))
+
+    def test_size_bound_evicts_least_recently_used(self):
+        cache = SQLiteCompletionCache(self.path, max_entries=3)
+        for i in range(5):
+            cache.update(f'p{i}', 'llm', _gen(str(i)))
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.lookup('p0', 'llm'))
+        self.assertIsNotNone(cache.lookup('p4', 'llm'))
+
+    def test_concurrent_writers_from_several_processes(self):
+        SQLiteCompletionCache(self.path)
+        ctx = multiprocessing.get_context('spawn')
+        procs = [ctx.Process(target=_write_many, args=(self.path, w)) for w in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(30)
+            self.assertEqual(p.exitcode, 0)
+        self.assertEqual(len(SQLiteCompletionCache(self.path)), 200)
+
+    def test_chat_model_uses_cache(self):
+        cache = SQLiteCompletionCache(self.path)
+        llm = FakeListChatModel(responses=['MATCH (a) RETURN a', 'something else'], cache=cache)
+        self.assertEqual(llm.invoke('q').content, 'MATCH (a) RETURN a')
+        self.assertEqual(llm.invoke('q').content, 'MATCH (a) RETURN a')
+        self.assertEqual(llm.invoke('other').content, 'something else')
+
+    def test_fresh_completions_skip_and_refresh_the_cache(self):
+        cache = SQLiteCompletionCache(self.path)
+        llm = FakeListChatModel(responses=['old', 'new'], cache=cache)
+        self.assertEqual(llm.invoke('q').content, 'old')
+        with fresh_completions():
+            self.assertEqual(llm.invoke('q').content, 'new')
+        self.assertEqual(llm.invoke('q').content, 'new')
+
+    def test_relative_path_is_under_the_project_root(self):
+        env = {'LLM_CACHE': 'true', 'LLM_CACHE_PATH': 'cache/llm.sqlite3'}
+        with mock.patch.dict(os.environ, env), mock.patch.object(llm_cache, '_COMPLETION_CACHE', None), \
+                mock.patch.object(llm_cache, 'get_project_root', return_value=Path(self.tmp.name)):
+            self.assertEqual(llm_cache.get_completion_cache().path, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
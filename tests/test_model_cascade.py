@@ -0,0 +1,109 @@
+import asyncio
+import os
+import sys
+import types
+import unittest
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+
+from src.cypher_validator import get_validator
+from src.model_cascade import ModelCascade, parse_tiers
+
+VALID = "MATCH (d:Drug)-[r:TREATS]->(x:Disease) WHERE x.name = 'asthma' RETURN d, r, x LIMIT 10"
+INVALID = "MATCH (d:Drug)-[r:TREATZ]->(x:Disease) RETURN d, r, x LIMIT 10"
+
+
+def fake(*replies):
+    return FakeListChatModel(responses=list(replies))
+
+
+def broken(*_):
+    raise RuntimeError('backend down')
+
+
+class ModelCascadeTest(unittest.TestCase):
+    def setUp(self):
+        self.check = get_validator().validate
+
+    def test_parse_tiers(self):
+        self.assertEqual(
+            parse_tiers(' llama:small-3b, llama ,groq,'),
+            [('llama', 'small-3b'), ('llama', None), ('groq', None)],
+        )
+        self.assertEqual(parse_tiers(''), [])
+
+    def test_needs_a_tier(self):
+        with self.assertRaises(ValueError):
+            ModelCascade([], self.check)
+
+    def test_first_tier_answers_when_valid(self):
+        large = fake(VALID)
+        cascade = ModelCascade([('small', fake(VALID)), ('large', large)], self.check)
+        result, tier = cascade.invoke('q')
+        self.assertTrue(result.ok)
+        self.assertEqual(tier, 'small')
+        self.assertEqual(large.i, 0)
+        stats = cascade.stats()
+        self.assertEqual(stats['small']['accepted'], 1)
+        self.assertEqual(stats['large']['calls'], 0)
+
+    def test_escalates_on_invalid_or_empty_output(self):
+        cascade = ModelCascade(
+            [('small', fake(INVALID)), ('medium', fake('')), ('large', fake(VALID))], self.check)
+        result, tier = cascade.invoke('q')
+        self.assertEqual((result.cypher, tier), (VALID, 'large'))
+        stats = cascade.stats()
+        self.assertEqual(stats['small']['invalid'], 1)
+        self.assertEqual(stats['medium']['invalid'], 1)
+        self.assertEqual(stats['large']['hit_rate'], 1.0)
+
+    def test_last_tier_result_returned_even_when_invalid(self):
+        cascade = ModelCascade([('small', fake(INVALID)), ('large', fake(INVALID))], self.check)
+        result, tier = cascade.invoke('q')
+        self.assertFalse(result.ok)
+        self.assertEqual(tier, 'large')
+
+    def test_exception_escalates_except_on_last_tier(self):
+        cascade = ModelCascade([('small', RunnableLambda(broken)), ('large', fake(VALID))], self.check)
+        _, tier = cascade.invoke('q')
+        self.assertEqual(tier, 'large')
+        self.assertEqual(cascade.stats()['small']['failed'], 1)
+
+        cascade = ModelCascade([('small', fake(INVALID)), ('large', RunnableLambda(broken))], self.check)
+        with self.assertRaises(RuntimeError):
+            cascade.invoke('q')
+
+    def test_streamed_first_output_is_not_regenerated(self):
+        small = fake(VALID)
+        cascade = ModelCascade([('small', small), ('large', fake(VALID))], self.check)
+        result, tier = cascade.invoke('q', first='```\n' + INVALID + '\n```')
+        self.assertEqual((result.cypher, tier), (VALID, 'large'))
+        self.assertEqual(small.i, 0)
+        # The streamed call's latency is the caller's to measure
+        self.assertEqual(cascade.stats()['small']['p50_ms'], 0.0)
+
+    def test_async_path_holds_slots(self):
+        slots = asyncio.Semaphore(1)
+        seen = []
+
+        async def small(_):
+            seen.append(slots.locked())
+            return types.SimpleNamespace(content=INVALID)
+
+        async def run():
+            cascade = ModelCascade([('small', RunnableLambda(small)), ('large', fake(VALID))], self.check)
+            return await cascade.ainvoke('q', slots=slots), cascade.stats()
+
+        (result, tier), stats = asyncio.run(run())
+        self.assertEqual(tier, 'large')
+        self.assertEqual(seen, [True])
+        self.assertEqual(stats['small']['invalid'], 1)
+        self.assertEqual(stats['large']['accepted'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from src.prompt_prefix import PrefixTracker, prefix_hash
+from src.schema_loader import get_schema
+from src.schema_prompt import build_schema_prompt
+from tests.conftest import agent_module
+
+
+class PrefixTrackerTest(unittest.TestCase):
+    def test_reports_shared_leading_chars_between_consecutive_prompts(self):
+        tracker = PrefixTracker('RULES')
+        self.assertEqual(tracker.record('RULES|history|q1'), 0)
+        self.assertEqual(tracker.record('RULES|history|q2'), len('RULES|history|q'))
+        self.assertEqual(tracker.record('RULEZ'), 4)
+        stats = tracker.stats()
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['prefix_hits'], 1)
+        self.assertEqual(stats['last_shared_chars'], 4)
+        self.assertEqual(stats['prefix_hash'], prefix_hash('RULES'))
+
+    def test_schema_renders_to_the_same_bytes(self):
+        schema = get_schema()
+        shuffled = dict(reversed(list(schema.items())))
+        for fmt in ('compact', 'json'):
+            self.assertEqual(build_schema_prompt(schema, fmt=fmt), build_schema_prompt(shuffled, fmt=fmt))
+
+
+class PrefixCacheLayoutTest(unittest.TestCase):
+    def make_agent(self, enabled):
+        env = {'PROMPT_PREFIX_CACHE': enabled, 'LLAMA_BASE_URL': 'http://127.0.0.1:9/v1',
+               'LLAMA_MODEL': 'fake', 'LLM_CACHE': 'false', 'LLM_CASCADE': '', 'LLM_HEDGE_TO': ''}
+        with mock.patch.dict(os.environ, env):
+            return agent_module().Text2CypherAgent(provider='llama', prune_schema=True)
+
+    def test_static_prefix_is_shared_across_questions_and_sessions(self):
+        agent = self.make_agent('true')
+        agent.add_to_history('which drugs treat asthma?', 'MATCH ...', 'a')
+        first = agent._inputs('which genes encode insulin?', 'a', agent.schema_prompt_for('genes'))
+        second = agent._inputs('which pathways involve TP53?', 'b', agent.schema_prompt_for('pathways'))
+        self.assertEqual(first['system_prompt'], agent.static_prefix)
+        self.assertEqual(second['system_prompt'], agent.static_prefix)
+        stats = agent.prefix_tracker.stats()
+        self.assertGreaterEqual(stats['last_shared_chars'], len(agent.static_prefix))
+        self.assertEqual(stats['prefix_hits'], 1)
+        agent.clear_history('a')
+
+    def test_pruned_layout_still_starts_with_the_rules(self):
+        agent = self.make_agent('false')
+        first = agent._inputs('q1', 'c', agent.schema_prompt_for('drugs treat diseases'))
+        second = agent._inputs('q2', 'c', agent.schema_prompt_for('genes encode proteins'))
+        self.assertNotEqual(first['system_prompt'], second['system_prompt'])
+        self.assertGreater(agent.prefix_tracker.stats()['last_shared_chars'], 0)
+
+    def test_question_context_is_resolved_once_per_request(self):
+        agent = self.make_agent('true')
+        question, raw = 'which drugs treat diseases?', 'MATCH (d:Drug)-[r:TREATS]->(x:Disease) RETURN d, r, x LIMIT 10'
+        with mock.patch.object(agent, 'question_context', wraps=agent.question_context) as context:
+            prompts = agent.question_prompts(question)
+            answer = asyncio.run(agent.afinalize(question, raw, 'once', prompts=prompts, remember=False))
+        self.assertTrue(answer.ok)
+        self.assertEqual(context.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,275 @@
+import json
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+os.environ.setdefault('CORS_ALLOWED_ORIGINS', 'http://localhost:5173')
+
+from fastapi.testclient import TestClient
+
+import src.api_server as api_server
+import src.query_executor as query_executor
+from src.query_executor import QueryExecutor
+from src.result_cache import ResultCache
+from src.response_cache import ResponseCache
+from src.semantic_cache import SemanticCache
+from src.template_cache import TemplateCache
+from tests.test_response_cache import FakeAgent
+
+QUERY = "MATCH (d:Drug)-[r:TREATS]->(x:Disease) WHERE toLower(x.name) CONTAINS toLower('asthma') RETURN d, r, x LIMIT 10"
+# Read transactions would still run these: SSRF, server config and user listings
+UNSAFE = [
+    "CALL apoc.load.json('http://169.254.169.254/latest/meta-data') YIELD value RETURN value",
+    'CALL dbms.listConfig() YIELD name, value RETURN name, value',
+    'SHOW USERS',
+]
+
+
+class Entity(dict):
+    def __init__(self, element_id, props, labels=None, type=None, start=None, end=None):
+        super().__init__(props)
+        self.element_id = element_id
+        if labels is not None:
+            self.labels = frozenset(labels)
+        else:
+            self.type, self.start_node, self.end_node = type, start, end
+
+
+class Record:
+    def __init__(self, *values):
+        self._values = values
+
+    def values(self):
+        return list(self._values)
+
+
+class FakeResult:
+    def __init__(self, keys, records, fail_after=None):
+        self._keys, self._records, self.fail_after = keys, records, fail_after
+        self.pulled = 0
+
+    def keys(self):
+        return self._keys
+
+    def __iter__(self):
+        for record in self._records:
+            if self.pulled == self.fail_after:
+                raise RuntimeError('Neo.TransientError.Transaction.Terminated')
+            self.pulled += 1
+            yield record
+
+
+class FakeDriver:
+    """Records how sessions and transactions were opened; ``result`` answers every query."""
+
+    def __init__(self, result=None, error=None):
+        self.result, self.error = result, error
+        self.sessions, self.runs, self.rolled_back, self.closed = [], [], 0, False
+
+    def session(self, **config):
+        self.sessions.append(config)
+        driver = self
+
+        class Tx:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                driver.rolled_back += 1
+
+            def run(self, cypher, params):
+                driver.runs.append((cypher, params))
+                if driver.error:
+                    raise driver.error
+                return driver.result
+
+        class Session:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def begin_transaction(self, timeout=None):
+                driver.timeout = timeout
+                return Tx()
+
+        return Session()
+
+    def close(self):
+        self.closed = True
+
+
+def graph_result(n=2, **kw):
+    records = []
+    for i in range(n):
+        drug = Entity(f'4:d:{i}', {'name': f'drug{i}', 'embedding': [0.1] * 8}, labels=['Drug'])
+        disease = Entity('4:x:0', {'name': 'asthma'}, labels=['Disease'])
+        rel = Entity(f'5:r:{i}', {'phase': 3}, type='TREATS', start=drug, end=disease)
+        records.append(Record(drug, rel, disease))
+    return FakeResult(['d', 'r', 'x'], records, **kw)
+
+
+def lines(chunks):
+    return [json.loads(line) for line in ''.join(chunks).splitlines()]
+
+
+class QueryExecutorTest(unittest.TestCase):
+    def test_records_stream_as_ndjson(self):
+        driver = FakeDriver(graph_result())
+        executor = QueryExecutor(driver, database='neo4j', fetch_size=50, timeout=5.0, exclude=['embedding'])
+        out = lines(executor.stream(QUERY, {'n': 1}, head={'cypher': QUERY}))
+
+        self.assertEqual(out[0], {'cypher': QUERY, 'keys': ['d', 'r', 'x']})
+        self.assertEqual(out[1], {'node': {'id': '4:d:0', 'labels': ['Drug'], 'properties': {'name': 'drug0'}}})
+        self.assertEqual(out[2], {'relationship': {'id': '5:r:0', 'type': 'TREATS', 'start': '4:d:0',
+                                                   'end': '4:x:0', 'properties': {'phase': 3}}})
+        self.assertEqual(out[3], {'node': {'id': '4:x:0', 'labels': ['Disease'], 'properties': {'name': 'asthma'}}})
+        self.assertEqual(out[4], {'row': [{'$node': 0}, {'$rel': 0}, {'$node': 1}]})
+        # the disease is shared by both rows and sent once
+        self.assertEqual([next(iter(line)) for line in out[5:8]], ['node', 'relationship', 'row'])
+        self.assertEqual(out[7], {'row': [{'$node': 2}, {'$rel': 1}, {'$node': 1}]})
+        self.assertEqual(out[-1]['summary'], {**out[-1]['summary'], 'rows': 2, 'nodes': 3, 'relationships': 2,
+                                              'truncated': False, 'cached': False})
+
+        from neo4j import READ_ACCESS
+        self.assertEqual(driver.sessions, [{'database': 'neo4j', 'default_access_mode': READ_ACCESS, 'fetch_size': 50}])
+        self.assertEqual((driver.timeout, driver.runs, driver.rolled_back), (5.0, [(QUERY, {'n': 1})], 1))
+
+    def test_records_are_pulled_lazily_and_cut_at_max_rows(self):
+        result = graph_result(n=100)
+        executor = QueryExecutor(FakeDriver(result), max_rows=3)
+        stream = executor.stream(QUERY)
+        next(stream), next(stream)
+        self.assertEqual(result.pulled, 1)
+        out = lines(stream)
+        self.assertEqual(out[-1]['summary'], {**out[-1]['summary'], 'rows': 3, 'truncated': True})
+        self.assertEqual(executor.stats()['truncated'], 1)
+
+    def test_errors_end_the_stream(self):
+        executor = QueryExecutor(FakeDriver(error=RuntimeError('Neo.ClientError.Statement.SyntaxError')))
+        self.assertEqual(lines(executor.stream(QUERY, head={'cypher': QUERY})),
+                         [{'cypher': QUERY, 'error': 'Neo.ClientError.Statement.SyntaxError'}])
+        executor = QueryExecutor(FakeDriver(graph_result(n=5, fail_after=2)))
+        out = lines(executor.stream(QUERY))
+        self.assertEqual([next(iter(line)) for line in out if 'node' not in line and 'relationship' not in line],
+                         ['keys', 'row', 'row', 'error'])
+        stats = executor.stats()
+        self.assertEqual((stats['queries'], stats['failed'], stats['in_flight']), (1, 1, 0))
+
+    def test_paths_and_nested_values_reference_elements(self):
+        a = Entity('4:a', {'name': 'a'}, labels=['Drug'])
+        b = Entity('4:b', {'name': 'b'}, labels=['Disease'])
+        rel = Entity('5:ab', {}, type='TREATS', start=a, end=b)
+        path = types.SimpleNamespace(nodes=[a, b], relationships=[rel])
+        result = FakeResult(['p', 'm'], [Record(path, {'names': ['a'], 'drug': a})])
+        out = lines(QueryExecutor(FakeDriver(result)).stream(QUERY))
+        self.assertEqual(out[4], {'row': [{'$path': {'nodes': [0, 1], 'relationships': [0]}},
+                                          {'names': ['a'], 'drug': {'$node': 0}}]})
+
+    def test_procedures_and_admin_commands_never_reach_the_driver(self):
+        driver = FakeDriver(graph_result())
+        executor = QueryExecutor(driver)
+        for cypher in UNSAFE:
+            out = lines(executor.stream(cypher, head={'cypher': cypher}))
+            self.assertEqual(len(out), 1)
+            self.assertIn('not allowed', out[0]['error'])
+        self.assertEqual((driver.runs, driver.sessions), ([], []))
+        self.assertEqual(executor.stats()['failed'], len(UNSAFE))
+
+    def test_closing_early_rolls_back(self):
+        driver = FakeDriver(graph_result(n=10))
+        stream = QueryExecutor(driver).stream(QUERY)
+        next(stream), next(stream)
+        stream.close()
+        self.assertEqual(driver.rolled_back, 1)
+
+
+class ResultCachingTest(unittest.TestCase):
+    def test_repeated_queries_are_served_from_cache(self):
+        driver = FakeDriver(graph_result())
+        executor = QueryExecutor(driver, cache=ResultCache(max_bytes=1 << 20))
+        first = lines(executor.stream(QUERY, {'n': 1}, head={'cypher': QUERY}))
+        driver.result = graph_result()
+        # whitespace and keyword case do not matter
+        second = lines(executor.stream(QUERY.replace(' RETURN', '\n  return'), {'n': 1}, head={'cypher': QUERY}))
+        self.assertEqual(len(driver.runs), 1)
+        self.assertEqual(first[:-1], second[:-1])
+        self.assertTrue(second[-1]['summary']['cached'])
+        self.assertEqual(second[-1]['summary']['rows'], 2)
+        self.assertEqual(executor.stats()['cache_hits'], 1)
+
+        lines(executor.stream(QUERY, {'n': 2}))
+        lines(executor.stream(QUERY, {'n': 1}, use_cache=False))
+        self.assertEqual(len(driver.runs), 3)
+
+    def test_failed_and_oversized_results_are_not_cached(self):
+        cache = ResultCache(max_bytes=1 << 20, max_entry_bytes=200)
+        driver = FakeDriver(graph_result(n=5, fail_after=2))
+        executor = QueryExecutor(driver, cache=cache)
+        lines(executor.stream(QUERY))
+        driver.result = graph_result(n=5)
+        out = lines(executor.stream(QUERY))
+        self.assertEqual(out[-1]['summary']['rows'], 5)
+        self.assertEqual(cache.stats()['size'], 0)
+
+
+class ExecuteEndpointTest(unittest.TestCase):
+    def setUp(self):
+        self.driver = FakeDriver(graph_result())
+        patcher = mock.patch.object(query_executor, '_EXECUTOR', QueryExecutor(self.driver))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.multiple(
+            api_server,
+            _AGENT=FakeAgent(),
+            _RESPONSE_CACHE=ResponseCache(),
+            _SEMANTIC_CACHE=SemanticCache(max_entries=16),
+            _TEMPLATE_CACHE=TemplateCache(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(api_server.app)
+
+    def test_execute_streams_validated_query(self):
+        res = self.client.post('/api/execute', json={'cypher': QUERY, 'params': {'limit': 10}})
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.headers['content-type'].startswith('application/x-ndjson'))
+        out = [json.loads(line) for line in res.text.splitlines()]
+        self.assertEqual(out[0]['keys'], ['d', 'r', 'x'])
+        self.assertEqual(len([line for line in out if 'row' in line]), 2)
+        # the literal is sent as a parameter, next to the caller's own
+        self.assertEqual(self.driver.runs, [(QUERY.replace("'asthma'", '$p0'), {'limit': 10, 'p0': 'asthma'})])
+        self.assertEqual(out[0]['params'], {'limit': 10, 'p0': 'asthma'})
+        self.assertEqual(self.client.get('/api/execute/stats').json()['queries'], 1)
+
+    def test_invalid_or_writing_queries_are_refused(self):
+        for cypher in ["MATCH (d:Drug) SET d.name = 'x' RETURN d LIMIT 10",
+                       'MATCH (d:Drugz) RETURN d LIMIT 10', *UNSAFE]:
+            res = self.client.post('/api/execute', json={'cypher': cypher})
+            self.assertEqual(res.status_code, 400)
+            self.assertFalse(res.json()['detail']['ok'])
+        self.assertEqual(self.driver.runs, [])
+
+    def test_ask_can_execute_the_answer(self):
+        res = self.client.post('/api/ask?execute=true', json={'query': 'show nodes'})
+        out = [json.loads(line) for line in res.text.splitlines()]
+        self.assertEqual(out[0]['answer'], 'MATCH (n) RETURN n LIMIT 1')
+        self.assertEqual((out[0]['cypher'], out[0]['params']), ('MATCH (n) RETURN n LIMIT 1', {}))
+        self.assertEqual(out[0]['keys'], ['d', 'r', 'x'])
+        self.assertEqual(self.driver.runs[0], ('MATCH (n) RETURN n LIMIT 1', {}))
+        self.assertIn('summary', out[-1])
+
+    def test_execution_needs_a_database(self):
+        with mock.patch.object(query_executor, '_EXECUTOR', None), mock.patch.dict(os.environ, {}, clear=False):
+            os.environ.pop('DB_URL', None)
+            res = self.client.post('/api/execute', json={'cypher': QUERY})
+        self.assertEqual(res.status_code, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import sys
+import time
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+os.environ.setdefault('CORS_ALLOWED_ORIGINS', 'http://localhost:5173')
+
+import src.api_server as api_server
+from src import llm_cache
+from src.cypher_repair import Answer
+from src.cypher_validator import get_validator
+from src.response_cache import ResponseCache, make_cache_key, normalize_question
+from src.semantic_cache import SemanticCache
+from src.template_cache import TemplateCache
+
+
+class FakeAgent:
+    def __init__(self):
+        self.calls = 0
+        self.histories = {}
+        self.fresh = None       # whether the last answer had to skip the completion cache
+
+    def respond(self, question, session_id='default', remember=True):
+        self.calls += 1
+        answer = f'MATCH (n) RETURN n LIMIT {self.calls}'
+        if remember:
+            self.add_to_history(question, answer, session_id)
+        return answer
+
+    async def aanswer(self, question, session_id='default', candidates=None, remember=True):
+        self.fresh = llm_cache._FRESH.get()
+        return Answer(self.respond(question, session_id, remember))
+
+    def fast_answer(self, question, session_id='default'):
+        return None
+
+    def question_prompts(self, question):
+        return '', ''
+
+    async def afinalize(self, question, raw, session_id='default', prompts=None):
+        answer = Answer.from_validation(get_validator().validate(raw))
+        self.add_to_history(question, answer.cypher, session_id)
+        return answer
+
+    def add_to_history(self, question, answer, session_id='default'):
+        self.histories.setdefault(session_id, []).extend(
+            [{'role': 'user', 'content': question}, {'role': 'assistant', 'content': answer}]
+        )
+
+    def get_history(self, session_id='default'):
+        return list(self.histories.get(session_id, []))
+
+    def clear_history(self, session_id='default'):
+        self.histories.pop(session_id, None)
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2, ttl_seconds=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(max_entries=10, ttl_seconds=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_key_depends_on_question_schema_and_context(self):
+        base = make_cache_key('Which drugs treat asthma?', 'v1', [])
+        self.assertEqual(base, make_cache_key('  which drugs   treat asthma ', 'v1', []))
+        self.assertNotEqual(base, make_cache_key('Which drugs treat asthma?', 'v2', []))
+        history = [{'role': 'user', 'content': 'q'}, {'role': 'assistant', 'content': 'a'}]
+        self.assertNotEqual(base, make_cache_key('Which drugs treat asthma?', 'v1', history))
+        self.assertEqual(base, make_cache_key('Which drugs treat asthma?', 'v1', history, context_messages=0))
+
+    def test_case_sensitive_names_keep_their_case(self):
+        self.assertEqual(normalize_question('Which proteins bind  TP53?'), 'which proteins bind TP53')
+        self.assertNotEqual(make_cache_key('proteins of TP53', 'v1', []), make_cache_key('proteins of tp53', 'v1', []))
+        self.assertNotEqual(make_cache_key("drugs named 'Abc'", 'v1', []), make_cache_key("drugs named 'abc'", 'v1', []))
+
+
+class AskEndpointCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.agent = FakeAgent()
+        patcher = mock.patch.multiple(
+            api_server,
+            _AGENT=self.agent,
+            _RESPONSE_CACHE=ResponseCache(max_entries=16, ttl_seconds=60),
+            _SEMANTIC_CACHE=SemanticCache(max_entries=16),
+            _TEMPLATE_CACHE=TemplateCache(),
+            _CACHE_CONTEXT_MESSAGES=0,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _ask(self, text, **kw):
+        return asyncio.run(api_server.ask_llm_agent(api_server.QueryRequest(query=text, **kw)))
+
+    def test_repeat_question_is_served_from_cache(self):
+        first = self._ask('Which drugs treat asthma?')
+        second = self._ask('which drugs treat asthma')
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(first['answer'], second['answer'])
+        self.assertEqual(self.agent.calls, 1)
+        self.assertEqual(len(self.agent.get_history()), 4)
+        stats = asyncio.run(api_server.response_cache_stats())['exact']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_bypass_forces_llm_call(self):
+        self._ask('Which drugs treat asthma?')
+        self.assertFalse(self.agent.fresh)
+        res = self._ask('Which drugs treat asthma?', use_cache=False)
+        self.assertFalse(res['cached'])
+        self.assertTrue(self.agent.fresh)  # nor from the completion cache
+        self.assertEqual(self.agent.calls, 2)
+        self.assertEqual(self._ask('Which drugs treat asthma?')['answer'], res['answer'])
+
+    def test_candidates_get_their_own_cache_entries(self):
+        default = self._ask('Which drugs treat asthma?')
+        sampled = self._ask('Which drugs treat asthma?', candidates=4)
+        self.assertFalse(sampled['cached'])
+        self.assertNotEqual(default['answer'], sampled['answer'])
+        self.assertEqual(self._ask('which drugs treat asthma', candidates=4)['answer'], sampled['answer'])
+        self.assertEqual(self.agent.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from src.result_cache import CachedResult, ResultCache, normalize_cypher, result_key
+
+
+def entry(size, rows=1):
+    return CachedResult(keys=['n'], body=b'x' * size, rows=rows, nodes=rows, relationships=0)
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_layout_and_keyword_case_are_ignored(self):
+        self.assertEqual(normalize_cypher("match (d:Drug)\n  where d.name = 'Aspirin'\nreturn d limit 5;"),
+                         "MATCH ( d : Drug ) WHERE d . name = 'Aspirin' RETURN d LIMIT 5")
+
+    def test_literals_identifiers_and_params_matter(self):
+        base = result_key("MATCH (d:Drug) WHERE d.name = 'a' RETURN d", {'x': 1}, 'neo4j')
+        self.assertEqual(base, result_key("MATCH (d:Drug)  WHERE d.name = 'a' RETURN d;", {'x': 1}, 'neo4j'))
+        self.assertNotEqual(base, result_key("MATCH (d:Drug) WHERE d.name = 'A' RETURN d", {'x': 1}, 'neo4j'))
+        self.assertNotEqual(base, result_key("MATCH (d:drug) WHERE d.name = 'a' RETURN d", {'x': 1}, 'neo4j'))
+        self.assertNotEqual(base, result_key("MATCH (d:Drug) WHERE d.name = 'a' RETURN d", {'x': 2}, 'neo4j'))
+        self.assertNotEqual(base, result_key("MATCH (d:Drug) WHERE d.name = 'a' RETURN d", {'x': 1}, 'other'))
+
+    def test_identifiers_keep_their_case(self):
+        self.assertNotEqual(normalize_cypher('MATCH (n) RETURN n.end'), normalize_cypher('MATCH (n) RETURN n.END'))
+        self.assertNotEqual(normalize_cypher('MATCH (n:end) RETURN n'), normalize_cypher('MATCH (n:END) RETURN n'))
+        self.assertNotEqual(normalize_cypher('RETURN {end: 1}'), normalize_cypher('RETURN {END: 1}'))
+        self.assertEqual(normalize_cypher('RETURN `order`'), 'RETURN `order`')
+        self.assertEqual(normalize_cypher('return case when true then 1 end'), 'RETURN CASE WHEN TRUE THEN 1 END')
+
+
+class ResultCacheTest(unittest.TestCase):
+    def test_evicts_least_recent_by_bytes(self):
+        cache = ResultCache(max_bytes=300, max_entry_bytes=200)
+        cache.set('a', entry(100))
+        cache.set('b', entry(100))
+        self.assertIsNotNone(cache.get('a'))
+        cache.set('c', entry(150))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(cache.stats()['bytes'], 250)
+
+        cache.set('huge', entry(250))
+        self.assertIsNone(cache.get('huge'))
+        stats = cache.stats()
+        self.assertEqual((stats['evictions'], stats['too_large'], stats['size']), (1, 1, 2))
+
+    def test_entries_expire(self):
+        cache = ResultCache(max_bytes=1000, ttl_seconds=10)
+        with mock.patch('src.result_cache.time.monotonic', return_value=100.0):
+            cache.set('a', entry(10))
+            self.assertIsNotNone(cache.get('a'))
+        with mock.patch('src.result_cache.time.monotonic', return_value=111.0):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+    def test_zero_bytes_disables(self):
+        cache = ResultCache(max_bytes=0)
+        cache.set('a', entry(1))
+        self.assertIsNone(cache.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import unittest
+
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from src.schema_compress import compress_hints, compress_schema, detect_schema_elements
+from src.schema_loader import get_schema, relationship_endpoints
+from src.schema_prompt import build_schema_prompt
+
+
+class SchemaCompressTest(unittest.TestCase):
+    def setUp(self):
+        self.schema = get_schema()
+
+    def test_detects_labels_and_relationships_from_stems(self):
+        found = detect_schema_elements(self.schema, 'Which drugs treating lung cancer?')
+        self.assertEqual(found['labels'], {'Drug'})
+        self.assertEqual(found['relationships'], {'TREATS'})
+
+    def test_slice_keeps_relationship_endpoints(self):
+        sub = compress_schema(self.schema, 'Which drugs treat lung cancer?')
+        self.assertEqual(set(sub['NodeTypes']), {'Drug', 'Disease'})
+        self.assertEqual(list(sub['RelationshipTypes']), ['TREATS'])
+        self.assertNotIn('embedding', sub['NodeTypes']['Drug'])
+        self.assertIn('name', sub['NodeTypes']['Disease'])
+
+    def test_label_only_question_pulls_in_neighbours(self):
+        sub = compress_schema(self.schema, 'list all transcripts')
+        self.assertIn('Gene', sub['NodeTypes'])
+        self.assertIn('TRANSCRIBED_INTO', sub['RelationshipTypes'])
+        for meta in sub['RelationshipTypes'].values():
+            for a, b in relationship_endpoints(meta):
+                self.assertIn(a, sub['NodeTypes'])
+                self.assertIn(b, sub['NodeTypes'])
+
+    def test_labels_apart_are_joined_by_their_shortest_paths(self):
+        sub = compress_schema(self.schema, 'Which drugs target genes?')
+        self.assertEqual(set(sub['NodeTypes']), {'Drug', 'Gene', 'Protein'})
+        self.assertEqual(sub['RelationshipTypes'], {
+            'INTERACTS_WITH': {'_pairs': [{'from': 'Drug', 'to': 'Protein'}]},
+            'TRANSLATED_INTO': {'_pairs': [{'from': 'Gene', 'to': 'Protein'}]},
+        })
+
+    def test_matched_property_is_kept(self):
+        sub = compress_schema(self.schema, 'drugs with molecular weight above 500')
+        self.assertIn('molecular_weight', sub['NodeTypes']['Drug'])
+
+    def test_unmatched_question_falls_back_to_full_schema(self):
+        self.assertIs(compress_schema(self.schema, 'hello there'), self.schema)
+
+    def test_pruned_prompt_is_smaller(self):
+        sub = compress_schema(self.schema, 'Which drugs treat lung cancer?')
+        hints = {'relationships': {'TREATS': 'Drug treats Disease', 'ACTS_ON': 'x'}}
+        self.assertEqual(compress_hints(hints, sub), {'relationships': {'TREATS': 'Drug treats Disease'}})
+        self.assertLess(len(build_schema_prompt(sub)), len(build_schema_prompt(self.schema)) / 5)
+
+    def test_other_hint_sections_survive_without_relationship_hints(self):
+        sub = compress_schema(self.schema, 'Which drugs treat lung cancer?')
+        hints = {'relationships': {'ACTS_ON': 'x'}, 'properties': {'Protein.name': 'case-sensitive'}}
+        self.assertEqual(compress_hints(hints, sub), {'properties': {'Protein.name': 'case-sensitive'}})
+        self.assertIsNone(compress_hints({'relationships': {'ACTS_ON': 'x'}}, sub))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import types
+import unittest
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from src.schema_loader import SchemaGraph, get_schema, get_schema_graph
+from tests.conftest import agent_module
+
+SCHEMA = {
+    'NodeTypes': {'Drug': {}, 'Protein': {}, 'Gene': {}, 'Disease': {}},
+    'RelationshipTypes': {
+        'INTERACTS_WITH': {'_pairs': [{'from': 'Drug', 'to': 'Protein'}]},
+        'TRANSLATED_INTO': {'_pairs': [{'from': 'Gene', 'to': 'Protein'}]},
+        'ACTS_ON': {'_pairs': [{'from': 'Protein', 'to': 'Protein'}]},
+        'TREATS': {'_endpoints': ['Drug', 'Disease']},
+        'ASSOCIATED_WITH': {'_pairs': [{'from': 'Protein', 'to': 'Disease'}]},
+        'BIOMARKER_OF': {'_pairs': [{'from': 'Protein', 'to': 'Disease'}]},
+    },
+}
+
+
+class SchemaGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = SchemaGraph(SCHEMA, max_hops=3, max_paths=2)
+
+    def test_edges_are_typed_and_usable_both_ways(self):
+        self.assertIn(('TRANSLATED_INTO', '<-', 'Gene'), self.graph.neighbours('Protein'))
+        self.assertIn(('TREATS', '->', 'Disease'), self.graph.neighbours('Drug'))
+        self.assertNotIn('ACTS_ON', {rel for rel, _, _ in self.graph.neighbours('Protein')})
+
+    def test_only_shortest_paths_are_kept(self):
+        self.assertEqual(self.graph.paths('Drug', 'Disease'), ['(Drug)-[TREATS]->(Disease)'])
+        self.assertEqual(self.graph.paths('Gene', 'Drug'),
+                         ['(Gene)-[TRANSLATED_INTO]->(Protein)<-[INTERACTS_WITH]-(Drug)'])
+        self.assertEqual(self.graph.paths('Gene', 'Disease'), [
+            '(Gene)-[TRANSLATED_INTO]->(Protein)-[ASSOCIATED_WITH]->(Disease)',
+            '(Gene)-[TRANSLATED_INTO]->(Protein)-[BIOMARKER_OF]->(Disease)',
+        ])
+
+    def test_depth_and_unknown_labels(self):
+        shallow = SchemaGraph(SCHEMA, max_hops=1)
+        self.assertEqual(shallow.paths('Gene', 'Drug'), [])
+        self.assertEqual(self.graph.paths('Drug', 'Pathway'), [])
+        self.assertEqual(self.graph.paths_between(['Drug']), [])
+
+    def test_paths_between_covers_every_pair_once(self):
+        paths = self.graph.paths_between(['Drug', 'Gene', 'Drug'])
+        self.assertEqual(paths, ['(Drug)-[INTERACTS_WITH]->(Protein)<-[TRANSLATED_INTO]-(Gene)'])
+
+    def test_loaded_schema_graph_is_built_once(self):
+        self.assertIs(get_schema_graph(), get_schema_graph())
+        self.assertEqual(set(get_schema_graph().labels), set(get_schema()['NodeTypes']))
+
+
+class AgentPathHintsTest(unittest.TestCase):
+    def test_prompt_carries_the_paths_between_named_labels(self):
+        agent = agent_module().Text2CypherAgent.__new__(agent_module().Text2CypherAgent)
+        agent.schema_json, agent.schema_graph, agent.path_hints = get_schema(), get_schema_graph(), True
+        paths = agent.candidate_paths('Which drugs target proteins of the gene BRCA1?')
+        self.assertTrue(paths.startswith('### Candidate Paths\n'))
+        self.assertIn('(Drug)-[INTERACTS_WITH]->(Protein)<-[TRANSLATED_INTO]-(Gene)', paths)
+        self.assertEqual(agent.candidate_paths('Which drugs are approved?'), '')
+        agent.path_hints = False
+        self.assertEqual(agent.candidate_paths('Which drugs target genes?'), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import unittest
+
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+
+from src.schema_loader import get_schema
+from src.schema_compress import compress_hints
+from src.schema_prompt import build_schema_prompt, render_compact_schema
+
+
+class CompactSchemaPromptTest(unittest.TestCase):
+    def test_compact_lines(self):
+        schema = {
+            'NodeTypes': {
+                'Drug': {'name': 'String', 'embedding': 'DoubleArray', 'clogp': 'Double'},
+                'Disease': {'name': 'String', 'synonyms': 'StringArray'},
+            },
+            'RelationshipTypes': {
+                'TREATS': {'_pairs': [{'from': 'Drug', 'to': 'Disease'}]},
+                'OLD_STYLE': {'_endpoints': ['Disease', 'Drug']},
+            },
+        }
+        text = render_compact_schema(schema, {'relationships': {'TREATS': 'Drug treats Disease'}}, exclude=['embedding'])
+        self.assertIn('Drug(clogp:float,name:str)', text)
+        self.assertIn('Disease(name:str,synonyms:str[])', text)
+        self.assertIn('(Drug)-[TREATS]->(Disease)', text)
+        self.assertIn('(Disease)-[OLD_STYLE]->(Drug)', text)
+        self.assertIn('TREATS: Drug treats Disease', text)
+        self.assertNotIn('embedding', text)
+
+    def test_other_hint_sections_are_rendered(self):
+        hints = {'relationships': {'TREATS': 'Drug treats Disease'},
+                 'properties': {'Drug.clogp': 'lipophilicity', 'Disease.name': {'case': 'lower'}},
+                 'examples': ['MATCH (d:Drug) RETURN d LIMIT 10'], 'note': 'names are lower case'}
+        text = render_compact_schema({'NodeTypes': {}, 'RelationshipTypes': {}}, hints)
+        self.assertIn('properties:\nDisease.name: {"case":"lower"}\nDrug.clogp: lipophilicity', text)
+        self.assertIn('examples:\n- MATCH (d:Drug) RETURN d LIMIT 10', text)
+        self.assertIn('note: names are lower case', text)
+        # the sections compress_hints keeps survive the default format
+        self.assertIn('lipophilicity', build_schema_prompt(get_schema(), compress_hints(hints, get_schema())))
+
+    def test_wildcard_exclusion(self):
+        text = render_compact_schema(get_schema(), exclude=['embedding', 'mayo_*', 'orphanet_*'])
+        self.assertNotIn('mayo_', text)
+        self.assertIn('mondo_name:str', text)
+
+    def test_compact_is_smaller_than_json(self):
+        schema = get_schema()
+        compact = build_schema_prompt(schema, fmt='compact')
+        as_json = build_schema_prompt(schema, fmt='json')
+        self.assertLess(len(compact), len(as_json) / 2)
+        with self.assertRaises(ValueError):
+            build_schema_prompt(schema, fmt='yaml')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import unittest
+
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+os.environ.setdefault('CORS_ALLOWED_ORIGINS', 'http://localhost:5173')
+
+from src.semantic_cache import SemanticCache, embed, key_words, vocabulary_stems
+
+
+class SemanticCacheTest(unittest.TestCase):
+    def test_rephrased_question_hits(self):
+        cache = SemanticCache(threshold=0.92)
+        cache.add('which drugs treat lung cancer?', 'CYPHER', namespace='v1')
+        value, score = cache.lookup('drugs treating lung cancer', namespace='v1')
+        self.assertEqual(value, 'CYPHER')
+        self.assertGreater(score, 0.92)
+
+    def test_different_entity_misses(self):
+        cache = SemanticCache(threshold=0.92)
+        cache.add('drugs treating lung cancer', 'LUNG')
+        cache.add('proteins interacting with TP53', 'TP53')
+        self.assertIsNone(cache.lookup('drugs treating breast cancer'))
+        self.assertIsNone(cache.lookup('proteins interacting with TP63'))
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_swapped_entities_and_negation_miss(self):
+        cache = SemanticCache(threshold=0.92)
+        cache.add('which drugs treat lung cancer but not asthma', 'LUNG_NOT_ASTHMA')
+        cache.add('which drugs treat asthma', 'ASTHMA')
+        self.assertIsNone(cache.lookup('which drugs treat asthma but not lung cancer'))
+        self.assertIsNone(cache.lookup('which drugs do not treat asthma'))
+        self.assertEqual(cache.lookup('drugs treating lung cancer but not asthma')[0], 'LUNG_NOT_ASTHMA')
+
+    def test_near_identical_entities_miss(self):
+        cache = SemanticCache(threshold=0.92, vocabulary=['Drug', 'Disease', 'Protein', 'TREATS', 'INTERACTS_WITH'])
+        cache.add('which drugs treat lung cancer', 'LUNG')
+        cache.add('which proteins interact with BRCA1', 'BRCA1')
+        self.assertIsNone(cache.lookup('which drugs treat liver cancer'))
+        self.assertIsNone(cache.lookup('which proteins interact with BRCA2'))
+        self.assertEqual(cache.lookup('proteins interacting with BRCA1')[0], 'BRCA1')
+
+    def test_key_words_skip_filler_and_schema_vocabulary(self):
+        vocabulary = frozenset(vocabulary_stems(['Drug', 'TREATS', 'IS_BIOMARKER_OF_DISEASE']))
+        self.assertEqual(key_words('Which drugs treat lung cancer?', vocabulary), ('lung', 'cancer'))
+        self.assertEqual(key_words('biomarkers of disease 2 not in TP53', vocabulary), ('2', 'not', 'tp53'))
+
+    def test_namespaces_are_isolated(self):
+        cache = SemanticCache()
+        cache.add('drugs treating asthma', 'OLD', namespace='v1')
+        self.assertIsNone(cache.lookup('drugs treating asthma', namespace='v2'))
+
+    def test_lru_eviction_and_rebuild(self):
+        cache = SemanticCache(max_entries=2)
+        cache.add('genes transcribed into transcripts', 'A', namespace='v1')
+        cache.add('drugs treating asthma', 'B', namespace='v2')
+        cache.lookup('genes transcribed into transcripts', namespace='v1')
+        cache.add('pathways of glucose', 'C', namespace='v2')
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.lookup('drugs treating asthma', namespace='v2'))
+
+        self.assertEqual(cache.rebuild(dim=128, keep=lambda ns: ns == 'v2'), 1)
+        self.assertEqual(cache.dim, 128)
+        self.assertEqual(cache.lookup('pathways of glucose', namespace='v2')[0], 'C')
+        self.assertIsNone(cache.lookup('genes transcribed into transcripts', namespace='v1'))
+
+    def test_embedding_is_normalised_and_stable(self):
+        vec = embed('Which drugs treat asthma?')
+        self.assertAlmostEqual(float(vec @ vec), 1.0, places=5)
+        self.assertTrue((vec == embed('Which drugs treat asthma?')).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
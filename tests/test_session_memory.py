@@ -0,0 +1,93 @@
+import asyncio
+import os
+import sys
+import time
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+os.environ.setdefault('CORS_ALLOWED_ORIGINS', 'http://localhost:5173')
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+import src.api_server as api_server
+from src.response_cache import ResponseCache
+from src.session_memory import BoundedChatMessageHistory, SessionHistoryStore
+from tests.test_response_cache import FakeAgent
+
+
+class BoundedHistoryTest(unittest.TestCase):
+    def test_window_is_trimmed_to_token_budget(self):
+        history = BoundedChatMessageHistory(max_tokens=30)
+        for i in range(10):
+            history.add_messages([HumanMessage(content='q' * 40), AIMessage(content='a' * 40)])
+        self.assertLessEqual(history.token_count, 30)
+        self.assertEqual(history.messages[0].type, 'human')
+        self.assertEqual(history.messages[-1].content, 'a' * 40)
+
+    def test_newest_message_is_kept_even_if_over_budget(self):
+        history = BoundedChatMessageHistory(max_tokens=1)
+        history.add_message(HumanMessage(content='x' * 100))
+        self.assertEqual(len(history.messages), 1)
+
+
+class SessionStoreTest(unittest.TestCase):
+    def test_sessions_are_isolated(self):
+        store = SessionHistoryStore()
+        store.get('a').add_user_message('hello')
+        self.assertEqual(store.get('b').messages, [])
+        self.assertEqual(len(store.get('a').messages), 1)
+
+    def test_session_cap_evicts_least_recent(self):
+        store = SessionHistoryStore(max_sessions=2)
+        store.get('a').add_user_message('1')
+        store.get('b')
+        store.get('a')
+        store.get('c')
+        self.assertEqual(store.stats()['sessions'], 2)
+        self.assertEqual(store.stats()['evicted'], 1)  # 'b' was least recently used
+        self.assertEqual(len(store.get('a').messages), 1)
+
+    def test_peek_never_creates_a_session(self):
+        store = SessionHistoryStore(max_sessions=1)
+        store.get('a').add_user_message('1')
+        for i in range(5):
+            self.assertIsNone(store.peek(f'random{i}'))
+        self.assertEqual(len(store.peek('a').messages), 1)
+        self.assertEqual(store.stats()['evicted'], 0)
+
+    def test_idle_sessions_expire(self):
+        store = SessionHistoryStore(idle_ttl=0.01)
+        store.get('a').add_user_message('1')
+        time.sleep(0.02)
+        self.assertEqual(store.get('a').messages, [])
+
+
+class PerSessionEndpointsTest(unittest.TestCase):
+    def setUp(self):
+        self.agent = FakeAgent()
+        patcher = mock.patch.multiple(
+            api_server,
+            _AGENT=self.agent,
+            _RESPONSE_CACHE=ResponseCache(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_history_and_clear_are_per_session(self):
+        ask = lambda q, sid: asyncio.run(
+            api_server.ask_llm_agent(api_server.QueryRequest(query=q, session_id=sid, use_cache=False))
+        )
+        ask('q1', 'alice')
+        ask('q2', 'bob')
+        alice = asyncio.run(api_server.get_shared_history('alice'))['history']
+        self.assertEqual([m['content'] for m in alice if m['role'] == 'user'], ['q1'])
+        asyncio.run(api_server.clear_shared_history(api_server.SessionRequest(session_id='alice')))
+        self.assertEqual(asyncio.run(api_server.get_shared_history('alice'))['history'], [])
+        self.assertEqual(len(asyncio.run(api_server.get_shared_history('bob'))['history']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
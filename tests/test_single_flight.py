@@ -0,0 +1,153 @@
+import asyncio
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+os.environ.setdefault('CORS_ALLOWED_ORIGINS', 'http://localhost:5173')
+
+import src.api_server as api_server
+from src.response_cache import ResponseCache
+from src.semantic_cache import SemanticCache
+from src.single_flight import SingleFlight
+from src.template_cache import TemplateCache
+from tests.test_response_cache import FakeAgent
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flights, calls = SingleFlight(), []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'answer'
+
+        async def main():
+            return await asyncio.gather(*(flights.do('k', work) for _ in range(5)))
+
+        results = asyncio.run(main())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r for r, _ in results], ['answer'] * 5)
+        self.assertEqual(sum(leader for _, leader in results), 1)
+        self.assertEqual(flights.stats()['coalesced'], 4)
+        self.assertEqual(flights.stats()['in_flight'], 0)
+
+    def test_error_reaches_every_waiter_and_is_not_kept(self):
+        flights, calls = SingleFlight(), []
+
+        async def fail():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError('backend down')
+
+        async def main():
+            first = await asyncio.gather(*(flights.do('k', fail) for _ in range(3)), return_exceptions=True)
+            second = await asyncio.gather(flights.do('k', fail), return_exceptions=True)
+            return first + second
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(len(calls), 2)
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return 'answer'
+
+        async def main():
+            leader = asyncio.ensure_future(flights.do('k', work))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flights.do('k', work))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower, leader.cancelled()
+
+        (result, leader), leader_cancelled = asyncio.run(main())
+        self.assertEqual(result, 'answer')
+        self.assertFalse(leader)
+        self.assertTrue(leader_cancelled)
+
+    def test_work_is_cancelled_when_nobody_waits(self):
+        flights, state = SingleFlight(), {}
+
+        async def work():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                state['cancelled'] = True
+                raise
+
+        async def main():
+            waiters = [asyncio.ensure_future(flights.do('k', work)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            for w in waiters:
+                w.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+            await asyncio.sleep(0)
+
+        asyncio.run(main())
+        self.assertTrue(state.get('cancelled'))
+        self.assertEqual(flights.stats()['in_flight'], 0)
+
+
+class SlowAgent(FakeAgent):
+    async def aanswer(self, question, session_id='default', candidates=None, remember=True):
+        await asyncio.sleep(0.05)
+        return await super().aanswer(question, session_id, candidates, remember)
+
+
+class AskCoalescingTest(unittest.TestCase):
+    def setUp(self):
+        self.agent = SlowAgent()
+        patcher = mock.patch.multiple(
+            api_server,
+            _AGENT=self.agent,
+            _RESPONSE_CACHE=ResponseCache(),
+            _SEMANTIC_CACHE=SemanticCache(max_entries=16),
+            _TEMPLATE_CACHE=TemplateCache(),
+            _IN_FLIGHT=SingleFlight(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_identical_questions_make_one_llm_call(self):
+        async def main():
+            return await asyncio.gather(*(
+                api_server.ask_llm_agent(api_server.QueryRequest(query='Which drugs treat asthma?', session_id=f's{i}'))
+                for i in range(4)
+            ))
+
+        results = asyncio.run(main())
+        self.assertEqual(self.agent.calls, 1)
+        self.assertEqual(len({r['answer'] for r in results}), 1)
+        self.assertEqual(sum(bool(r.get('coalesced')) for r in results), 3)
+        for i in range(4):
+            self.assertEqual(len(self.agent.get_history(f's{i}')), 2)
+        stats = asyncio.run(api_server.response_cache_stats())['single_flight']
+        self.assertEqual(stats['coalesced'], 3)
+
+    def test_cancelled_leader_gets_no_history(self):
+        async def main():
+            ask = lambda sid: api_server.ask_llm_agent(
+                api_server.QueryRequest(query='Which drugs treat asthma?', session_id=sid))
+            leader = asyncio.ensure_future(ask('leader'))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(ask('follower'))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await follower
+
+        result = asyncio.run(main())
+        self.assertTrue(result.get('coalesced'))
+        self.assertEqual(self.agent.get_history('leader'), [])
+        self.assertEqual(len(self.agent.get_history('follower')), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.modules.setdefault('dotenv', types.SimpleNamespace(load_dotenv=lambda: None))
+os.environ.setdefault('NEO4J_SCHEMA_PATH', 'data/input/neo4j_schema.json')
+os.environ.setdefault('CORS_ALLOWED_ORIGINS', 'http://localhost:5173')
+
+from fastapi.testclient import TestClient
+
+import src.api_server as api_server
+from src.response_cache import ResponseCache
+from src.semantic_cache import SemanticCache
+from src.template_cache import TemplateCache
+from tests.test_response_cache import FakeAgent
+
+
+class StreamingAgent(FakeAgent):
+    chunks = ['```', 'MATCH (n) ', 'RETURN n ', 'LIMIT 10', '```']
+
+    async def astream(self, question, session_id='default', prompts=None):
+        self.calls += 1
+        for chunk in self.chunks:
+            yield chunk
+
+
+class FailingAgent(FakeAgent):
+    async def astream(self, question, session_id='default', prompts=None):
+        yield 'MATCH'
+        raise RuntimeError('backend down')
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class AskStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.agent = StreamingAgent()
+        patcher = mock.patch.multiple(
+            api_server,
+            _AGENT=self.agent,
+            _RESPONSE_CACHE=ResponseCache(),
+            _SEMANTIC_CACHE=SemanticCache(max_entries=16),
+            _TEMPLATE_CACHE=TemplateCache(),
+            _CACHE_CONTEXT_MESSAGES=0,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(api_server.app)
+
+    def _stream(self, query, **kw):
+        res = self.client.post('/api/ask/stream', json={'query': query, **kw})
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.headers['content-type'].startswith('text/event-stream'))
+        return parse_sse(res.text)
+
+    def test_tokens_then_cleaned_answer(self):
+        events = self._stream('show nodes', session_id='s1')
+        tokens = [data['text'] for event, data in events if event == 'token']
+        self.assertEqual(tokens, StreamingAgent.chunks)
+        event, data = events[-1]
+        self.assertEqual(event, 'done')
+        self.assertEqual(data['answer'], 'MATCH (n) RETURN n LIMIT 10')
+        self.assertEqual((data['cached'], data['valid'], data['repairs']), (False, True, 0))
+        self.assertEqual(len(self.agent.get_history('s1')), 2)
+
+    def test_repeat_is_answered_from_cache_without_tokens(self):
+        self._stream('show nodes')
+        events = self._stream('show nodes')
+        self.assertEqual([event for event, _ in events], ['done'])
+        self.assertTrue(events[0][1]['cached'])
+        self.assertEqual(self.agent.calls, 1)
+        self.assertEqual(len(self.agent.get_history()), 4)
+
+    def test_backend_failure_is_reported_as_error_event(self):
+        api_server._AGENT = FailingAgent()
+        events = self._stream('show nodes')
+        self.assertEqual(events[-1], ('error', {'detail': 'backend down'}))
+        self.assertIsNone(api_server._RESPONSE_CACHE.get(
+            api_server._cache_context(api_server._AGENT, api_server.QueryRequest(query='show nodes'))[0]
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
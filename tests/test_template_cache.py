@@ -0,0 +1,63 @@
+import unittest
+
+from src.template_cache import TemplateCache, extract_string_literals
+
+TREATS = (
+    'MATCH (d:Drug)-[r:TREATS]-(x:Disease) '
+    'WHERE toLower(x.name) = toLower("lung cancer") RETURN d, r, x LIMIT 10'
+)
+DETECTED = (
+    'MATCH (p:Protein) WHERE p.name IN ["H4C1","CT47A1"] '
+    'MATCH (p)-[r:DETECTED_IN_PATHOLOGY_SAMPLE]-(d:Disease) RETURN p, r, d LIMIT 10'
+)
+
+
+class TemplateCacheTest(unittest.TestCase):
+    def test_extract_literals(self):
+        self.assertEqual([l.value for l in extract_string_literals(DETECTED)], ['H4C1', 'CT47A1'])
+        self.assertEqual([l.value for l in extract_string_literals("x = 'it\\'s'")], ["it\\'s"])
+
+    def test_refills_single_slot(self):
+        cache = TemplateCache()
+        self.assertTrue(cache.learn('Which drugs treat lung cancer?', TREATS))
+        self.assertEqual(cache.lookup('which drugs treat Asthma'), TREATS.replace('lung cancer', 'Asthma'))
+        self.assertIsNone(cache.lookup('which drugs treat asthma and diabetes'))
+        self.assertIsNone(cache.lookup('which proteins treat asthma'))
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_modifiers_are_not_captured_into_the_slot(self):
+        cache = TemplateCache()
+        cache.learn('Which drugs treat lung cancer?', TREATS)
+        for question in ('which drugs treat the most diseases', 'which drugs treat asthma but not diabetes',
+                         'which drugs treat lung cancer limit 50', 'which drugs treat asthma in children',
+                         'which drugs treat most diseases', 'which drugs treat small cell lung cancer'):
+            self.assertIsNone(cache.lookup(question), question)
+        self.assertIn('"breast cancer"', cache.lookup('which drugs treat breast cancer'))
+
+    def test_refills_list_slots_and_keeps_learnt_case(self):
+        cache = TemplateCache()
+        cache.learn('diseases where proteins h4c1, ct47a1 are detected', DETECTED)
+        filled = cache.lookup('diseases where proteins erbb2, tp53 are detected')
+        self.assertIn('p.name IN ["ERBB2","TP53"]', filled)
+
+    def test_not_learnt_when_literal_is_not_in_question(self):
+        cache = TemplateCache()
+        self.assertFalse(cache.learn('drugs for lung tumours', TREATS))
+        self.assertFalse(cache.learn('lung cancer', TREATS))  # no static words left
+
+    def test_quotes_in_new_values_are_escaped(self):
+        cache = TemplateCache()
+        cache.learn('Which drugs treat lung cancer?', TREATS)
+        self.assertIn('toLower("crohn\\"s")', cache.lookup('which drugs treat crohn"s'))
+
+    def test_namespaces_and_eviction(self):
+        cache = TemplateCache(max_templates=1)
+        cache.learn('Which drugs treat lung cancer?', TREATS, namespace='v1')
+        self.assertIsNone(cache.lookup('which drugs treat asthma', namespace='v2'))
+        cache.learn('diseases where proteins h4c1, ct47a1 are detected', DETECTED, namespace='v1')
+        self.assertIsNone(cache.lookup('which drugs treat asthma', namespace='v1'))
+        self.assertEqual(cache.stats()['templates'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()